@@ -14,7 +14,9 @@ import sys
 from PyQt5.QtWidgets import QApplication
 from ngmainwin import NgMainWin
 
-app = QApplication(sys.argv)
-mainWin = NgMainWin()
-mainWin.show()
-sys.exit(app.exec_())
+#the guard is required by worker processes(e.g. raw pm parser), which re-import the main module on spawn
+if __name__ == '__main__':
+    app = QApplication(sys.argv)
+    mainWin = NgMainWin()
+    mainWin.show()
+    sys.exit(app.exec_())
@@ -0,0 +1,307 @@
+#!/usr/bin/python3
+# -*- encoding: utf-8 -*-
+
+'''
+File:
+    ngdbbackend.py
+Description:
+    Database backends of NgSqlQuery, i.e. Oracle(NEDS) and SQLite as its offline stand-in, and loader of SQLite fixtures from csv.
+    Usage: python3 ngdbbackend.py --db data/neds.db --fixtures data/neds_fixtures
+Change History:
+    2026-10-18  v0.1    created.
+'''
+
+import os
+import sys
+import csv
+import glob
+import time
+import sqlite3
+import threading
+import argparse
+from urllib.parse import quote
+from datetime import datetime
+try:
+    import cx_Oracle
+except ImportError:
+    #cx_Oracle is optional and only required by the Oracle backend
+    cx_Oracle = None
+
+class DbBackend(object):
+    '''
+    Database backend of NgSqlQuery, which owns a pool of sessions shared by worker threads.
+    conf: [key=upper case key of db config file, val=value]
+    '''
+    NAME = None
+    #error codes worth a retry
+    RETRY_CODES = ()
+
+    def __init__(self, conf):
+        self.conf = conf
+        self.Error = Exception
+        self.DatabaseError = Exception
+
+    def describe(self):
+        return ''
+
+    def signature(self):
+        #identity of the database, which is part of the query cache key so that results of different databases aren't mixed up
+        return (self.NAME, self.describe())
+
+    def createPool(self, numSessions):
+        pass
+
+    def closePool(self):
+        pass
+
+    def acquire(self):
+        pass
+
+    def release(self, db):
+        pass
+
+    def drop(self, db):
+        #drop a broken session instead of returning it to the pool
+        pass
+
+    def cancel(self, db):
+        #interrupt the long-running query of session db, which is called by another thread
+        pass
+
+    def errorInfo(self, e):
+        #return (code, message) of exception e
+        return (None, str(e))
+
+    def columns(self, cursor):
+        #column names of query results, which are upper case as returned by Oracle
+        return [a[0].upper() for a in cursor.description]
+
+class OracleBackend(DbBackend):
+    '''
+    NEDS over cx_Oracle session pool.
+    '''
+    NAME = 'Oracle'
+    #ORA- errors worth a retry: end-of-file on communication channel, not connected, connection lost, TNS timeouts and instance unavailable
+    RETRY_CODES = (3113, 3114, 3135, 12170, 12537, 12547, 12571, 1033, 1034, 1089, 25408)
+
+    def __init__(self, conf):
+        super().__init__(conf)
+        if cx_Oracle is None:
+            raise ImportError('cx_Oracle is required by Oracle backend')
+        self.Error = cx_Oracle.Error
+        self.DatabaseError = cx_Oracle.DatabaseError
+        self.dsn = cx_Oracle.makedsn(conf['HOST_NAME'], conf['TCP_PORT'], service_name=conf['DB_NAME'])
+        self.pool = None
+
+    def describe(self):
+        return 'DSN = %s' % self.dsn
+
+    def signature(self):
+        return (self.NAME, self.dsn, self.conf['USER_NAME'])
+
+    def createPool(self, numSessions):
+        self.pool = cx_Oracle.SessionPool(self.conf['USER_NAME'], self.conf['USER_PASSCODE'], self.dsn, 1, numSessions, 1, threaded=True)
+
+    def closePool(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool = None
+
+    def acquire(self):
+        return self.pool.acquire()
+
+    def release(self, db):
+        self.pool.release(db)
+
+    def drop(self, db):
+        self.pool.drop(db)
+
+    def cancel(self, db):
+        db.cancel()
+
+    def errorInfo(self, e):
+        # cx_Oracle 5.0.4 raises a cx_Oracle.DatabaseError exception
+        # with the following attributes and values:
+        #  code = 2091
+        #  message = 'ORA-02091: transaction rolled back
+        #            'ORA-02291: integrity constraint (TEST_DJANGOTEST.SYS
+        #               _C00102056) violated - parent key not found'
+        error = e.args[0]
+        return (getattr(error, 'code', None), getattr(error, 'message', str(error)))
+
+class SqliteBackend(DbBackend):
+    '''
+    SQLite database file as offline stand-in of NEDS, e.g. created by loadFixtures.
+    Oracle functions used by the NEDS queries, i.e. to_date, are registered to each session.
+    '''
+    NAME = 'SQLite'
+    #SQLITE_BUSY and SQLITE_LOCKED
+    RETRY_CODES = (5, 6)
+
+    def __init__(self, conf):
+        super().__init__(conf)
+        self.Error = sqlite3.Error
+        self.DatabaseError = sqlite3.DatabaseError
+        #DB_FILE is relative to where the toolset is installed, unless it's absolute
+        self.dbFile = os.path.join(os.path.dirname(os.path.abspath(__file__)), conf['DB_FILE'])
+        self.lock = threading.Lock()
+        self.idle = []
+
+    def describe(self):
+        return 'DB_FILE = %s' % self.dbFile
+
+    def signature(self):
+        #size and mtime change whenever fixtures are reloaded into the same file
+        st = os.stat(self.dbFile)
+        return (self.NAME, os.path.abspath(self.dbFile), st.st_size, st.st_mtime_ns)
+
+    def createPool(self, numSessions):
+        #sessions are opened on demand, but fail early if the database file is missing
+        self.release(self.connect())
+
+    def closePool(self):
+        with self.lock:
+            for db in self.idle:
+                db.close()
+            self.idle = []
+
+    def connect(self):
+        #read only, so that a missing database file isn't created silently
+        db = sqlite3.connect('file:%s?mode=ro' % quote(self.dbFile), uri=True, check_same_thread=False)
+        db.create_function('to_date', 2, toDate)
+        return db
+
+    def acquire(self):
+        with self.lock:
+            if len(self.idle) > 0:
+                return self.idle.pop()
+        return self.connect()
+
+    def release(self, db):
+        with self.lock:
+            self.idle.append(db)
+
+    def drop(self, db):
+        db.close()
+
+    def cancel(self, db):
+        db.interrupt()
+
+    def errorInfo(self, e):
+        #sqlite_errorcode is available since python 3.11
+        return (getattr(e, 'sqlite_errorcode', None), str(e))
+
+BACKENDS = {'oracle':OracleBackend, 'sqlite':SqliteBackend}
+
+def makeBackend(conf):
+    #DB_BACKEND of db config file selects the backend, which defaults to oracle
+    name = conf.get('DB_BACKEND', 'oracle').lower()
+    if not name in BACKENDS:
+        raise ValueError('Unknown DB_BACKEND: %s' % name)
+    return BACKENDS[name](conf)
+
+#(Oracle format element, strftime directive) in the order of replacement
+ORACLE_TIME_FORMATS = [('hh24', '%H'), ('yyyy', '%Y'), ('mi', '%M'), ('mm', '%m'), ('dd', '%d'), ('ss', '%S')]
+#text format of timestamps in SQLite, which sorts as time
+SQLITE_TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+def toDate(text, fmt):
+    #Oracle to_date for SQLite, e.g. to_date('2019032100', 'yyyymmddhh24') = '2019-03-21 00:00:00'
+    if text is None or fmt is None:
+        return None
+    fmt = fmt.lower()
+    for element,directive in ORACLE_TIME_FORMATS:
+        fmt = fmt.replace(element, directive)
+    try:
+        return datetime.strptime(str(text), fmt).strftime(SQLITE_TIME_FORMAT)
+    except ValueError:
+        return None
+
+#columns indexed by loadFixtures, which are used by where clause or join of the NEDS queries
+INDEX_COLUMNS = ('PERIOD_START_TIME', 'CO_GID', 'CO_PARENT_GID', 'OBJ_GID')
+
+def inferType(values):
+    '''
+    Return SQLite column type of values(csv fields, where NULL is empty), i.e. INTEGER, REAL, TIMESTAMP or TEXT.
+    '''
+    values = [v for v in values if v != '']
+    if len(values) == 0:
+        return 'TEXT'
+    for cls,name in ((int, 'INTEGER'), (float, 'REAL')):
+        try:
+            for v in values:
+                cls(v)
+            return name
+        except ValueError:
+            pass
+    try:
+        for v in values:
+            datetime.fromisoformat(v)
+        return 'TIMESTAMP'
+    except ValueError:
+        return 'TEXT'
+
+def loadFixtures(dbFile, csvDir, log=print, chunkSize=10000):
+    '''
+    Create one table of dbFile per csv of csvDir, e.g. NOKLTE_PS_LNCELHO_DMNC1_RAW.csv or ctp_common_objects.csv, where empty fields are NULL.
+    Column types are inferred from the first chunk of rows, and timestamps are stored as SQLITE_TIME_FORMAT text.
+    Existing tables of the same names are replaced.
+    Return [key=table, val=number of rows].
+    '''
+    db = sqlite3.connect(dbFile)
+    db.execute('PRAGMA journal_mode = OFF')
+    db.execute('PRAGMA synchronous = OFF')
+    tables = dict()
+    for fn in sorted(glob.glob(os.path.join(csvDir, '*.csv'))):
+        table = os.path.splitext(os.path.basename(fn))[0]
+        tStart = time.perf_counter()
+        with open(fn, 'r', newline='') as f:
+            reader = csv.reader(f)
+            header = next(reader)
+            chunk = []
+            numRows = 0
+            for tokens in reader:
+                chunk.append(tokens)
+                if len(chunk) == chunkSize or (numRows == 0 and len(chunk) == 1000):
+                    if numRows == 0:
+                        #types are inferred from the first 1000 rows
+                        types = [inferType([tokens[i] for tokens in chunk]) for i in range(len(header))]
+                        createTable(db, table, header, types)
+                    numRows = numRows + insertRows(db, table, types, chunk)
+                    chunk = []
+            if numRows == 0:
+                types = [inferType([tokens[i] for tokens in chunk]) for i in range(len(header))]
+                createTable(db, table, header, types)
+            numRows = numRows + insertRows(db, table, types, chunk)
+
+        for col in header:
+            if col.upper() in INDEX_COLUMNS:
+                db.execute('create index %s_%s on %s (%s)' % (table, col, table, col))
+        db.commit()
+        tables[table] = numRows
+        log('-->%s: %d rows loaded in %.1fs' % (table, numRows, time.perf_counter() - tStart))
+
+    db.close()
+    return tables
+
+def createTable(db, table, header, types):
+    db.execute('drop table if exists %s' % table)
+    db.execute('create table %s (%s)' % (table, ', '.join(['%s %s' % (col, t) for col,t in zip(header, types)])))
+
+def insertRows(db, table, types, rows):
+    #empty fields are NULL, and timestamps are normalized so that they compare as text
+    normalize = [(lambda v: datetime.fromisoformat(v).strftime(SQLITE_TIME_FORMAT)) if t == 'TIMESTAMP' else None for t in types]
+    values = []
+    for tokens in rows:
+        values.append([None if v == '' else v if f is None else f(v) for v,f in zip(tokens, normalize)])
+    db.executemany('insert into %s values (%s)' % (table, ', '.join(['?'] * len(types))), values)
+    return len(values)
+
+if __name__ == '__main__':
+    argParser = argparse.ArgumentParser(description='Create SQLite stand-in of NEDS from csv fixtures, one table per csv.')
+    argParser.add_argument('--db', required=True, help='SQLite database file')
+    argParser.add_argument('--fixtures', required=True, help='directory of csv fixtures, e.g. NOKLTE_PS_LNCELHO_DMNC1_RAW.csv')
+    args = argParser.parse_args()
+    tables = loadFixtures(args.db, args.fixtures)
+    print('%d tables loaded into %s' % (len(tables), args.db))
+    sys.exit(0 if len(tables) > 0 else 1)
@@ -11,11 +11,45 @@ Change History:
 '''
 
 import os
+import gc
+import glob
 import time
+import heapq
 import traceback
+import csv
+import multiprocessing
+from operator import itemgetter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from array import array
+import numpy as np
 from PyQt5.QtWidgets import qApp
 
+#NULL is exported as empty by NgSqlQuery, or as 'None' by its earlier versions
+NULLS = ('', 'None')
+
+#record classes use __slots__ instead of per-instance __dict__, as millions of records may be created per analysis
 class M8015(object):
+    __slots__ = ('periodStartTime', 'iaHoPrepFail', 'iaHoAtt', 'iaHoSucc', 'iaHoFailTime', 'irHoPrepFailOth', 'irHoPrepFailTime', 'irHoPrepFailAc', 'irHoPrepFailQci', 'irHoAtt', 'irHoSucc', 'irHoFailTime', 'mroLateHo', 'mroEarlyType1Ho', 'mroEarlyType2Ho', 'mroPingPongHo', 'ifLbHoAtt', 'ifLbHoSucc')
+
+    #(attribute, csv column) of counters
+    FIELDS = [('iaHoPrepFail', 'INTRA_HO_PREP_FAIL_NB'),
+              ('iaHoAtt', 'INTRA_HO_ATT_NB'),
+              ('iaHoSucc', 'INTRA_HO_SUCC_NB'),
+              ('iaHoFailTime', 'INTRA_HO_FAIL_NB'),
+              ('irHoPrepFailOth', 'INTER_HO_PREP_FAIL_OTH_NB'),
+              ('irHoPrepFailTime', 'INTER_HO_PREP_FAIL_TIME_NB'),
+              ('irHoPrepFailAc', 'INTER_HO_PREP_FAIL_AC_NB'),
+              ('irHoPrepFailQci', 'INTER_HO_PREP_FAIL_QCI_NB'),
+              ('irHoAtt', 'INTER_HO_ATT_NB'),
+              ('irHoSucc', 'INTER_HO_SUCC_NB'),
+              ('irHoFailTime', 'INTER_HO_FAIL_NB'),
+              ('mroLateHo', 'MRO_LATE_HO_NB'),
+              ('mroEarlyType1Ho', 'MRO_EARLY_TYPE1_HO_NB'),
+              ('mroEarlyType2Ho', 'MRO_EARLY_TYPE2_HO_NB'),
+              ('mroPingPongHo', 'MRO_PING_PONG_HO_NB'),
+              ('ifLbHoAtt', 'HO_LB_IF_ATT_NB'),
+              ('ifLbHoSucc', 'HO_LB_IF_SUCC_NB')]
+
     def __init__(self):
         self.periodStartTime = 'NA'
         self.iaHoPrepFail = 0
@@ -46,6 +80,14 @@ class M8015(object):
         return ','.join(_list)
 
 class M8001(object):
+    __slots__ = ('smallMsg1Att', 'largeMsg1Att', 'dedMsg1Att', 'rachMsg2')
+
+    #(attribute, csv column) of counters
+    FIELDS = [('smallMsg1Att', 'RACH_STP_ATT_SMALL_MSG'),
+              ('largeMsg1Att', 'RACH_STP_ATT_LARGE_MSG'),
+              ('dedMsg1Att', 'RACH_STP_ATT_DEDICATED'),
+              ('rachMsg2', 'RACH_STP_COMPLETIONS')]
+
     def __init__(self):
         self.smallMsg1Att = 0
         self.largeMsg1Att = 0
@@ -59,6 +101,13 @@ class M8001(object):
 
 
 class M8007(object):
+    __slots__ = ('drbSetupAtt', 'drbSetupSucc', 'drbSetupFailTimer')
+
+    #(attribute, csv column) of counters
+    FIELDS = [('drbSetupAtt', 'DATA_RB_STP_ATT'),
+              ('drbSetupSucc', 'DATA_RB_STP_COMP'),
+              ('drbSetupFailTimer', 'DATA_RB_STP_FAIL')]
+
     def __init__(self):
         self.drbSetupAtt = 0
         self.drbSetupSucc = 0
@@ -70,6 +119,14 @@ class M8007(object):
         return ','.join(_list)
 
 class M8005(object):
+    __slots__ = ('avgRssiPucch', 'avgRssiPusch', 'avgSinrPucch', 'avgSinrPusch')
+
+    #(attribute, csv column) of counters
+    FIELDS = [('avgRssiPucch', 'RSSI_PUCCH_AVG'),
+              ('avgRssiPusch', 'RSSI_PUSCH_AVG'),
+              ('avgSinrPucch', 'SINR_PUCCH_AVG'),
+              ('avgSinrPusch', 'SINR_PUSCH_AVG')]
+
     def __init__(self):
         self.avgRssiPucch = 0
         self.avgRssiPusch = 0
@@ -82,6 +139,32 @@ class M8005(object):
         return ','.join(_list)
 
 class M8006(object):
+    __slots__ = ('erabSetupAtt', 'erabSetupSucc', 'erabSetupFailRrnaIni', 'erabSetupFailRrnaAdd', 'erabSetupFailTruIni', 'erabSetupFailTruAdd', 'erabSetupFailUelIni', 'erabSetupFailUelAdd', 'erabSetupFailRipIni', 'erabSetupFailRipAdd', 'erabSetupFailUp', 'erabSetupFailMob', 'erabRelQci1Tot', 'erabRelQci1Ina', 'erabRelQci1UeLost', 'erabRelQci1Tru', 'erabRelQci1Red', 'erabRelQci1Eugr', 'erabRelQci1Rrna', 'erabRelQci1HoFail', 'erabRelQci1EpcPs', 'erabRelQci1TnlUnsp')
+
+    #(attribute, csv column) of counters
+    FIELDS = [('erabSetupAtt', 'EPS_BEARER_SETUP_ATTEMPTS'),
+              ('erabSetupSucc', 'EPS_BEARER_SETUP_COMPLETIONS'),
+              ('erabSetupFailRrnaIni', 'ERAB_INI_SETUP_FAIL_RNL_RRNA'),
+              ('erabSetupFailRrnaAdd', 'ERAB_ADD_SETUP_FAIL_RNL_RRNA'),
+              ('erabSetupFailTruIni', 'ERAB_INI_SETUP_FAIL_TNL_TRU'),
+              ('erabSetupFailTruAdd', 'ERAB_ADD_SETUP_FAIL_TNL_TRU'),
+              ('erabSetupFailUelIni', 'ERAB_INI_SETUP_FAIL_RNL_UEL'),
+              ('erabSetupFailUelAdd', 'ERAB_ADD_SETUP_FAIL_RNL_UEL'),
+              ('erabSetupFailRipIni', 'ERAB_INI_SETUP_FAIL_RNL_RIP'),
+              ('erabSetupFailRipAdd', 'ERAB_ADD_SETUP_FAIL_RNL_RIP'),
+              ('erabSetupFailUp', 'ERAB_ADD_SETUP_FAIL_UP'),
+              ('erabSetupFailMob', 'ERAB_ADD_SETUP_FAIL_RNL_MOB'),
+              ('erabRelQci1Tot', 'ERAB_REL_ENB_QCI1'),
+              ('erabRelQci1Ina', 'ERAB_REL_ENB_RNL_INA_QCI1'),
+              ('erabRelQci1UeLost', 'ERAB_REL_ENB_RNL_UEL_QCI1'),
+              ('erabRelQci1Tru', 'ERAB_REL_ENB_TNL_TRU_QCI1'),
+              ('erabRelQci1Red', 'ERAB_REL_ENB_RNL_RED_QCI1'),
+              ('erabRelQci1Eugr', 'ERAB_REL_ENB_RNL_EUGR_QCI1'),
+              ('erabRelQci1Rrna', 'ERAB_REL_ENB_RNL_RRNA_QCI1'),
+              ('erabRelQci1HoFail', 'ERAB_REL_HO_FAIL_TIM_QCI1'),
+              ('erabRelQci1EpcPs', 'ERAB_REL_EPC_PATH_SWITCH_QCI1'),
+              ('erabRelQci1TnlUnsp', 'ERAB_REL_ENB_TNL_UNSP_QCI1')]
+
     def __init__(self):
         self.erabSetupAtt = 0
         self.erabSetupSucc = 0
@@ -115,6 +198,17 @@ class M8006(object):
         return ','.join(_list)
 
 class M8013(object):
+    __slots__ = ('rrcMsg3Mos', 'rrcMsg3Mt', 'rrcMsg3Mod', 'rrcMsg3Emg', 'rrcMsg3HiPrio', 'rrcMsg3DelTol', 'rrcMsg5')
+
+    #(attribute, csv column) of counters
+    FIELDS = [('rrcMsg3Mos', 'SIGN_CONN_ESTAB_ATT_MO_S'),
+              ('rrcMsg3Mt', 'SIGN_CONN_ESTAB_ATT_MT'),
+              ('rrcMsg3Mod', 'SIGN_CONN_ESTAB_ATT_MO_D'),
+              ('rrcMsg3Emg', 'SIGN_CONN_ESTAB_ATT_EMG'),
+              ('rrcMsg3HiPrio', 'SIGN_CONN_ESTAB_ATT_HIPRIO'),
+              ('rrcMsg3DelTol', 'SIGN_CONN_ESTAB_ATT_DEL_TOL'),
+              ('rrcMsg5', 'SIGN_CONN_ESTAB_COMP')]
+
     def __init__(self):
         self.rrcMsg3Mos = 0
         self.rrcMsg3Mt = 0
@@ -131,6 +225,14 @@ class M8013(object):
         return ','.join(_list)
 
 class M8051(object):
+    __slots__ = ('avgUeRrcConn', 'maxUeRrcConn', 'avgUeAct', 'maxUeAct')
+
+    #(attribute, csv column) of counters
+    FIELDS = [('avgUeRrcConn', 'RRC_CONNECTED_UE_AVG'),
+              ('maxUeRrcConn', 'RRC_CONNECTED_UE_MAX'),
+              ('avgUeAct', 'CELL_LOAD_ACTIVE_UE_AVG'),
+              ('maxUeAct', 'CELL_LOAD_ACTIVE_UE_MAX')]
+
     def __init__(self):
         self.avgUeRrcConn = 0
         self.maxUeRrcConn = 0
@@ -138,11 +240,13 @@ class M8051(object):
         self.maxUeAct = 0
 
     def __str__(self):
-        _list = [self.avgRssiPucch, self.avgRssiPusch, self.avgSinrPucch, self.avgSinrPusch]
+        _list = [self.avgUeRrcConn, self.maxUeRrcConn, self.avgUeAct, self.maxUeAct]
         _list = list(map(str, _list))
         return ','.join(_list)
 
 class Lncel(object):
+    __slots__ = ('lnbtsId', 'enbId', 'lcrId', 'eci', 'earfcn', 'pci', 'tac', 'th1', 'a3Off', 'hysA3Off', 'a3RepInt', 'a3Ttt', 'a5Th3', 'a5Th3a', 'hysA5Th3', 'a5RepInt', 'a5Ttt', 'a2Th2If', 'hysA2Th2If', 'a2Ttt', 'a1Th2a', 'hysA1Th2a', 'a1Ttt')
+
     def __init__(self):
         self.lnbtsId = None
         self.enbId = None
@@ -153,7 +257,7 @@ class Lncel(object):
         self.tac = None
         self.th1 = None
         self.a3Off = None
-        self.hysA3off = None
+        self.hysA3Off = None
         self.a3RepInt = None
         self.a3Ttt = None
         self.a5Th3 = None
@@ -174,9 +278,12 @@ class Lncel(object):
                  self.a5Th3, self.a5Th3a, self.hysA5Th3, self.a5RepInt, self.a5Ttt,
                  self.a2Th2If, self.hysA2Th2If, self.a2Ttt,
                  self.a1Th2a, self.hysA1Th2a, self.a1Ttt]
+        _list = list(map(str, _list))
         return ','.join(_list)
 
 class Lnadj(object):
+    __slots__ = ('coDn', 'adjEnbId', 'adjEnbIp', 'x2Stat')
+
     def __init__(self):
         self.coDn = None
         self.adjEnbId = None
@@ -185,9 +292,12 @@ class Lnadj(object):
 
     def __str__(self):
         _list = [self.coDn, self.adjEnbId, self.adjEnbIp, self.x2Stat]
+        _list = list(map(str, _list))
         return ','.join(_list)
 
 class Lnadjl(object):
+    __slots__ = ('coDn', 'adjEnbId', 'adjLcrId', 'adjEarfcn', 'adjPci', 'adjTac')
+
     def __init__(self):
         self.coDn = None
         self.adjEnbId = None
@@ -198,14 +308,17 @@ class Lnadjl(object):
 
     def __str__(self):
         _list = [self.coDn, self.adjEnbId, self.adjLcrId, self.adjEarfcn, self.adjPci, self.adjTac]
+        _list = list(map(str, _list))
         return ','.join(_list)
 
 class Lnhoif(object):
+    __slots__ = ('coDn', 'ifEarfcn', 'ifA3Off', 'ifHysA3Off', 'ifA3RepInt', 'ifA3Ttt', 'ifA5Th3', 'ifA5Th3a', 'ifHysA5Th3', 'ifA5RepInt', 'ifA5Ttt', 'ifMbw')
+
     def __init__(self):
         self.coDn = None
         self.ifEarfcn = None
         self.ifA3Off = None
-        self.ifHysA3off = None
+        self.ifHysA3Off = None
         self.ifA3RepInt = None
         self.ifA3Ttt = None
         self.ifA5Th3 = None
@@ -221,6 +334,8 @@ class Lnhoif(object):
         return ','.join(_list)
 
 class Irfim(object):
+    __slots__ = ('coDn', 'ifEarfcn', 'ifResPrio', 'ifRxlevMin', 'ifThLow', 'ifThHigh', 'ifMbw')
+
     def __init__(self):
         self.coDn = None
         self.ifEarfcn = None
@@ -235,20 +350,25 @@ class Irfim(object):
         return ','.join(_list)
 
 class Lnrel(object):
+    __slots__ = ('coDn', 'adjEnbId', 'adjLcrId', 'cio', 'hoAllowed', 'nrStat')
+
     def __init__(self):
         self.coDn = None
-        #self.adjEnbId = None
-        #self.adjLcrId = None
+        self.adjEnbId = None
+        self.adjLcrId = None
         self.cio = None
         self.hoAllowed = None
         self.nrStat = None
 
     def __str__(self):
-        _list = [self.coDn, #self.adjEnbId, self.adjLcrId,
+        _list = [self.coDn, self.adjEnbId, self.adjLcrId,
                  self.cio, self.hoAllowed, self.nrStat]
+        _list = list(map(str, _list))
         return ','.join(_list)
 
 class HoStat(object):
+    __slots__ = ('lnbtsId', 'lncelId', 'iaHoPrepFail', 'iaHoAtt', 'iaHoSucc', 'irHoPrepFail', 'irHoAtt', 'irHoSucc', 'mroLateHo', 'mroEarlyHo', 'mroPingPongHo', 'ifLbHoAtt', 'ifLbHoSucc')
+
     def __init__(self):
         self.lnbtsId = None
         self.lncelId = None
@@ -261,80 +381,512 @@ class HoStat(object):
         self.mroLateHo = 0
         self.mroEarlyHo = 0
         self.mroPingPongHo = 0
+        self.ifLbHoAtt = 0
+        self.ifLbHoSucc = 0
 
     def __str__(self):
         _list = [self.lnbtsId, self.lncelId, self.iaHoPrepFail, self.iaHoAtt, self.iaHoSucc, self.irHoPrepFail, self.irHoAtt, self.irHoSucc]
-        _list = list(map(_list, str))
+        _list = list(map(str, _list))
         return ','.join(_list)
 
+class CsvStream(object):
+    '''
+    Streaming reader of csv(e.g. exported by NgSqlQuery), which yields the fields of each row.
+    Lines are read in large chunks, and a chunk is split by the csv module only if it has quoted fields, otherwise by the much faster str.split.
+    header: [key=column, val=index]
+    '''
+    BUF_SIZE = 64 * 1024
+
+    def __init__(self, fn):
+        self.name = fn
+        self.f = open(fn, 'r', newline='')
+        tokens = next(csv.reader([self.f.readline()]), [])
+        self.header = dict(zip(tokens, range(len(tokens))))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excVal, excTb):
+        self.f.close()
+
+    def __iter__(self):
+        for chunk in self.chunks():
+            for tokens in chunk:
+                yield tokens
+
+    def chunks(self):
+        #yield lists of rows read from about BUF_SIZE bytes, with empty lines skipped
+        while True:
+            lines = self.f.readlines(CsvStream.BUF_SIZE)
+            if len(lines) == 0:
+                break
+
+            text = ''.join(lines)
+            if '"' in text:
+                #a quoted field may span lines, so complete the last row of chunk
+                while text.count('"') % 2 == 1:
+                    line = self.f.readline()
+                    if not line:
+                        break
+                    lines.append(line)
+                    text = text + line
+                yield [tokens for tokens in csv.reader(lines) if len(tokens) > 0]
+            else:
+                if '\r' in text:
+                    text = text.replace('\r', '')
+                yield [line.split(',') for line in text.split('\n') if line != '']
+
+class PmRecordTable(object):
+    '''
+    Columnar per-period records of a measurement(e.g. M8015), grouped by key.
+    Each field is stored as int64 along with its validity(i.e. whether the csv field is an integer), so that aggregation is a grouped sum over numpy arrays instead of a loop over objects.
+    PERIOD_START_TIME is stored as datetime64 if available, for aggregation per time bucket.
+    '''
+    TIME_COLUMN = 'PERIOD_START_TIME'
+    #[key=bucket, val=datetime64 unit]
+    BUCKETS = {'hour':'h', 'day':'D'}
+
+    def __init__(self, fields):
+        #fields: list of (attribute, csv column), e.g. M8015.FIELDS
+        self.attrs = [attr for attr,col in fields]
+        self.columns = [col for attr,col in fields]
+        self.cols = None
+        self.keyCols = None
+        self.timeCol = None
+        #[key=key, val=key id], where key ids are in insertion order
+        self.keyIds = dict()
+        self.rowKeys = array('q')
+        #chunks of values and validity of fields, with rows = records and cols = fields
+        self.values = []
+        self.valid = []
+        #chunks of datetime64 period start time, NaT if invalid
+        self.times = []
+        self.allValid = (True,) * len(self.attrs)
+        #number of records skipped as their keys are not integers
+        self.numInvalidKeys = 0
+
+    def __len__(self):
+        return len(self.rowKeys)
+
+    def bind(self, header, keyColumns=()):
+        #header: [key=csv column, val=index]
+        #keyColumns: columns of integer ids used as tuple key, e.g. ('LNBTS_ID', 'LNCEL_ID')
+        self.cols = [header[col] for col in self.columns]
+        self.keyCols = [header[col] for col in keyColumns]
+        self.timeCol = header.get(PmRecordTable.TIME_COLUMN)
+
+    def addChunk(self, chunk):
+        #chunk: list of fields of each row, either csv tokens or typed values(e.g. fetched by NgSqlQuery)
+        cols = self.keyCols
+        getKey = itemgetter(*cols) if len(cols) > 1 else lambda tokens: (tokens[cols[0]],)
+        keys = [getKey(tokens) for tokens in chunk]
+        try:
+            keys = list(map(tuple, np.array(keys, dtype=np.int64).reshape(-1, len(cols)).tolist()))
+        except (ValueError, TypeError):
+            #skip records with invalid ids, e.g. empty ECI_ID
+            rows = []
+            validKeys = []
+            for key,tokens in zip(keys, chunk):
+                try:
+                    validKeys.append(tuple(map(int, key)))
+                    rows.append(tokens)
+                except (ValueError, TypeError):
+                    self.numInvalidKeys = self.numInvalidKeys + 1
+            keys = validKeys
+            chunk = rows
+        self.addRows(keys, chunk)
+
+    def addRows(self, keys, rows):
+        #keys: key of each row, rows: list of csv fields of each row
+        keyIds = self.keyIds
+        self.rowKeys.extend([keyIds.setdefault(key, len(keyIds)) for key in keys])
+
+        #convert the whole chunk at once, and fall back to row by row(then field by field) conversion only if it has invalid fields
+        getFields = itemgetter(*self.cols) if len(self.cols) > 1 else lambda tokens: (tokens[self.cols[0]],)
+        fields = [getFields(tokens) for tokens in rows]
+        try:
+            values = np.array(fields, dtype=np.int64).reshape(-1, len(self.cols))
+            valid = np.ones(values.shape, dtype=bool)
+        except (ValueError, TypeError):
+            values = []
+            valid = []
+            for row in fields:
+                try:
+                    values.append(tuple(map(int, row)))
+                    valid.append(self.allValid)
+                except (ValueError, TypeError):
+                    rowValues = []
+                    rowValid = []
+                    for field in row:
+                        try:
+                            rowValues.append(int(field))
+                            rowValid.append(True)
+                        except (ValueError, TypeError):
+                            rowValues.append(0)
+                            rowValid.append(False)
+                    values.append(rowValues)
+                    valid.append(rowValid)
+            values = np.array(values, dtype=np.int64).reshape(-1, len(self.cols))
+            valid = np.array(valid, dtype=bool).reshape(-1, len(self.cols))
+        self.values.append(values)
+        self.valid.append(valid)
+
+        if self.timeCol is not None:
+            times = [tokens[self.timeCol] for tokens in rows]
+            try:
+                times = np.array(times, dtype='datetime64[m]')
+            except (ValueError, TypeError):
+                times = np.array([self.parseTime(t) for t in times], dtype='datetime64[m]')
+            self.times.append(times)
+
+    def parseTime(self, text):
+        try:
+            return np.datetime64(text, 'm')
+        except (ValueError, TypeError):
+            return np.datetime64('NaT', 'm')
+
+    def aggregate(self, cls, avgAttrs=(), maxAttrs=()):
+        '''
+        Aggregate records of each key into an instance of cls, and return [key=key, val=aggregated cls].
+        Fields are summed by default, or averaged for avgAttrs(rounded to 2 decimals, 'DIV0' if no valid record), or maximized for maxAttrs.
+        Invalid fields are excluded field by field.
+        '''
+        aggData = dict()
+        if len(self.rowKeys) == 0:
+            return aggData
+
+        rowKeys = np.frombuffer(self.rowKeys, dtype=np.int64)
+        order = np.argsort(rowKeys, kind='stable')
+        #each key has at least one record, so groups are in the order of key ids
+        starts = np.flatnonzero(np.r_[True, np.diff(rowKeys[order]) != 0])
+        values = np.concatenate(self.values)[order]
+        valid = np.concatenate(self.valid)[order]
+        values = np.where(valid, values, 0)
+
+        sums = np.add.reduceat(values, starts, axis=0).tolist()
+        counts = np.add.reduceat(valid.astype(np.int64), starts, axis=0).tolist()
+        maxs = np.maximum.reduceat(values, starts, axis=0).tolist() if len(maxAttrs) > 0 else None
+
+        for i,key in enumerate(self.keyIds.keys()):
+            t = cls()
+            for j,attr in enumerate(self.attrs):
+                if attr in avgAttrs:
+                    setattr(t, attr, round(sums[i][j] / counts[i][j], 2) if counts[i][j] > 0 else 'DIV0')
+                elif attr in maxAttrs:
+                    setattr(t, attr, maxs[i][j])
+                else:
+                    setattr(t, attr, sums[i][j])
+            aggData[key] = t
+
+        return aggData
+
+    def series(self, bucket='hour'):
+        '''
+        Sum records of each key per time bucket('hour' or 'day'), records of invalid time are excluded.
+        Return (keyIds, buckets, sums) sorted by key id and then bucket, where each row is a (key, bucket) with records:
+        keyIds: int64 array of key id, i.e. index of keyIds.keys()
+        buckets: datetime64 array of bucket start time
+        sums: int64 array of summed fields(invalid fields as 0), with rows = (key, bucket) and cols = fields
+        '''
+        unit = PmRecordTable.BUCKETS[bucket]
+        if len(self.rowKeys) == 0 or len(self.times) == 0:
+            return (np.zeros(0, dtype=np.int64), np.zeros(0, dtype='datetime64[%s]' % unit), np.zeros((0, len(self.attrs)), dtype=np.int64))
+
+        times = np.concatenate(self.times)
+        timeValid = ~np.isnat(times)
+        rowKeys = np.frombuffer(self.rowKeys, dtype=np.int64)[timeValid]
+        rowBuckets = times[timeValid].astype('datetime64[%s]' % unit).astype(np.int64)
+        values = np.where(np.concatenate(self.valid), np.concatenate(self.values), 0)[timeValid]
+        if len(rowKeys) == 0:
+            return (rowKeys, rowBuckets.astype('datetime64[%s]' % unit), values)
+
+        order = np.lexsort((rowBuckets, rowKeys))
+        rowKeys = rowKeys[order]
+        rowBuckets = rowBuckets[order]
+        starts = np.flatnonzero(np.r_[True, (np.diff(rowKeys) != 0) | (np.diff(rowBuckets) != 0)])
+        sums = np.add.reduceat(values[order], starts, axis=0)
+
+        return (rowKeys[starts], rowBuckets[starts].astype('datetime64[%s]' % unit), sums)
+
+def makeEci(enbId, lcrId):
+    return 256 * enbId + lcrId
+
+def splitEci(eci):
+    #return (enbId, lcrId) of eci
+    return divmod(eci, 256)
+
+def loadPmCsv(fn, fields, keyColumns):
+    '''
+    Load per-period records of a measurement from csv into a PmRecordTable, which can be run in worker processes.
+    fields: list of (attribute, csv column) of counters
+    keyColumns: csv columns of integer ids used as tuple key, e.g. ('LNBTS_ID', 'LNCEL_ID')
+    '''
+    table = PmRecordTable(fields)
+    with CsvStream(fn) as f:
+        table.bind(f.header, keyColumns)
+        for chunk in f.chunks():
+            table.addChunk(chunk)
+
+    return table
+
+#analyzer inherited by forked worker processes of NgM8015Proc.runUseCases
+forkedProc = None
+
+def execUseCase(name, kwargs):
+    '''
+    Run use case(i.e. method name of NgM8015Proc) of forkedProc in a worker process, and return (logs, elapsed seconds).
+    '''
+    forkedProc.logs = []
+    tStart = time.perf_counter()
+    try:
+        getattr(forkedProc, name)(**kwargs)
+    except Exception as e:
+        forkedProc.log(traceback.format_exc())
+
+    return (forkedProc.logs, time.perf_counter() - tStart)
+
+def loadAggPmCsv(fn, cls, keyColumns, avgAttrs=()):
+    '''
+    Load records aggregated by DB(see makeAggQueries) from csv, and return [key=tuple of key columns, val=aggregated cls], same as PmRecordTable.aggregate.
+    Invalid fields(e.g. empty of NULL) are 0, or 'DIV0' for avgAttrs, which are rounded to 2 decimals as PmRecordTable.aggregate does.
+    '''
+    aggData = dict()
+    with CsvStream(fn) as f:
+        d = f.header
+        cols = [d[col] for col in keyColumns]
+        fields = [(attr, d[col], attr in avgAttrs) for attr,col in cls.FIELDS]
+        for tokens in f:
+            try:
+                key = tuple([int(tokens[col]) for col in cols])
+            except ValueError:
+                continue
+
+            t = cls()
+            for attr,col,isAvg in fields:
+                try:
+                    setattr(t, attr, round(float(tokens[col]), 2) if isAvg else int(tokens[col]))
+                except ValueError:
+                    #integer sum may be exported as float, e.g. '12.0'
+                    try:
+                        setattr(t, attr, 'DIV0' if isAvg else int(float(tokens[col])))
+                    except ValueError:
+                        setattr(t, attr, 0)
+            aggData[key] = t
+
+    return aggData
+
+def makeAggQueries():
+    '''
+    Return [key=sql file, val=(key columns, [(column, aggregation expression)])] of M80xx queries, so that NgSqlQuery can aggregate them by DB.
+    Counters are summed, or averaged and maximized for NgM8015Proc.PM_AGGS, same as PmRecordTable.aggregate.
+    Averages are fetched unrounded and rounded by loadAggPmCsv in python, since ROUND of Oracle/SQLite rounds half away from zero.
+    '''
+    aggQueries = dict()
+    for meas,(fn, cls, keyColumns) in NgM8015Proc.PM_CSVS.items():
+        avgAttrs, maxAttrs = NgM8015Proc.PM_AGGS.get(meas, ((), ()))
+        aggs = []
+        for attr,col in cls.FIELDS:
+            if attr in avgAttrs:
+                aggs.append((col, 'AVG(%s)' % col))
+            elif attr in maxAttrs:
+                aggs.append((col, 'MAX(%s)' % col))
+            else:
+                aggs.append((col, 'SUM(%s)' % col))
+        aggQueries[fn.replace('.csv', '.sql')] = (keyColumns, aggs)
+
+    return aggQueries
+
+def makeUseCases(topN=None, groupBy=None):
+    '''
+    Return NgM8015Proc.USE_CASES with topN(0 for all relations) and/or groupBy of user case#2 overridden unless None, see procUserCase02.
+    '''
+    useCases = []
+    for name,kwargs in NgM8015Proc.USE_CASES:
+        if name == 'procUserCase02':
+            kwargs = dict(kwargs)
+            if topN is not None:
+                kwargs['topN'] = topN if topN > 0 else None
+            if groupBy is not None:
+                kwargs['groupBy'] = groupBy
+        useCases.append((name, kwargs))
+
+    return useCases
+
 class NgM8015Proc(object):
-    def __init__(self, ngwin):
+    #[key=measurement, val=(csv, record class, key columns)]
+    PM_CSVS = {'M8015':('neds_m8015.csv', M8015, ('LNBTS_ID', 'LNCEL_ID', 'ECI_ID')),
+               'M8001':('neds_m8001.csv', M8001, ('LNBTS_ID', 'LNCEL_ID')),
+               'M8005':('neds_m8005.csv', M8005, ('LNBTS_ID', 'LNCEL_ID')),
+               'M8006':('neds_m8006.csv', M8006, ('LNBTS_ID', 'LNCEL_ID')),
+               'M8007':('neds_m8007.csv', M8007, ('LNBTS_ID', 'LNCEL_ID')),
+               'M8013':('neds_m8013.csv', M8013, ('LNBTS_ID', 'LNCEL_ID')),
+               'M8051':('neds_m8051.csv', M8051, ('LNBTS_ID', 'LNCEL_ID'))}
+
+    #[key=measurement, val=(avgAttrs, maxAttrs)] of counters which are not summed when aggregated
+    PM_AGGS = {'M8005':(('avgRssiPucch', 'avgRssiPusch', 'avgSinrPucch', 'avgSinrPusch'), ()),
+               'M8051':(('avgUeRrcConn', 'avgUeAct'), ('maxUeRrcConn', 'maxUeAct'))}
+
+    #default max number of relations(per group) exported by user case#2
+    HO_TOP_N = 500
+
+    #use cases run by runUseCases, [(method, kwargs)]
+    USE_CASES = [('procUserCase01', {}),
+                 ('procUserCase02', {'topN':HO_TOP_N}),
+                 ('procUserCase03', {}),
+                 ('procUserCase04', {}),
+                 ('procUserCase05', {})]
+
+    def __init__(self, ngwin, numWorkers=None, aggregated=False, outDir=None):
         self.ngwin = ngwin
-
+        #whether M80xx csv are aggregated by DB(see makeAggQueries), where per-period records(e.g. for user case#5) are unavailable
+        self.aggregated = aggregated
+        #directory of query results(csv) and reports, defaults to the output directory of the toolset, same as NgSqlQuery
+        self.outDir = outDir if outDir is not None else os.path.join(os.path.dirname(os.path.abspath(__file__)), 'output')
+        #number of worker processes used to load M80xx csv, use 1 to load in the current process
+        self.numWorkers = numWorkers if numWorkers is not None else min(len(NgM8015Proc.PM_CSVS), os.cpu_count())
+        #logs are collected instead of displayed when running in worker processes, see execUseCase
+        self.logs = None
+        #per-period records of M80xx fed by NgSqlQuery, which needn't be loaded from csv, [key=measurement, val=PmRecordTable]
+        self.fedData = dict()
+
+        #ids(lnbts_id, lncel_id, enb_id, lcr_id and eci) are converted to int when loaded, and keys of relations are tuples of them
         #connection defined as below:
         #m8015Data.key.lncel_id == lncelData.key
-        #m8015Data.key.lncel_id == lnhoifData.key
+        #m8015Data.key.lncel_id == lnhoifData.key.lncel_id
         #m8015Data.key.lncel_id == lnrelData.key.lncel_id
-        #m8015Data.key.lnbts_id == lnadjData.key
-        #m8015Data.key.lnbts_id == lnadjlData.key
-        self.m8015Data= dict() #[key='m8015.lnbts_id+m8015.lncel_id+m8015.eci_id', val=list of M8015]
-        self.m8015AggData= dict() #[key='m8015.lnbts_id+m8015.lncel_id+m8015.eci_id', val=aggregated M8015]
+        #m8015Data.key.lnbts_id == lnadjData.key.lnbts_id
+        #m8015Data.key.lnbts_id == lnadjlData.key.lnbts_id
+        self.m8015Data= PmRecordTable(M8015.FIELDS) #per-period M8015 of [key=(m8015.lnbts_id, m8015.lncel_id, m8015.eci_id)]
+        self.m8015AggData= dict() #[key=(m8015.lnbts_id, m8015.lncel_id, m8015.eci_id), val=aggregated M8015]
 
-        self.m8001Data= dict() #[key='m8001.lnbts_id+m8001.lncel_id', val=list of M8001]
-        self.m8001AggData= dict() #[key='m8001.lnbts_id+m8001.lncel_id', val=aggregated M8001]
+        self.m8001Data= PmRecordTable(M8001.FIELDS) #per-period M8001 of [key=(m8001.lnbts_id, m8001.lncel_id)]
+        self.m8001AggData= dict() #[key=(m8001.lnbts_id, m8001.lncel_id), val=aggregated M8001]
 
-        self.m8007Data= dict() #[key='m8007.lnbts_id+m8007.lncel_id', val=list of M8007]
-        self.m8007AggData= dict() #[key='m8007.lnbts_id+m8007.lncel_id', val=aggregated M8007]
+        self.m8007Data= PmRecordTable(M8007.FIELDS) #per-period M8007 of [key=(m8007.lnbts_id, m8007.lncel_id)]
+        self.m8007AggData= dict() #[key=(m8007.lnbts_id, m8007.lncel_id), val=aggregated M8007]
 
-        self.m8005Data= dict() #[key='m8005.lnbts_id+m8005.lncel_id', val=list of M8005]
-        self.m8005AggData= dict() #[key='m8005.lnbts_id+m8005.lncel_id', val=aggregated M8005]
+        self.m8005Data= PmRecordTable(M8005.FIELDS) #per-period M8005 of [key=(m8005.lnbts_id, m8005.lncel_id)]
+        self.m8005AggData= dict() #[key=(m8005.lnbts_id, m8005.lncel_id), val=aggregated M8005]
 
-        self.m8006Data= dict() #[key='m8006.lnbts_id+m8006.lncel_id', val=list of M8006]
-        self.m8006AggData= dict() #[key='m8006.lnbts_id+m8006.lncel_id', val=aggregated M8006]
+        self.m8006Data= PmRecordTable(M8006.FIELDS) #per-period M8006 of [key=(m8006.lnbts_id, m8006.lncel_id)]
+        self.m8006AggData= dict() #[key=(m8006.lnbts_id, m8006.lncel_id), val=aggregated M8006]
 
-        self.m8013Data= dict() #[key='m8013.lnbts_id+m8013.lncel_id', val=list of M8013]
-        self.m8013AggData= dict() #[key='m8013.lnbts_id+m8013.lncel_id', val=aggregated M8013]
+        self.m8013Data= PmRecordTable(M8013.FIELDS) #per-period M8013 of [key=(m8013.lnbts_id, m8013.lncel_id)]
+        self.m8013AggData= dict() #[key=(m8013.lnbts_id, m8013.lncel_id), val=aggregated M8013]
 
-        self.m8051Data= dict() #[key='m8051.lnbts_id+m8051.lncel_id', val=list of M8051]
-        self.m8051AggData= dict() #[key='m8051.lnbts_id+m8051.lncel_id', val=aggregated M8051]
+        self.m8051Data= PmRecordTable(M8051.FIELDS) #per-period M8051 of [key=(m8051.lnbts_id, m8051.lncel_id)]
+        self.m8051AggData= dict() #[key=(m8051.lnbts_id, m8051.lncel_id), val=aggregated M8051]
 
         self.lncelData = dict() #[key=lncel.lncel_id, val=Lncel]
-        self.lnadjData = dict() #[key=lnadj.lnbts_id, val=Lnadj]
-        self.lnadjlData = dict() #[key=lnadjl.lnbts_id, val=Lnadjl]
-        self.lnhoifData = dict() #[key=lnhoif.lncel_id+lnhoif.if_earfcn, val=Lnhoif]
-        self.irfimData = dict() #[key=irfim.lncel_id+irfim.if_earfcn, val=Irfim]
-        self.lnrelData = dict() #[key='lnrel.lncel_id+lnrel.adj_enb_id+lnrel.adj_lcr_id', val=Lnrel]
-        self.gridData = [] #optional data for atu grid, enbid+lcrid
-
-        self.lnbtsIdLncelIdMap = dict() #[key=ECI, val=lnbts_id+lncel_id]
+        self.lnadjData = dict() #[key=(lnadj.lnbts_id, lnadj.adj_enb_id), val=Lnadj]
+        self.lnadjlData = dict() #[key=(lnadjl.lnbts_id, lnadjl.adj_enb_id, lnadjl.adj_lcr_id), val=Lnadjl]
+        self.lnhoifData = dict() #[key=(lnhoif.lncel_id, lnhoif.if_earfcn), val=Lnhoif]
+        self.irfimData = dict() #[key=(irfim.lncel_id, irfim.if_earfcn), val=Irfim]
+        self.lnrelData = dict() #[key=(lnrel.lncel_id, lnrel.adj_enb_id, lnrel.adj_lcr_id), val=Lnrel]
+        self.gridData = dict() #optional data for atu grids, [key=grid name, val=set of eci]
+
+        self.lnbtsIdLncelIdMap = dict() #[key=eci, val=(lnbts_id, lncel_id)]
         self.earfcnMap = dict() #[key=eci, val=earfcn]
         self.pciMap = dict() #[key=eci, val=pci]
         self.tacMap = dict() #[key=eci, val=tac]
 
         self.m8015Earfcnxy = dict() #[key='earfcnx+earfcny', val=HoStat]
-        self.m8015Ecixy = dict() #[key='ecix+eciy', val=HoStat]
+        self.m8015Ecixy = dict() #[key=(ecix, eciy), val=HoStat]
 
-        self.earfcnLnhoif = dict() #[key=enbid+lcrid, val=list of lnhoif earfcn]
-        self.earfcnIrfim = dict() #[key=enbid+lcrid, val=list of irfim earfcn]
+        self.earfcnLnhoif = dict() #[key=eci, val=list of lnhoif earfcn]
+        self.earfcnIrfim = dict() #[key=eci, val=list of irfim earfcn]
 
         self.ngwin.logEdit.append('<font color=blue>M8015 analyzer initialized!</font>')
 
+    def log(self, text):
+        if self.logs is not None:
+            self.logs.append(text)
+        else:
+            self.ngwin.logEdit.append(text)
+            qApp.processEvents()
+
     def loadCsvData(self):
-        self.loadLncel()
-        self.loadLnadj()
-        self.loadLnadjl()
-        self.loadLnhoif()
-        self.loadIrfim()
-        self.loadLnrel()
-        self.loadM8015()
-        self.loadM8001()
-        self.loadM8005()
-        self.loadM8006()
-        self.loadM8007()
-        self.loadM8013()
-        self.loadM8051()
+        #M80xx csv(unless fed by NgSqlQuery) are loaded by worker processes, while CM csv are loaded by the current process
+        executor = None
+        futures = dict()
+        if self.numWorkers > 1:
+            executor = ProcessPoolExecutor(max_workers=self.numWorkers)
+            for meas in NgM8015Proc.PM_CSVS.keys():
+                if meas in self.fedData:
+                    continue
+                loader, args = self.pmLoader(meas)
+                futures[meas] = executor.submit(loader, *args)
+
+        try:
+            for loader in (self.loadLncel, self.loadLnadj, self.loadLnadjl, self.loadLnhoif, self.loadIrfim, self.loadLnrel):
+                try:
+                    loader()
+                except Exception as e:
+                    self.log(traceback.format_exc())
+
+            for meas in NgM8015Proc.PM_CSVS.keys():
+                try:
+                    self.loadPm(meas, futures.get(meas))
+                except Exception as e:
+                    self.log(traceback.format_exc())
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
         self.loadOpt()
 
+    def feedQuery(self, sqlFn, columns, rows):
+        '''
+        Batch handler of NgSqlQuery, which adds rows fetched by M80xx queries to PmRecordTable directly.
+        columns: list of column names
+        rows: list of typed values of each row, where NULL is None
+        columns and rows are None if the query is restarted(e.g. retried by NgSqlQuery), so rows fed so far are discarded.
+        Note: it's called by worker threads of NgSqlQuery, but each M80xx query is fed by only one thread at a time.
+        '''
+        if self.aggregated:
+            return
+
+        for meas,(fn, cls, keyColumns) in NgM8015Proc.PM_CSVS.items():
+            if fn.replace('.csv', '.sql') == sqlFn:
+                if rows is None:
+                    self.fedData.pop(meas, None)
+                    break
+                if not meas in self.fedData:
+                    self.fedData[meas] = PmRecordTable(cls.FIELDS)
+                    self.fedData[meas].bind(dict(zip(columns, range(len(columns)))), keyColumns)
+                self.fedData[meas].addChunk(rows)
+                break
+
+    def pmLoader(self, meas):
+        #return (function, args) which loads csv of meas, and can be run in worker processes
+        fn, cls, keyColumns = NgM8015Proc.PM_CSVS[meas]
+        if self.aggregated:
+            return (loadAggPmCsv, (os.path.join(self.outDir, fn), cls, keyColumns, NgM8015Proc.PM_AGGS.get(meas, ((), ()))[0]))
+        return (loadPmCsv, (os.path.join(self.outDir, fn), cls.FIELDS, keyColumns))
+
+    def loadPm(self, meas, future=None):
+        #load(or get from future) per-period records of meas and aggregate them, or load records aggregated by DB
+        fn, cls, keyColumns = NgM8015Proc.PM_CSVS[meas]
+        if meas in self.fedData:
+            self.log('Loading %s(fed by query)' % meas)
+            result = self.fedData.pop(meas)
+        elif future is not None:
+            self.log('Loading %s' % os.path.join(self.outDir, fn))
+            result = future.result()
+        else:
+            self.log('Loading %s' % os.path.join(self.outDir, fn))
+            loader, args = self.pmLoader(meas)
+            result = loader(*args)
+
+        if self.aggregated:
+            #records are already aggregated by DB
+            setattr(self, '%sAggData' % meas.lower(), result)
+        else:
+            if result.numInvalidKeys > 0:
+                self.log('-->%d records with invalid %s skipped' % (result.numInvalidKeys, '/'.join(keyColumns)))
+            setattr(self, '%sData' % meas.lower(), result)
+            getattr(self, 'agg%s' % meas)()
+
     def print_(self):
         for key,val in self.lncelData.items():
             print('key=%s,val=%s' % (key, val))
@@ -346,63 +898,62 @@ class NgM8015Proc(object):
             print('key=%s,val=%s' % (key, val))
         for key,val in self.lnrelData.items():
             print('key=%s,val=%s' % (key, val))
-        for key,val in self.m8015Data.items():
+        for key,val in self.m8015AggData.items():
             print('key=%s,val=%s' % (key, val))
 
     def loadOpt(self):
-        try:
-            outDir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
-            with open(os.path.join(outDir, 'grid.csv'), 'r') as f:
-                #print('Loading %s' % f.name)
-                self.ngwin.logEdit.append('Loading %s' % f.name)
-                qApp.processEvents()
-
-                line = f.readline().strip()
-                tokens = line.split(',')
-                d = dict(zip(tokens, range(len(tokens))))
-
-                while True:
-                    line = f.readline().strip()
-                    if not line:
-                        break
-
-                    tokens = line.split(',')
-                    dn = tokens[d['ENBID']] + '_' + tokens[d['LCRID']]
-                    if not dn in self.gridData:
-                        self.gridData.append(dn)
-                    else:
-                        self.ngwin.logEdit.append('-->Duplicate cell found: %s' % dn)
-        except Exception as e:
-            return
+        #each data/grid*.csv defines an atu grid named after the file, e.g. grid_cbd.csv defines grid_cbd
+        inDir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+        for fn in sorted(glob.glob(os.path.join(inDir, 'grid*.csv'))):
+            try:
+                with CsvStream(fn) as f:
+                    #print('Loading %s' % f.name)
+                    self.log('Loading %s' % f.name)
+
+                    d = f.header
+
+                    grid = set()
+                    for tokens in f:
+                        try:
+                            eci = makeEci(int(tokens[d['ENBID']]), int(tokens[d['LCRID']]))
+                        except ValueError:
+                            self.log('-->Invalid cell found: %s' % ','.join(tokens))
+                            continue
+
+                        if not eci in grid:
+                            grid.add(eci)
+                        else:
+                            self.log('-->Duplicate cell found: %d_%d' % splitEci(eci))
+                    self.gridData[os.path.splitext(os.path.basename(fn))[0]] = grid
+            except Exception as e:
+                self.log(traceback.format_exc())
 
     def loadLncel(self):
-        outDir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'output')
+        outDir = self.outDir
         fns = ['neds_lncel_fdd.csv', 'neds_lncel_tdd.csv']
         for fn in fns:
             try:
-                with open(os.path.join(outDir, fn), 'r') as f:
+                with CsvStream(os.path.join(outDir, fn)) as f:
                     #print('Loading %s' % f.name)
-                    self.ngwin.logEdit.append('Loading %s' % f.name)
-                    qApp.processEvents()
+                    self.log('Loading %s' % f.name)
 
-                    #note: use strip to remove the tailing '/n'
-                    line = f.readline().strip()
-                    tokens = line.split(',')
-                    d = dict(zip(tokens, range(len(tokens))))
+                    d = f.header
                     #print(d)
 
-                    while True:
-                        line = f.readline().strip()
-                        if not line:
-                            break
-
-                        tokens = line.split(',')
+                    getIds = itemgetter(d['LNCEL_ID'], d['LNBTS_ID'], d['ENB_ID'], d['LCR_ID'], d['ECI'])
+                    numInvalid = 0
+                    for tokens in f:
+                        try:
+                            lncelId, lnbtsId, enbId, lcrId, eci = map(int, getIds(tokens))
+                        except ValueError:
+                            numInvalid = numInvalid + 1
+                            continue
 
                         t = Lncel()
-                        t.lnbtsId = tokens[d['LNBTS_ID']]
-                        t.enbId = tokens[d['ENB_ID']]
-                        t.lcrId = tokens[d['LCR_ID']]
-                        t.eci = tokens[d['ECI']]
+                        t.lnbtsId = lnbtsId
+                        t.enbId = enbId
+                        t.lcrId = lcrId
+                        t.eci = eci
                         t.earfcn = tokens[d['EARFCN']]
                         t.pci = tokens[d['PCI']]
                         t.tac = tokens[d['TAC']]
@@ -423,85 +974,89 @@ class NgM8015Proc(object):
                         t.hysA1Th2a = tokens[d['HYS_A1_TH2A']]
                         t.a1Ttt = tokens[d['A1_TTT']]
 
-                        self.lncelData[tokens[d['LNCEL_ID']]] = t
+                        self.lncelData[lncelId] = t
+
+                    if numInvalid > 0:
+                        self.log('-->%d rows with invalid ids skipped' % numInvalid)
             except Exception as e:
-                self.ngwin.logEdit.append(traceback.format_exc())
-                qApp.processEvents()
+                self.log(traceback.format_exc())
 
     def loadLnadj(self):
-        outDir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'output')
-        with open(os.path.join(outDir, 'neds_lnadj.csv'), 'r') as f:
+        outDir = self.outDir
+        with CsvStream(os.path.join(outDir, 'neds_lnadj.csv')) as f:
             #print('Loading %s' % f.name)
-            self.ngwin.logEdit.append('Loading %s' % f.name)
-            qApp.processEvents()
+            self.log('Loading %s' % f.name)
 
-            line = f.readline().strip()
-            tokens = line.split(',')
-            d = dict(zip(tokens, range(len(tokens))))
+            d = f.header
             #print(d)
 
-            while True:
-                line = f.readline().strip()
-                if not line:
-                    break
-
-                tokens = line.split(',')
+            getIds = itemgetter(d['LNBTS_ID'], d['ADJ_ENB_ID'])
+            numInvalid = 0
+            for tokens in f:
+                try:
+                    lnbtsId, adjEnbId = map(int, getIds(tokens))
+                except ValueError:
+                    numInvalid = numInvalid + 1
+                    continue
 
                 t = Lnadj()
                 t.coDn = '/'.join(tokens[d['CO_DN']].split('/')[1:])
-                t.adjEnbId = tokens[d['ADJ_ENB_ID']]
+                t.adjEnbId = adjEnbId
                 t.adjEnbIp = tokens[d['ADJ_ENB_IP']]
                 t.x2Stat = tokens[d['X2_STAT']]
 
-                self.lnadjData[tokens[d['LNBTS_ID']] + '_' + tokens[d['ADJ_ENB_ID']]] = t
+                self.lnadjData[(lnbtsId, adjEnbId)] = t
+
+            if numInvalid > 0:
+                self.log('-->%d rows with invalid ids skipped' % numInvalid)
 
     def loadLnadjl(self):
-        outDir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'output')
-        with open(os.path.join(outDir, 'neds_lnadjl.csv'), 'r') as f:
+        outDir = self.outDir
+        with CsvStream(os.path.join(outDir, 'neds_lnadjl.csv')) as f:
             #print('Loading %s' % f.name)
-            self.ngwin.logEdit.append('Loading %s' % f.name)
-            qApp.processEvents()
+            self.log('Loading %s' % f.name)
 
-            line = f.readline().strip()
-            tokens = line.split(',')
-            d = dict(zip(tokens, range(len(tokens))))
+            d = f.header
             #print(d)
 
-            while True:
-                line = f.readline().strip()
-                if not line:
-                    break
-
-                tokens = line.split(',')
+            getIds = itemgetter(d['LNBTS_ID'], d['ADJ_ENB_ID'], d['ADJ_LCR_ID'])
+            numInvalid = 0
+            for tokens in f:
+                try:
+                    lnbtsId, adjEnbId, adjLcrId = map(int, getIds(tokens))
+                except ValueError:
+                    numInvalid = numInvalid + 1
+                    continue
 
                 t = Lnadjl()
                 t.coDn = '/'.join(tokens[d['CO_DN']].split('/')[1:])
-                t.adjEnbId = tokens[d['ADJ_ENB_ID']]
-                t.adjLcrId = tokens[d['ADJ_LCR_ID']]
+                t.adjEnbId = adjEnbId
+                t.adjLcrId = adjLcrId
                 t.adjEarfcn = tokens[d['ADJ_EARFCN']]
                 t.adjPci = tokens[d['ADJ_PCI']]
                 t.adjTac = tokens[d['ADJ_TAC']]
 
-                self.lnadjlData[tokens[d['LNBTS_ID']]] = t
+                self.lnadjlData[(lnbtsId, adjEnbId, adjLcrId)] = t
+
+            if numInvalid > 0:
+                self.log('-->%d rows with invalid ids skipped' % numInvalid)
 
     def loadLnhoif(self):
-        outDir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'output')
-        with open(os.path.join(outDir, 'neds_lnhoif.csv'), 'r') as f:
+        outDir = self.outDir
+        with CsvStream(os.path.join(outDir, 'neds_lnhoif.csv')) as f:
             #print('Loading %s' % f.name)
-            self.ngwin.logEdit.append('Loading %s' % f.name)
-            qApp.processEvents()
+            self.log('Loading %s' % f.name)
 
-            line = f.readline().strip()
-            tokens = line.split(',')
-            d = dict(zip(tokens, range(len(tokens))))
+            d = f.header
             #print(d)
 
-            while True:
-                line = f.readline().strip()
-                if not line:
-                    break
-
-                tokens = line.split(',')
+            numInvalid = 0
+            for tokens in f:
+                try:
+                    lncelId = int(tokens[d['LNCEL_ID']])
+                except ValueError:
+                    numInvalid = numInvalid + 1
+                    continue
 
                 t = Lnhoif()
                 t.coDn = '/'.join(tokens[d['CO_DN']].split('/')[1:])
@@ -517,26 +1072,27 @@ class NgM8015Proc(object):
                 t.ifA5Ttt = tokens[d['IF_A5_TTT']]
                 t.ifMbw = tokens[d['IF_MBW']]
 
-                self.lnhoifData[tokens[d['LNCEL_ID']] + '_' + tokens[d['IF_EARFCN']]] = t
+                self.lnhoifData[(lncelId, t.ifEarfcn)] = t
+
+            if numInvalid > 0:
+                self.log('-->%d rows with invalid ids skipped' % numInvalid)
 
     def loadIrfim(self):
-        outDir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'output')
-        with open(os.path.join(outDir, 'neds_irfim.csv'), 'r') as f:
+        outDir = self.outDir
+        with CsvStream(os.path.join(outDir, 'neds_irfim.csv')) as f:
             #print('Loading %s' % f.name)
-            self.ngwin.logEdit.append('Loading %s' % f.name)
-            qApp.processEvents()
+            self.log('Loading %s' % f.name)
 
-            line = f.readline().strip()
-            tokens = line.split(',')
-            d = dict(zip(tokens, range(len(tokens))))
+            d = f.header
             #print(d)
 
-            while True:
-                line = f.readline().strip()
-                if not line:
-                    break
-
-                tokens = line.split(',')
+            numInvalid = 0
+            for tokens in f:
+                try:
+                    lncelId = int(tokens[d['LNCEL_ID']])
+                except ValueError:
+                    numInvalid = numInvalid + 1
+                    continue
 
                 t = Irfim()
                 t.coDn = '/'.join(tokens[d['CO_DN']].split('/')[1:])
@@ -547,326 +1103,67 @@ class NgM8015Proc(object):
                 t.ifThHigh = tokens[d['IF_TH_HIGH']]
                 t.ifMbw = tokens[d['IF_MBW']]
 
-                self.irfimData[tokens[d['LNCEL_ID']] + '_' + tokens[d['IF_EARFCN']]] = t
+                self.irfimData[(lncelId, t.ifEarfcn)] = t
+
+            if numInvalid > 0:
+                self.log('-->%d rows with invalid ids skipped' % numInvalid)
 
     def loadLnrel(self):
-        outDir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'output')
-        with open(os.path.join(outDir, 'neds_lnrel.csv'), 'r') as f:
+        outDir = self.outDir
+        with CsvStream(os.path.join(outDir, 'neds_lnrel.csv')) as f:
             #print('Loading %s' % f.name)
-            self.ngwin.logEdit.append('Loading %s' % f.name)
-            qApp.processEvents()
+            self.log('Loading %s' % f.name)
 
-            line = f.readline().strip()
-            tokens = line.split(',')
-            d = dict(zip(tokens, range(len(tokens))))
+            d = f.header
             #print(d)
 
-            while True:
-                line = f.readline().strip()
-                if not line:
-                    break
-
-                tokens = line.split(',')
+            getIds = itemgetter(d['LNCEL_ID'], d['ADJ_ENB_ID'], d['ADJ_LCR_ID'])
+            numInvalid = 0
+            for tokens in f:
+                try:
+                    lncelId, adjEnbId, adjLcrId = map(int, getIds(tokens))
+                except ValueError:
+                    numInvalid = numInvalid + 1
+                    continue
 
                 t = Lnrel()
                 t.coDn = '/'.join(tokens[d['CO_DN']].split('/')[1:])
-                t.adjEnbId = tokens[d['ADJ_ENB_ID']]
-                t.adjLcrId = tokens[d['ADJ_LCR_ID']]
+                t.adjEnbId = adjEnbId
+                t.adjLcrId = adjLcrId
                 t.cio = tokens[d['CIO']]
                 t.hoAllowed = tokens[d['HO_ALLOWED']]
                 t.nrStat = tokens[d['NR_STAT']]
 
-                self.lnrelData[tokens[d['LNCEL_ID']] + '_' + tokens[d['ADJ_ENB_ID']] + '_' + tokens[d['ADJ_LCR_ID']]] = t
+                self.lnrelData[(lncelId, adjEnbId, adjLcrId)] = t
 
-    def loadM8015(self):
-        outDir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'output')
-        with open(os.path.join(outDir, 'neds_m8015.csv'), 'r') as f:
-            #print('Loading %s' % f.name)
-            self.ngwin.logEdit.append('Loading %s' % f.name)
-            qApp.processEvents()
-
-            line = f.readline().strip()
-            tokens = line.split(',')
-            d = dict(zip(tokens, range(len(tokens))))
-            #print(d)
-
-            while True:
-                line = f.readline().strip()
-                if not line:
-                    break
-
-                tokens = line.split(',')
-
-                t = M8015()
-                t.periodStartTime = tokens[d['PERIOD_START_TIME']]
-                t.iaHoPrepFail = tokens[d['INTRA_HO_PREP_FAIL_NB']]
-                t.iaHoAtt = tokens[d['INTRA_HO_ATT_NB']]
-                t.iaHoSucc = tokens[d['INTRA_HO_SUCC_NB']]
-                t.iaHoFailTime = tokens[d['INTRA_HO_FAIL_NB']]
-                t.irHoPrepFailOth = tokens[d['INTER_HO_PREP_FAIL_OTH_NB']]
-                t.irHoPrepFailTime = tokens[d['INTER_HO_PREP_FAIL_TIME_NB']]
-                t.irHoPrepFailAc = tokens[d['INTER_HO_PREP_FAIL_AC_NB']]
-                t.irHoPrepFailQci = tokens[d['INTER_HO_PREP_FAIL_QCI_NB']]
-                t.irHoAtt = tokens[d['INTER_HO_ATT_NB']]
-                t.irHoSucc = tokens[d['INTER_HO_SUCC_NB']]
-                t.irHoFailTime = tokens[d['INTER_HO_FAIL_NB']]
-                t.mroLateHo = tokens[d['MRO_LATE_HO_NB']]
-                t.mroEarlyType1Ho = tokens[d['MRO_EARLY_TYPE1_HO_NB']]
-                t.mroEarlyType2Ho = tokens[d['MRO_EARLY_TYPE2_HO_NB']]
-                t.mroPingPongHo = tokens[d['MRO_PING_PONG_HO_NB']]
-                t.ifLbHoAtt = tokens[d['HO_LB_IF_ATT_NB']]
-                t.ifLbHoSucc = tokens[d['HO_LB_IF_SUCC_NB']]
-
-                key = tokens[d['LNBTS_ID']] + '_' + tokens[d['LNCEL_ID']] + '_' + tokens[d['ECI_ID']]
-
-                if not key in self.m8015Data:
-                    self.m8015Data[key] = [t]
-                else:
-                    self.m8015Data[key].append(t)
+            if numInvalid > 0:
+                self.log('-->%d rows with invalid ids skipped' % numInvalid)
 
-        self.aggM8015()
+    def loadM8015(self):
+        self.loadPm('M8015')
 
     def loadM8001(self):
-        outDir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'output')
-        with open(os.path.join(outDir, 'neds_m8001.csv'), 'r') as f:
-            #print('Loading %s' % f.name)
-            self.ngwin.logEdit.append('Loading %s' % f.name)
-            qApp.processEvents()
-
-            line = f.readline().strip()
-            tokens = line.split(',')
-            d = dict(zip(tokens, range(len(tokens))))
-            #print(d)
-
-            while True:
-                line = f.readline().strip()
-                if not line:
-                    break
-
-                tokens = line.split(',')
-
-                t = M8001()
-                t.smallMsg1Att = tokens[d['RACH_STP_ATT_SMALL_MSG']]
-                t.largeMsg1Att = tokens[d['RACH_STP_ATT_LARGE_MSG']]
-                t.dedMsg1Att = tokens[d['RACH_STP_ATT_DEDICATED']]
-                t.rachMsg2 = tokens[d['RACH_STP_COMPLETIONS']]
-
-                key = tokens[d['LNBTS_ID']] + '_' + tokens[d['LNCEL_ID']]
-
-                if not key in self.m8001Data:
-                    self.m8001Data[key] = [t]
-                else:
-                    self.m8001Data[key].append(t)
-
-        self.aggM8001()
+        self.loadPm('M8001')
 
     def loadM8007(self):
-        outDir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'output')
-        with open(os.path.join(outDir, 'neds_m8007.csv'), 'r') as f:
-            # print('Loading %s' % f.name)
-            self.ngwin.logEdit.append('Loading %s' % f.name)
-            qApp.processEvents()
-
-            line = f.readline().strip()
-            tokens = line.split(',')
-            d = dict(zip(tokens, range(len(tokens))))
-            # print(d)
-
-            while True:
-                line = f.readline().strip()
-                if not line:
-                    break
-
-                tokens = line.split(',')
-
-                t = M8007()
-                t.drbSetupAtt= tokens[d['DATA_RB_STP_ATT']]
-                t.drbSetupSucc= tokens[d['DATA_RB_STP_COMP']]
-                t.drbSetupFailTimer= tokens[d['DATA_RB_STP_FAIL']]
-
-                key = tokens[d['LNBTS_ID']] + '_' + tokens[d['LNCEL_ID']]
-
-                if not key in self.m8007Data:
-                    self.m8007Data[key] = [t]
-                else:
-                    self.m8007Data[key].append(t)
-
-        self.aggM8007()
+        self.loadPm('M8007')
 
     def loadM8005(self):
-        outDir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'output')
-        with open(os.path.join(outDir, 'neds_m8005.csv'), 'r') as f:
-            #print('Loading %s' % f.name)
-            self.ngwin.logEdit.append('Loading %s' % f.name)
-            qApp.processEvents()
-
-            line = f.readline().strip()
-            tokens = line.split(',')
-            d = dict(zip(tokens, range(len(tokens))))
-            #print(d)
-
-            while True:
-                line = f.readline().strip()
-                if not line:
-                    break
-
-                tokens = line.split(',')
-
-                t = M8005()
-                t.avgRssiPucch = tokens[d['RSSI_PUCCH_AVG']]
-                t.avgRssiPusch = tokens[d['RSSI_PUSCH_AVG']]
-                t.avgSinrPucch = tokens[d['SINR_PUCCH_AVG']]
-                t.avgSinrPusch = tokens[d['SINR_PUSCH_AVG']]
-
-                key = tokens[d['LNBTS_ID']] + '_' + tokens[d['LNCEL_ID']]
-
-                if not key in self.m8005Data:
-                    self.m8005Data[key] = [t]
-                else:
-                    self.m8005Data[key].append(t)
-
-        self.aggM8005()
+        self.loadPm('M8005')
 
     def loadM8006(self):
-        outDir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'output')
-        with open(os.path.join(outDir, 'neds_m8006.csv'), 'r') as f:
-            #print('Loading %s' % f.name)
-            self.ngwin.logEdit.append('Loading %s' % f.name)
-            qApp.processEvents()
-
-            line = f.readline().strip()
-            tokens = line.split(',')
-            d = dict(zip(tokens, range(len(tokens))))
-            #print(d)
-
-            while True:
-                line = f.readline().strip()
-                if not line:
-                    break
-
-                tokens = line.split(',')
-
-                t = M8006()
-                t.erabSetupAtt = tokens[d['EPS_BEARER_SETUP_ATTEMPTS']]
-                t.erabSetupSucc = tokens[d['EPS_BEARER_SETUP_COMPLETIONS']]
-                t.erabSetupFailRrnaIni = tokens[d['ERAB_INI_SETUP_FAIL_RNL_RRNA']]
-                t.erabSetupFailRrnaAdd = tokens[d['ERAB_ADD_SETUP_FAIL_RNL_RRNA']]
-                t.erabSetupFailTruIni = tokens[d['ERAB_INI_SETUP_FAIL_TNL_TRU']]
-                t.erabSetupFailTruAdd = tokens[d['ERAB_ADD_SETUP_FAIL_TNL_TRU']]
-                t.erabSetupFailUelIni = tokens[d['ERAB_INI_SETUP_FAIL_RNL_UEL']]
-                t.erabSetupFailUelAdd = tokens[d['ERAB_ADD_SETUP_FAIL_RNL_UEL']]
-                t.erabSetupFailRipIni = tokens[d['ERAB_INI_SETUP_FAIL_RNL_RIP']]
-                t.erabSetupFailRipAdd = tokens[d['ERAB_ADD_SETUP_FAIL_RNL_RIP']]
-                t.erabSetupFailUp = tokens[d['ERAB_ADD_SETUP_FAIL_UP']]
-                t.erabSetupFailMob = tokens[d['ERAB_ADD_SETUP_FAIL_RNL_MOB']]
-                t.erabRelQci1Tot = tokens[d['ERAB_REL_ENB_QCI1']]
-                t.erabRelQci1Ina = tokens[d['ERAB_REL_ENB_RNL_INA_QCI1']]
-                t.erabRelQci1UeLost = tokens[d['ERAB_REL_ENB_RNL_UEL_QCI1']]
-                t.erabRelQci1Tru = tokens[d['ERAB_REL_ENB_TNL_TRU_QCI1']]
-                t.erabRelQci1Red = tokens[d['ERAB_REL_ENB_RNL_RED_QCI1']]
-                t.erabRelQci1Eugr = tokens[d['ERAB_REL_ENB_RNL_EUGR_QCI1']]
-                t.erabRelQci1Rrna = tokens[d['ERAB_REL_ENB_RNL_RRNA_QCI1']]
-                t.erabRelQci1HoFail = tokens[d['ERAB_REL_HO_FAIL_TIM_QCI1']]
-                t.erabRelQci1EpcPs = tokens[d['ERAB_REL_EPC_PATH_SWITCH_QCI1']]
-                t.erabRelQci1TnlUnsp = tokens[d['ERAB_REL_ENB_TNL_UNSP_QCI1']]
-
-                key = tokens[d['LNBTS_ID']] + '_' + tokens[d['LNCEL_ID']]
-
-                if not key in self.m8006Data:
-                    self.m8006Data[key] = [t]
-                else:
-                    self.m8006Data[key].append(t)
-
-        self.aggM8006()
+        self.loadPm('M8006')
 
     def loadM8013(self):
-        outDir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'output')
-        with open(os.path.join(outDir, 'neds_m8013.csv'), 'r') as f:
-            #print('Loading %s' % f.name)
-            self.ngwin.logEdit.append('Loading %s' % f.name)
-            qApp.processEvents()
-
-            line = f.readline().strip()
-            tokens = line.split(',')
-            d = dict(zip(tokens, range(len(tokens))))
-            #print(d)
-
-            while True:
-                line = f.readline().strip()
-                if not line:
-                    break
-
-                tokens = line.split(',')
-
-                t = M8013()
-                t.rrcMsg3Mos = tokens[d['SIGN_CONN_ESTAB_ATT_MO_S']]
-                t.rrcMsg3Mt = tokens[d['SIGN_CONN_ESTAB_ATT_MT']]
-                t.rrcMsg3Mod = tokens[d['SIGN_CONN_ESTAB_ATT_MO_D']]
-                t.rrcMsg3Emg = tokens[d['SIGN_CONN_ESTAB_ATT_EMG']]
-                t.rrcMsg3HiPrio = tokens[d['SIGN_CONN_ESTAB_ATT_HIPRIO']]
-                t.rrcMsg3DelTol = tokens[d['SIGN_CONN_ESTAB_ATT_DEL_TOL']]
-                t.rrcMsg5 = tokens[d['SIGN_CONN_ESTAB_COMP']]
-
-                key = tokens[d['LNBTS_ID']] + '_' + tokens[d['LNCEL_ID']]
-
-                if not key in self.m8013Data:
-                    self.m8013Data[key] = [t]
-                else:
-                    self.m8013Data[key].append(t)
-
-        self.aggM8013()
+        self.loadPm('M8013')
 
     def loadM8051(self):
-        outDir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'output')
-        with open(os.path.join(outDir, 'neds_m8051.csv'), 'r') as f:
-            #print('Loading %s' % f.name)
-            self.ngwin.logEdit.append('Loading %s' % f.name)
-            qApp.processEvents()
-
-            line = f.readline().strip()
-            tokens = line.split(',')
-            d = dict(zip(tokens, range(len(tokens))))
-            #print(d)
-
-            while True:
-                line = f.readline().strip()
-                if not line:
-                    break
-
-                tokens = line.split(',')
-
-                t = M8051()
-                t.avgUeRrcConn = tokens[d['RRC_CONNECTED_UE_AVG']]
-                t.maxUeRrcConn = tokens[d['RRC_CONNECTED_UE_MAX']]
-                t.avgUeAct = tokens[d['CELL_LOAD_ACTIVE_UE_AVG']]
-                t.maxUeAct = tokens[d['CELL_LOAD_ACTIVE_UE_MAX']]
-
-                key = tokens[d['LNBTS_ID']] + '_' + tokens[d['LNCEL_ID']]
-
-                if not key in self.m8051Data:
-                    self.m8051Data[key] = [t]
-                else:
-                    self.m8051Data[key].append(t)
-
-        self.aggM8051()
+        self.loadPm('M8051')
 
     def aggM8001(self):
-        self.ngwin.logEdit.append('Aggregating M8001')
-        qApp.processEvents()
-
-        for key,val in self.m8001Data.items():
-            t = M8001()
-            for rec in val:
-                try:
-                    t.smallMsg1Att = t.smallMsg1Att + int(rec.smallMsg1Att)
-                    t.largeMsg1Att = t.largeMsg1Att + int(rec.largeMsg1Att)
-                    t.dedMsg1Att = t.dedMsg1Att + int(rec.dedMsg1Att)
-                    t.rachMsg2 = t.rachMsg2 + int(rec.rachMsg2)
-                except Exception as e:
-                    #ignore ValueError that may raised by int()
-                    continue
+        self.log('Aggregating M8001')
 
-            self.m8001AggData[key] = t
+        self.m8001AggData = self.m8001Data.aggregate(M8001)
 
         '''
         for key,val in self.m8001AggData.items():
@@ -874,21 +1171,9 @@ class NgM8015Proc(object):
         '''
 
     def aggM8007(self):
-        self.ngwin.logEdit.append('Aggregating M8007')
-        qApp.processEvents()
-
-        for key, val in self.m8007Data.items():
-            t = M8007()
-            for rec in val:
-                try:
-                    t.drbSetupAtt = t.drbSetupAtt + int(rec.drbSetupAtt)
-                    t.drbSetupSucc = t.drbSetupSucc + int(rec.drbSetupSucc)
-                    t.drbSetupFailTimer = t.drbSetupFailTimer + int(rec.drbsetupFailTimer)
-                except Exception as e:
-                    # ignore ValueError that may raised by int()
-                    continue
+        self.log('Aggregating M8007')
 
-            self.m8007AggData[key] = t
+        self.m8007AggData = self.m8007Data.aggregate(M8007)
 
         '''
         for key,val in self.m8007AggData.items():
@@ -896,33 +1181,10 @@ class NgM8015Proc(object):
         '''
 
     def aggM8005(self):
-        self.ngwin.logEdit.append('Aggregating M8005')
-        qApp.processEvents()
-
-        for key,val in self.m8005Data.items():
-            t = M8005()
-            cnt = 0
-            for rec in val:
-                try:
-                    t.avgRssiPucch = t.avgRssiPucch + int(rec.avgRssiPucch)
-                    t.avgRssiPusch = t.avgRssiPusch + int(rec.avgRssiPusch)
-                    t.avgSinrPucch = t.avgSinrPucch + int(rec.avgSinrPucch)
-                    t.avgSinrPusch = t.avgSinrPusch + int(rec.avgSinrPusch)
-                    cnt = cnt + 1
-                except Exception as e:
-                    #ignore ValueError that may raised by int()
-                    continue
-
-            if cnt > 0:
-                t.avgRssiPucch = round(t.avgRssiPucch / cnt, 2)
-                t.avgRssiPusch = round(t.avgRssiPusch / cnt, 2)
-                t.avgSinrPucch = round(t.avgSinrPucch / cnt, 2)
-                t.avgSinrPusch = round(t.avgSinrPusch / cnt, 2)
-            else:
-                t.avgRssiPucch, t.avgRssiPusch, t.avgSinrPucch, t.avgSinrPusch = ('DIV0', 'DIV0', 'DIV0', 'DIV0')
+        self.log('Aggregating M8005')
 
-
-            self.m8005AggData[key] = t
+        avgAttrs, maxAttrs = NgM8015Proc.PM_AGGS['M8005']
+        self.m8005AggData = self.m8005Data.aggregate(M8005, avgAttrs, maxAttrs)
 
         '''
         for key,val in self.m8005AggData.items():
@@ -930,40 +1192,9 @@ class NgM8015Proc(object):
         '''
 
     def aggM8006(self):
-        self.ngwin.logEdit.append('Aggregating M8006')
-        qApp.processEvents()
-
-        for key,val in self.m8006Data.items():
-            t = M8006()
-            for rec in val:
-                try:
-                    t.erabSetupAtt = t.erabSetupAtt + int(rec.erabSetupAtt)
-                    t.erabSetupSucc = t.erabSetupSucc + int(rec.erabSetupSucc)
-                    t.erabSetupFailRrnaIni = t.erabSetupFailRrnaIni + int(rec.erabSetupFailRrnaIni)
-                    t.erabSetupFailRrnaAdd = t.erabSetupFailRrnaAdd + int(rec.erabSetupFailRrnaAdd)
-                    t.erabSetupFailTruIni = t.erabSetupFailTruIni + int(rec.erabSetupFailTruIni)
-                    t.erabSetupFailTruAdd = t.erabSetupFailTruAdd + int(rec.erabSetupFailTruAdd)
-                    t.erabSetupFailUelIni = t.erabSetupFailUelIni + int(rec.erabSetupFailUelIni)
-                    t.erabSetupFailUelAdd = t.erabSetupFailUelAdd + int(rec.erabSetupFailUelAdd)
-                    t.erabSetupFailRipIni = t.erabSetupFailRipIni + int(rec.erabSetupFailRipIni)
-                    t.erabSetupFailRipAdd = t.erabSetupFailRipAdd + int(rec.erabSetupFailRipAdd)
-                    t.erabSetupFailUp = t.erabSetupFailUp + int(rec.erabSetupFailUp)
-                    t.erabSetupFailMob = t.erabSetupFailMob + int(rec.erabSetupFailMob)
-                    t.erabRelQci1Tot = t.erabRelQci1Tot + int(rec.erabRelQci1Tot)
-                    t.erabRelQci1Ina = t.erabRelQci1Ina + int(rec.erabRelQci1Ina)
-                    t.erabRelQci1UeLost = t.erabRelQci1UeLost + int(rec.erabRelQci1UeLost)
-                    t.erabRelQci1Tru = t.erabRelQci1Tru + int(rec.erabRelQci1Tru)
-                    t.erabRelQci1Red = t.erabRelQci1Red + int(rec.erabRelQci1Red)
-                    t.erabRelQci1Eugr = t.erabRelQci1Eugr + int(rec.erabRelQci1Eugr)
-                    t.erabRelQci1Rrna = t.erabRelQci1Rrna + int(rec.erabRelQci1Rrna)
-                    t.erabRelQci1HoFail = t.erabRelQci1HoFail + int(rec.erabRelQci1HoFail)
-                    t.erabRelQci1EpcPs = t.erabRelQci1EpcPs + int(rec.erabRelQci1EpcPs)
-                    t.erabRelQci1TnlUnsp = t.erabRelQci1TnlUnsp + int(rec.erabRelQci1TnlUnsp)
-                except Exception as e:
-                    #ignore ValueError that may raised by int()
-                    continue
+        self.log('Aggregating M8006')
 
-            self.m8006AggData[key] = t
+        self.m8006AggData = self.m8006Data.aggregate(M8006)
 
         '''
         for key,val in self.m8006AggData.items():
@@ -971,25 +1202,9 @@ class NgM8015Proc(object):
         '''
 
     def aggM8013(self):
-        self.ngwin.logEdit.append('Aggregating M8013')
-        qApp.processEvents()
+        self.log('Aggregating M8013')
 
-        for key,val in self.m8013Data.items():
-            t = M8013()
-            for rec in val:
-                try:
-                    t.rrcMsg3Mos = t.rrcMsg3Mos + int(rec.rrcMsg3Mos)
-                    t.rrcMsg3Mt = t.rrcMsg3Mt + int(rec.rrcMsg3Mt)
-                    t.rrcMsg3Mod = t.rrcMsg3Mod + int(rec.rrcMsg3Mod)
-                    t.rrcMsg3Emg = t.rrcMsg3Emg + int(rec.rrcMsg3Emg)
-                    t.rrcMsg3HiPrio = t.rrcMsg3HiPrio + int(rec.rrcMsg3HiPrio)
-                    t.rrcMsg3DelTol = t.rrcMsg3DelTol + int(rec.rrcMsg3DelTol)
-                    t.rrcMsg5 = t.rrcMsg5 + int(rec.rrcMsg5)
-                except Exception as e:
-                    #ignore ValueError that may raised by int()
-                    continue
-
-            self.m8013AggData[key] = t
+        self.m8013AggData = self.m8013Data.aggregate(M8013)
 
         '''
         for key,val in self.m8013AggData.items():
@@ -997,30 +1212,10 @@ class NgM8015Proc(object):
         '''
 
     def aggM8051(self):
-        self.ngwin.logEdit.append('Aggregating M8051')
-        qApp.processEvents()
-
-        for key,val in self.m8051Data.items():
-            t = M8051()
-            cnt = 0
-            for rec in val:
-                try:
-                    t.avgUeRrcConn = t.avgUeRrcConn + int(rec.avgUeRrcConn)
-                    t.maxUeRrcConn = max(t.maxUeRrcConn, int(rec.maxUeRrcConn))
-                    t.avgUeAct = t.avgUeAct + int(rec.avgUeAct)
-                    t.maxUeAct = max(t.maxUeAct, int(rec.maxUeAct))
-                    cnt = cnt + 1
-                except Exception as e:
-                    #ignore ValueError that may raised by int()
-                    continue
-
-            if cnt > 0:
-                t.avgUeRrcConn = round(t.avgUeRrcConn / cnt, 2)
-                t.avgUeAct = round(t.avgUeAct / cnt, 2)
-            else:
-                t.avgUeRrcConn, t.avgUeAct = ('DIV0', 'DIV0')
+        self.log('Aggregating M8051')
 
-            self.m8051AggData[key] = t
+        avgAttrs, maxAttrs = NgM8015Proc.PM_AGGS['M8051']
+        self.m8051AggData = self.m8051Data.aggregate(M8051, avgAttrs, maxAttrs)
 
         '''
         for key,val in self.m8051AggData.items():
@@ -1029,35 +1224,9 @@ class NgM8015Proc(object):
 
     def aggM8015(self):
         #print('Aggregating M8015')
-        self.ngwin.logEdit.append('Aggregating M8015')
-        qApp.processEvents()
+        self.log('Aggregating M8015')
 
-        for key,val in self.m8015Data.items():
-            t = M8015()
-            for rec in val:
-                try:
-                    t.iaHoPrepFail = t.iaHoPrepFail + int(rec.iaHoPrepFail)
-                    t.iaHoAtt = t.iaHoAtt + int(rec.iaHoAtt)
-                    t.iaHoSucc = t.iaHoSucc + int(rec.iaHoSucc)
-                    t.iaHoFailTime = t.iaHoFailTime + int(rec.iaHoFailTime)
-                    t.irHoPrepFailOth = t.irHoPrepFailOth + int(rec.irHoPrepFailOth)
-                    t.irHoPrepFailTime = t.irHoPrepFailTime + int(rec.irHoPrepFailTime)
-                    t.irHoPrepFailAc = t.irHoPrepFailAc + int(rec.irHoPrepFailAc)
-                    t.irHoPrepFailQci = t.irHoPrepFailQci + int(rec.irHoPrepFailQci)
-                    t.irHoAtt = t.irHoAtt + int(rec.irHoAtt)
-                    t.irHoSucc = t.irHoSucc + int(rec.irHoSucc)
-                    t.irHoFailTime = t.irHoFailTime + int(rec.irHoFailTime)
-                    t.mroLateHo = t.mroLateHo + int(rec.mroLateHo)
-                    t.mroEarlyType1Ho = t.mroEarlyType1Ho + int(rec.mroEarlyType1Ho)
-                    t.mroEarlyType2Ho = t.mroEarlyType2Ho + int(rec.mroEarlyType2Ho)
-                    t.mroPingPongHo = t.mroPingPongHo + int(rec.mroPingPongHo)
-                    t.ifLbHoAtt = t.ifLbHoAtt + int(rec.ifLbHoAtt)
-                    t.ifLbHoSucc = t.ifLbHoSucc + int(rec.ifLbHoSucc)
-                except Exception as e:
-                    #ignore ValueError that may raised by int()
-                    continue
-
-            self.m8015AggData[key] = t
+        self.m8015AggData = self.m8015Data.aggregate(M8015)
 
         '''
         for key,val in self.m8015AggData.items():
@@ -1066,11 +1235,10 @@ class NgM8015Proc(object):
 
     def makeEciMap(self):
         #print('Making per ECI map')
-        self.ngwin.logEdit.append('Making per ECI map')
-        qApp.processEvents()
+        self.log('Making per ECI map')
 
         for key,val in self.lncelData.items():
-            self.lnbtsIdLncelIdMap[val.eci] = val.lnbtsId + '_' + key
+            self.lnbtsIdLncelIdMap[val.eci] = (val.lnbtsId, key)
 
             if not val.eci in self.earfcnMap:
                 self.earfcnMap[val.eci] = val.earfcn
@@ -1078,27 +1246,63 @@ class NgM8015Proc(object):
                 self.tacMap[val.eci] = val.tac
 
         for key,val in self.lnadjlData.items():
-            eci = 256*val.adjEnbId+val.adjLcrId
+            eci = makeEci(val.adjEnbId, val.adjLcrId)
             if not eci in self.earfcnMap:
                 self.earfcnMap[eci] = val.adjEarfcn
                 self.pciMap[eci] = val.adjPci
                 self.tacMap[eci] = val.adjTac
 
+    def runUseCases(self, useCases=None):
+        '''
+        Run use cases concurrently in forked worker processes, which share loaded data and maps(e.g. makeEciMap) by copy-on-write.
+        Use cases are run one by one if numWorkers is 1 or fork is unavailable(e.g. on Windows).
+        useCases: list of (method, kwargs), defaults to USE_CASES
+        Return [key=method, val=elapsed seconds]
+        '''
+        global forkedProc
+        if useCases is None:
+            useCases = NgM8015Proc.USE_CASES
+
+        timings = dict()
+        if self.numWorkers > 1 and len(useCases) > 1 and 'fork' in multiprocessing.get_all_start_methods():
+            forkedProc = self
+            #move loaded data to the permanent generation, so that gc in workers doesn't touch(and copy) its pages
+            gc.freeze()
+            executor = ProcessPoolExecutor(max_workers=min(self.numWorkers, len(useCases)), mp_context=multiprocessing.get_context('fork'))
+            try:
+                futures = dict()
+                for name,kwargs in useCases:
+                    futures[executor.submit(execUseCase, name, kwargs)] = name
+
+                #logs of a use case are displayed once it's done
+                for future in as_completed(futures):
+                    name = futures[future]
+                    logs, timings[name] = future.result()
+                    for text in logs:
+                        self.log(text)
+                    self.log('-->%s done in %.2fs' % (name, timings[name]))
+            finally:
+                executor.shutdown()
+                gc.unfreeze()
+                forkedProc = None
+        else:
+            for name,kwargs in useCases:
+                tStart = time.perf_counter()
+                try:
+                    getattr(self, name)(**kwargs)
+                except Exception as e:
+                    self.log(traceback.format_exc())
+                timings[name] = time.perf_counter() - tStart
+                self.log('-->%s done in %.2fs' % (name, timings[name]))
+
+        return timings
+
     def procUserCase01(self):
         #print('Performing analysis for user case #01: per earfcn hosr')
-        self.ngwin.logEdit.append('<font color=blue>Performing analysis for user case #01: per earfcn hosr</font>')
-        qApp.processEvents()
+        self.log('<font color=blue>Performing analysis for user case #01: per earfcn hosr</font>')
 
         #user case#1: EARFCNx -> EARFCNy HOSR analysis
-        for key,val in self.m8015AggData.items():
-            tokens = key.split('_')
-            if len(tokens) == 3:
-                lnbtsId = tokens[0]
-                lncelId = tokens[1]
-                eci = tokens[2]
-            else:
-                continue
-
+        for (lnbtsId, lncelId, eci),val in self.m8015AggData.items():
             if not lncelId in self.lncelData:
                 continue
 
@@ -1122,10 +1326,9 @@ class NgM8015Proc(object):
             self.m8015Earfcnxy[key].irHoAtt = self.m8015Earfcnxy[key].irHoAtt + val.irHoAtt
             self.m8015Earfcnxy[key].irHoSucc = self.m8015Earfcnxy[key].irHoSucc + val.irHoSucc
 
-        outDir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'output')
+        outDir = self.outDir
         with open(os.path.join(outDir, 'm8015_per_earfcn_%s.csv' % time.strftime('%Y%m%d_%H%M%S', time.localtime())), 'w') as f:
-            self.ngwin.logEdit.append('-->Exporting results to: %s' % f.name)
-            qApp.processEvents()
+            self.log('-->Exporting results to: %s' % f.name)
 
             header = ['DN', 'IA_HO_ATT', 'IA_HO_SUCC', 'IR_HO_ATT', 'IR_HO_SUCC', 'HO_ATT_TOT', 'HO_SUCC_TOT', 'HOSR2(%)']
             f.write(','.join(header))
@@ -1144,27 +1347,22 @@ class NgM8015Proc(object):
                 f.write(','.join(line))
                 f.write('\n')
 
-    def procUserCase02(self):
+    def procUserCase02(self, topN=None, groupBy=None):
+        '''
+        topN: max number of relations exported(per group), or None to export all relations with HO attempts
+        groupBy: None, 'earfcn'(of source cell) or 'grid'(atu grids of source cell), top N is selected per group if specified
+        '''
         #print('Performing analysis for user case #02: hosr top n')
-        self.ngwin.logEdit.append('<font color=blue>Performing analysis for user case #02: hosr top n</font>')
-        qApp.processEvents()
+        self.log('<font color=blue>Performing analysis for user case #02: hosr top n</font>')
 
         #user case#2: hosr top n analysis
-        for key,val in self.m8015AggData.items():
-            tokens = key.split('_')
-            if len(tokens) == 3:
-                lnbtsId = tokens[0]
-                lncelId = tokens[1]
-                eci = tokens[2]
-            else:
-                continue
-
+        for (lnbtsId, lncelId, eci),val in self.m8015AggData.items():
             if not lncelId in self.lncelData:
                 continue
 
             eciSrc = self.lncelData[lncelId].eci
 
-            key = eciSrc + '_' + eci
+            key = (eciSrc, eci)
             if not key in self.m8015Ecixy:
                 self.m8015Ecixy[key] = HoStat()
             self.m8015Ecixy[key].lnbtsId = lnbtsId
@@ -1181,10 +1379,9 @@ class NgM8015Proc(object):
             self.m8015Ecixy[key].ifLbHoAtt= val.ifLbHoAtt
             self.m8015Ecixy[key].ifLbHoSucc= val.ifLbHoSucc
 
-        outDir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'output')
+        outDir = self.outDir
         with open(os.path.join(outDir, 'm8015_topn_%s.csv' % time.strftime('%Y%m%d_%H%M%S', time.localtime())), 'w') as f:
-            self.ngwin.logEdit.append('-->Exporting results to: %s' % f.name)
-            qApp.processEvents()
+            self.log('-->Exporting results to: %s' % f.name)
 
             header = ['DN','SRC_ENB_ID', 'SRC_LCR_ID', 'SRC_EARFCN', 'SRC_PCI', 'SRC_TAC', 'DST_ENB_ID', 'DST_LCR_ID', 'DST_EARFCN', 'DST_PCI', 'DST_TAC']
             header.extend(['IA_HO_PREP_FAIL', 'IA_HO_ATT', 'IA_HO_SUCC', 'IR_HO_PREP_FAIL', 'IR_HO_ATT', 'IR_HO_SUCC', 'HO_ATT_TOT', 'HO_SUCC_TOT', 'HO_PREP_FAIL', 'HO_EXEC_FAIL', 'HOSR2(%)', 'MRO_LATE_HO', 'MRO_EARLY_HO', 'MRO_PPONG_HO', 'IFLB_HO_ATT', 'IFLB_HO_SUCC'])
@@ -1198,22 +1395,21 @@ class NgM8015Proc(object):
                            'DST_ERAB_FAIL_RRNA', 'DST_ERAB_FAIL_TRU', 'DST_ERAB_FAIL_UEL', 'DST_ERAB_FAIL_RIP', 'DST_ERAB_FAIL_UP', 'DST_ERAB_FAIL_MOB', 'DST_ERAB_FAIL_OTH'])
             header.extend(['DST_AVG_UE_RRC_CONN', 'DST_MAX_UE_RRC_CONN', 'DST_AVG_UE_ACT', 'DST_MAX_UE_ACT'])
             header.extend(['DST_RSSI_PUCCH', 'DST_SINR_PUCCH', 'DST_RSSI_PUSCH', 'DST_SINR_PUSCH'])
-            header.extend(['IS_GRID'])
+            #one IS_<GRID> column per atu grid, and IS_GRID is always exported even if no grid is defined
+            gridNames = list(self.gridData.keys()) if len(self.gridData) > 0 else ['grid']
+            header.extend(['IS_' + name.upper() for name in gridNames])
+            if groupBy is not None:
+                header.insert(0, groupBy.upper())
             f.write(','.join(header))
             f.write('\n')
 
-            #for key,val in self.m8015Ecixy.items():
-            for key,val in sorted(self.m8015Ecixy.items(), key=lambda d : d[1].iaHoPrepFail+d[1].irHoPrepFail+d[1].iaHoAtt+d[1].irHoAtt-d[1].iaHoSucc-d[1].irHoSucc, reverse=True):
-                if val.iaHoPrepFail + val.iaHoAtt + val.irHoPrepFail + val.irHoAtt == 0:
-                    continue
-
+            #rows are selected and written one by one
+            for group,key,val in self.selectHoTopN(topN, groupBy):
                 #src/dst cell info
-                line = [key]
-                eciSrc, eciDst = key.split('_')
-                lcrIdSrc = int(eciSrc) % 256
-                lcrIdDst = int(eciDst) % 256
-                enbIdSrc = (int(eciSrc) - lcrIdSrc) // 256
-                enbIdDst = (int(eciDst) - lcrIdDst) // 256
+                eciSrc, eciDst = key
+                line = ['%d_%d' % key] if groupBy is None else [group, '%d_%d' % key]
+                enbIdSrc, lcrIdSrc = splitEci(eciSrc)
+                enbIdDst, lcrIdDst = splitEci(eciDst)
 
                 if eciSrc in self.earfcnMap:
                     earfcnSrc = self.earfcnMap[eciSrc]
@@ -1261,7 +1457,7 @@ class NgM8015Proc(object):
                 line.extend([val.mroLateHo, val.mroEarlyHo, val.mroPingPongHo, val.ifLbHoAtt, val.ifLbHoSucc])
 
                 #LNADJ info
-                lnadjKey = val.lnbtsId + '_' + str(enbIdDst)
+                lnadjKey = (val.lnbtsId, enbIdDst)
                 if lnadjKey in self.lnadjData:
                     dnLnadj = self.lnadjData[lnadjKey].coDn
                     x2Stat = self.lnadjData[lnadjKey].x2Stat
@@ -1270,7 +1466,7 @@ class NgM8015Proc(object):
                 line.extend([dnLnadj, x2Stat])
 
                 #LNREL info
-                lnrelKey = val.lncelId + '_' + str(enbIdDst) + '_' + str(lcrIdDst)
+                lnrelKey = (val.lncelId, enbIdDst, lcrIdDst)
                 if lnrelKey in self.lnrelData:
                     dnLnrel = self.lnrelData[lnrelKey].coDn
                     cio = self.lnrelData[lnrelKey].cio
@@ -1291,7 +1487,7 @@ class NgM8015Proc(object):
                 line.extend([iaA3, iaA5, ifA2, ifA1])
 
                 #LNHOIF info
-                lnhoifKey = val.lncelId + '_' + earfcnDst
+                lnhoifKey = (val.lncelId, earfcnDst)
                 if lnhoifKey in self.lnhoifData:
                     dnLnhoif = self.lnhoifData[lnhoifKey].coDn
                     ifA3 = self.lnhoifData[lnhoifKey].ifA3Off + '_' + self.lnhoifData[lnhoifKey].ifHysA3Off
@@ -1301,7 +1497,7 @@ class NgM8015Proc(object):
                 line.extend([dnLnhoif, ifA3, ifA5])
 
                 #erab abnormal release(cause=ue_lost or ho_fail) for qci1, source cell only
-                m8006Key = val.lnbtsId + '_' + val.lncelId
+                m8006Key = (val.lnbtsId, val.lncelId)
                 if m8006Key in self.m8006AggData:
                     ueLost = self.m8006AggData[m8006Key].erabRelQci1UeLost
                     hoFail = self.m8006AggData[m8006Key].erabRelQci1HoFail
@@ -1368,77 +1564,143 @@ class NgM8015Proc(object):
                 line.extend([rssiPucch, sinrPucch, rssiPusch, sinrPusch])
 
                 #for ATU grid info
-                gridSrcKey = str(enbIdSrc) + '_' + str(lcrIdSrc)
-                gridDstKey = str(enbIdDst) + '_' + str(lcrIdDst)
-                if gridSrcKey in self.gridData:
-                    isGrid = 'YES'
-                else:
-                    isGrid = 'NO'
-                isGrid = isGrid + '_'
-                if gridDstKey in self.gridData:
-                    isGrid = isGrid + 'YES'
-                else:
-                    isGrid = isGrid + 'NO'
-                line.extend([isGrid])
+                for name in gridNames:
+                    grid = self.gridData.get(name, ())
+                    isGrid = 'YES' if eciSrc in grid else 'NO'
+                    isGrid = isGrid + '_'
+                    isGrid = isGrid + ('YES' if eciDst in grid else 'NO')
+                    line.append(isGrid)
 
                 line = list(map(str, line))
                 f.write(','.join(line))
                 f.write('\n')
 
+    def selectHoTopN(self, topN=None, groupBy=None):
+        '''
+        Yield (group, (ecix, eciy), HoStat) of relations with HO attempts, in descending order of HO failures(prep + exec) per group.
+        Relations of equal HO failures are kept in the order of m8015Ecixy, same as a stable sort.
+        topN: max number of relations per group, or None for all
+        groupBy: None, 'earfcn' or 'grid', see procUserCase02
+        '''
+        numHoFail = lambda d : d[1].iaHoPrepFail+d[1].irHoPrepFail+d[1].iaHoAtt+d[1].irHoAtt-d[1].iaHoSucc-d[1].irHoSucc
+
+        groups = dict()
+        for item in self.m8015Ecixy.items():
+            key, val = item
+            if val.iaHoPrepFail + val.iaHoAtt + val.irHoPrepFail + val.irHoAtt == 0:
+                continue
+
+            if groupBy is None:
+                names = [None]
+            elif groupBy == 'earfcn':
+                names = [self.earfcnMap.get(key[0], 'NA')]
+            elif groupBy == 'grid':
+                names = [name for name,grid in self.gridData.items() if key[0] in grid]
+                if len(names) == 0:
+                    names = ['NA']
+            else:
+                raise ValueError('Invalid groupBy: %s' % groupBy)
+
+            for name in names:
+                if not name in groups:
+                    groups[name] = [item]
+                else:
+                    groups[name].append(item)
+
+        #heap-based partial selection costs O(n*logN) instead of sorting all relations
+        for name in sorted(groups.keys(), key=str):
+            if topN is not None:
+                items = heapq.nlargest(topN, groups[name], key=numHoFail)
+            else:
+                items = sorted(groups[name], key=numHoFail, reverse=True)
+            for key,val in items:
+                yield (name, key, val)
+
     def procUserCase03(self):
-        self.ngwin.logEdit.append('<font color=blue>Performing analysis for user case #03: clean LNADJ/LNREL</font>')
-        qApp.processEvents()
+        self.log('<font color=blue>Performing analysis for user case #03: clean LNADJ/LNREL</font>')
 
         #user case#3: clean lnadj/lnrel
-        for lncelidx in self.lncelData.keys():
-            for lncelidy in self.lncelData.keys():
-                if lncelidx == lncelidy:
-                    continue
-                lnbtsidx = self.lncelData[lncelidx].lnbtsId
-                enbx = self.lncelData[lncelidx].enbId
-                lcrx = self.lncelData[lncelidy].lcrId
-                lnbtsidy = self.lncelData[lncelidy].lnbtsId
-                enby = self.lncelData[lncelidy].enbId
-                lcry = self.lncelData[lncelidy].lcrId
-
-                #x-->y
-                m8015xy = lnbtsidx + '_' + lncelidx + '_' + str(256*int(enby)+int(lcry))
-                lnrelxy = lncelidx + '_' + enby + '_' + lcry
-                lnadjxy = lnbtsidx + '_' + enby
-
-                #y-->x
-                m8015yx = lnbtsidy + '_' + lncelidy + '_' + str(256*int(enbx)+int(lcrx))
-                lnrelyx = lncelidy + '_' + enbx + '_' + lcrx
-                lnadjyx = lnbtsidy + '_' + enbx
-
-                if lnrelxy in self.lnrelData and lnrelyx in self.lnrelData:
-                    if checkM8015(m8015xy) and checkM8015(m8015yx):
-                        continue
-                    else:
-                        #possible uni-directional NR
-                        pass
-                elif not (lnrelxy in self.lnrelData or lnrelyx in self.lnrelData):
-                    if enbx == enby or lnadjxy in self.lnadjData or lnadjyx in self.lnadjData:
-                        #redundant NR?
-                        pass
+        #the audit is driven by relations configured(LNREL/LNADJ) or reported(M8015), instead of all pairs of cells
+        lnrels = dict() #[key=(ecix, eciy), val=(lncel_id of x, Lnrel)]
+        adjsUsed = set() #(lnbts_id, adj_enb_id) referred by LNREL
+        for (lncelId, adjEnbId, adjLcrId),val in self.lnrelData.items():
+            if lncelId in self.lncelData:
+                lnrels[(self.lncelData[lncelId].eci, makeEci(adjEnbId, adjLcrId))] = (lncelId, val)
+                adjsUsed.add((self.lncelData[lncelId].lnbtsId, adjEnbId))
+
+        hoRels = dict() #[key=(ecix, eciy), val=number of HO attempts(including prep fail)]
+        for key in self.m8015AggData.keys():
+            numHo = self.numM8015Ho(key)
+            if numHo > 0 and key[1] in self.lncelData:
+                hoRels[(self.lncelData[key[1]].eci, key[2])] = numHo
+
+        ecis = set([val.eci for val in self.lncelData.values()])
+        enbIds = dict([(val.lnbtsId, val.enbId) for val in self.lncelData.values()]) #[key=lnbts_id, val=enb_id]
+
+        outDir = self.outDir
+        with open(os.path.join(outDir, 'lnrel_lnadj_audit_%s.csv' % time.strftime('%Y%m%d_%H%M%S', time.localtime())), 'w') as f:
+            self.log('-->Exporting results to: %s' % f.name)
+
+            header = ['ISSUE', 'SRC_ENB_ID', 'SRC_LCR_ID', 'DST_ENB_ID', 'DST_LCR_ID', 'DN', 'NUM_HO']
+            f.write(','.join(header))
+            f.write('\n')
+
+            #rows are sorted before being written, so that reports of different runs(e.g. raw vs DB-aggregated PM) can be diffed
+            rows = []
+            def writeIssue(issue, line):
+                rows.append([issue] + line)
+
+            for key,(lncelId, lnrel) in lnrels.items():
+                eciSrc, eciDst = key
+                enbIdSrc, lcrIdSrc = splitEci(eciSrc)
+                enbIdDst, lcrIdDst = splitEci(eciDst)
+                line = [enbIdSrc, lcrIdSrc, enbIdDst, lcrIdDst, lnrel.coDn, hoRels.get(key, 0)]
+
+                #y-->x is missing while y is a known cell
+                if eciDst in ecis and not (eciDst, eciSrc) in lnrels:
+                    writeIssue('UNI_DIRECTIONAL_LNREL', line)
+                #x-->y is configured but never used for HO
+                if not key in hoRels:
+                    writeIssue('LNREL_WITHOUT_HO', line)
+                #x-->y is inter-enb while LNADJ of y is missing
+                if enbIdDst != enbIdSrc and not (self.lncelData[lncelId].lnbtsId, enbIdDst) in self.lnadjData:
+                    writeIssue('LNREL_WITHOUT_LNADJ', line)
+
+            #x-->y is used for HO while LNREL is missing
+            for key,numHo in hoRels.items():
+                if not key in lnrels:
+                    eciSrc, eciDst = key
+                    writeIssue('HO_WITHOUT_LNREL', list(splitEci(eciSrc)) + list(splitEci(eciDst)) + ['NA', numHo])
+
+            #LNADJ is not referred by any LNREL
+            for (lnbtsId, adjEnbId),lnadj in self.lnadjData.items():
+                if not (lnbtsId, adjEnbId) in adjsUsed:
+                    writeIssue('LNADJ_WITHOUT_LNREL', [enbIds.get(lnbtsId, 'NA'), 'NA', adjEnbId, 'NA', lnadj.coDn, 'NA'])
+
+            #sort by (ISSUE, SRC_ENB_ID, SRC_LCR_ID, DST_ENB_ID, DST_LCR_ID, DN), where ids are numeric and 'NA' goes last
+            idKey = lambda v : (0, v, '') if isinstance(v, int) else (1, 0, str(v))
+            rows.sort(key=lambda row : (row[0], idKey(row[1]), idKey(row[2]), idKey(row[3]), idKey(row[4]), str(row[5])))
+            numIssues = dict()
+            for row in rows:
+                numIssues[row[0]] = numIssues.get(row[0], 0) + 1
+                f.write(','.join(map(str, row)))
+                f.write('\n')
+
+        for issue,num in numIssues.items():
+            self.log('-->%s: %d' % (issue, num))
 
     def procUserCase04(self):
-        self.ngwin.logEdit.append('<font color=blue>Performing analysis for user case #04: lnhoif/irfim configuration analysis</font>')
-        qApp.processEvents()
+        self.log('<font color=blue>Performing analysis for user case #04: lnhoif/irfim configuration analysis</font>')
 
         earfcnSet = ['37900', '38098', '38400', '38544', '38950', '39148']
 
         #check LNHOIF
-        for key in self.lnhoifData.keys():
-            tokens = key.split('_')
-            lncelId = tokens[0]
-            earfcn = tokens[1]
-
-            if earfcn == 'None':
+        for lncelId,earfcn in self.lnhoifData.keys():
+            if earfcn in NULLS:
                 continue
 
             if lncelId in self.lncelData:
-                dn = self.lncelData[lncelId].enbId + '_' + self.lncelData[lncelId].lcrId
+                dn = self.lncelData[lncelId].eci
                 if not dn in self.earfcnLnhoif:
                     self.earfcnLnhoif[dn] = [earfcn]
                 else:
@@ -1447,40 +1709,37 @@ class NgM8015Proc(object):
         #check IRFIM
         invalidIrfim = ['ENBID,LCRID,EARFCN,IRFIM_DN,IF_EARFCN,IF_RES_PRIO,IF_RXLEV_MIN,IF_TH_LOW,IF_TH_HIGH,IF_MBW']
         for key in self.irfimData.keys():
-            tokens = key.split('_')
-            lncelId = tokens[0]
-            earfcn = tokens[1]
+            lncelId, earfcn = key
 
-            if earfcn == 'None':
+            if earfcn in NULLS:
                 continue
 
             if lncelId in self.lncelData:
                 if earfcn == self.lncelData[lncelId].earfcn:
                     #invalid IRFIM founded
-                    invalidIrfim.append(','.join([self.lncelData[lncelId].enbId, self.lncelData[lncelId].lcrId, self.lncelData[lncelId].earfcn, str(self.irfimData[key])]))
+                    invalidIrfim.append(','.join([str(self.lncelData[lncelId].enbId), str(self.lncelData[lncelId].lcrId), self.lncelData[lncelId].earfcn, str(self.irfimData[key])]))
                     continue
 
-                dn = self.lncelData[lncelId].enbId + '_' + self.lncelData[lncelId].lcrId
+                dn = self.lncelData[lncelId].eci
                 if not dn in self.earfcnIrfim:
                     self.earfcnIrfim[dn] = [earfcn]
                 else:
                     self.earfcnIrfim[dn].append(earfcn)
 
-        outDir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'output')
+        outDir = self.outDir
         with open(os.path.join(outDir, 'lnhoif_irfim_check_%s.csv' % time.strftime('%Y%m%d_%H%M%S', time.localtime())), 'w') as f:
-            self.ngwin.logEdit.append('-->Exporting results to: %s' % f.name)
-            qApp.processEvents()
+            self.log('-->Exporting results to: %s' % f.name)
 
             header = ['ENBID', 'LCRID', 'EARFCN', 'LNHOIF_EARFCN', 'MISSED_LNHOIF_EARFCN', 'IRFIM_EARFCN', 'MISSED_IRFIM_EARFCN']
             f.write(','.join(header))
             f.write('\n')
 
             for key,val in self.lncelData.items():
-                dn = val.enbId + '_' + val.lcrId
+                dn = val.eci
                 if not dn in self.earfcnLnhoif and not dn in self.earfcnLnhoif:
                     continue
 
-                line = [val.enbId, val.lcrId, val.earfcn]
+                line = [str(val.enbId), str(val.lcrId), val.earfcn]
 
                 if dn in self.earfcnLnhoif:
                     configued = '/'.join(self.earfcnLnhoif[dn])
@@ -1517,19 +1776,118 @@ class NgM8015Proc(object):
 
         if len(invalidIrfim) > 1:
             with open(os.path.join(outDir, 'irfim_problem_%s.csv' % time.strftime('%Y%m%d_%H%M%S', time.localtime())), 'w') as f:
-                self.ngwin.logEdit.append('-->Exporting results to: %s' % f.name)
-                qApp.processEvents()
+                self.log('-->Exporting results to: %s' % f.name)
                 for val in invalidIrfim:
                     f.write(val)
                     f.write('\n')
 
-    def checkM8015(self, key):
-        if not key in self.m8015AggData:
-            return False
+    def procUserCase05(self, bucket='hour', window=3, minHoAtt=20, hosrDrop=10.0, allSeries=False):
+        '''
+        bucket: 'hour' or 'day'
+        window: number of buckets of the rolling window
+        minHoAtt: min HO attempts of both the rolling window and its baseline(i.e. all buckets of the relation before the window)
+        hosrDrop: min drop of HOSR(in %) of the rolling window against its baseline, which is detected as degradation
+        allSeries: export time series of all relations, otherwise only of degraded relations
+        '''
+        self.log('<font color=blue>Performing analysis for user case #05: hosr time series and degradation</font>')
 
-        val = self.m8015AggData[key]
-        numHo = val.iaHoPrepFail + val.iaHoAtt + val.irHoPrepFailAc + val.irHoPrepFailOth + val.irHoPrepFailQci + val.irHoPrepFailTime + val.irHoAtt
-        if numHo > 0:
+        #user case#5: per relation time series of hosr/mro, computed over columnar M8015 records without per-record objects
+        keyIds, buckets, sums = self.m8015Data.series(bucket)
+        if len(keyIds) == 0:
+            self.log('-->No M8015 records with valid %s' % PmRecordTable.TIME_COLUMN)
+            return
+
+        col = dict([(attr, i) for i,attr in enumerate(self.m8015Data.attrs)])
+        hoAtt = sums[:, col['iaHoAtt']] + sums[:, col['irHoAtt']]
+        hoSucc = sums[:, col['iaHoSucc']] + sums[:, col['irHoSucc']]
+        mroLateHo = sums[:, col['mroLateHo']]
+        mroEarlyHo = sums[:, col['mroEarlyType1Ho']] + sums[:, col['mroEarlyType2Ho']]
+        mroPingPongHo = sums[:, col['mroPingPongHo']]
+
+        #rolling window of each (relation, bucket) covers buckets (bucket-window, bucket] of the same relation
+        #positions of relations are padded by window, so that the window never reaches the previous relation
+        bucketIds = buckets.astype(np.int64)
+        span = bucketIds.max() - bucketIds.min() + window
+        pos = keyIds * span + (bucketIds - bucketIds.min())
+        lo = np.searchsorted(pos, pos - window + 1)
+        hi = np.arange(1, len(pos) + 1)
+        first = np.searchsorted(pos, keyIds * span)
+
+        cumAtt = np.r_[0, np.cumsum(hoAtt)]
+        cumSucc = np.r_[0, np.cumsum(hoSucc)]
+        rollAtt = cumAtt[hi] - cumAtt[lo]
+        rollSucc = cumSucc[hi] - cumSucc[lo]
+        baseAtt = cumAtt[lo] - cumAtt[first]
+        baseSucc = cumSucc[lo] - cumSucc[first]
+        hosr = np.divide(100 * hoSucc, hoAtt, out=np.full(len(hoAtt), np.nan), where=hoAtt > 0)
+        rollHosr = np.divide(100 * rollSucc, rollAtt, out=np.full(len(rollAtt), np.nan), where=rollAtt > 0)
+        baseHosr = np.divide(100 * baseSucc, baseAtt, out=np.full(len(baseAtt), np.nan), where=baseAtt > 0)
+        degraded = (rollAtt >= minHoAtt) & (baseAtt >= minHoAtt) & (baseHosr - rollHosr >= hosrDrop)
+
+        #[key=key id, val=(ecix, eciy)], relations of unknown source cell are skipped as in user case#2
+        relations = dict()
+        for i,(lnbtsId, lncelId, eci) in enumerate(self.m8015Data.keyIds.keys()):
+            if lncelId in self.lncelData:
+                relations[i] = (self.lncelData[lncelId].eci, eci)
+
+        degradedKeys, firstDegraded, numDegraded = np.unique(keyIds[degraded], return_index=True, return_counts=True)
+        firstDegraded = np.flatnonzero(degraded)[firstDegraded]
+        times = np.datetime_as_string(buckets, unit='m')
+        fmtHosr = lambda x : 'DIV0' if np.isnan(x) else '%.2f' % x
+
+        outDir = self.outDir
+        tag = time.strftime('%Y%m%d_%H%M%S', time.localtime())
+        with open(os.path.join(outDir, 'm8015_degradation_%s_%s.csv' % (bucket, tag)), 'w') as f:
+            self.log('-->Exporting results to: %s' % f.name)
+
+            header = ['DN', 'SRC_ENB_ID', 'SRC_LCR_ID', 'DST_ENB_ID', 'DST_LCR_ID', 'FIRST_DEGRADED_TIME', 'NUM_DEGRADED', 'BASE_HO_ATT', 'BASE_HOSR(%)', 'ROLL_HO_ATT', 'ROLL_HOSR(%)']
+            f.write(','.join(header))
+            f.write('\n')
+
+            numRelations = 0
+            for keyId,i,num in zip(degradedKeys.tolist(), firstDegraded.tolist(), numDegraded.tolist()):
+                if not keyId in relations:
+                    continue
+                numRelations = numRelations + 1
+
+                eciSrc, eciDst = relations[keyId]
+                line = ['%d_%d' % (eciSrc, eciDst)]
+                line.extend(splitEci(eciSrc))
+                line.extend(splitEci(eciDst))
+                line.extend([times[i], num, baseAtt[i], fmtHosr(baseHosr[i]), rollAtt[i], fmtHosr(rollHosr[i])])
+                line = list(map(str, line))
+                f.write(','.join(line))
+                f.write('\n')
+            self.log('-->%d relations degraded' % numRelations)
+
+        with open(os.path.join(outDir, 'm8015_series_%s_%s.csv' % (bucket, tag)), 'w') as f:
+            self.log('-->Exporting results to: %s' % f.name)
+
+            header = ['DN', 'TIME', 'HO_ATT_TOT', 'HO_SUCC_TOT', 'HOSR2(%)', 'MRO_LATE_HO', 'MRO_EARLY_HO', 'MRO_PPONG_HO', 'ROLL_HO_ATT', 'ROLL_HO_SUCC', 'ROLL_HOSR(%)', 'DEGRADED']
+            f.write(','.join(header))
+            f.write('\n')
+
+            rows = np.arange(len(keyIds)) if allSeries else np.flatnonzero(np.isin(keyIds, degradedKeys))
+            columns = [keyIds[rows], times[rows], hoAtt[rows], hoSucc[rows], hosr[rows], mroLateHo[rows], mroEarlyHo[rows], mroPingPongHo[rows], rollAtt[rows], rollSucc[rows], rollHosr[rows], degraded[rows]]
+            for keyId,t,att,succ,x,late,early,pingPong,rAtt,rSucc,rx,deg in zip(*[c.tolist() for c in columns]):
+                if not keyId in relations:
+                    continue
+
+                line = ['%d_%d' % relations[keyId], t, att, succ, fmtHosr(x), late, early, pingPong, rAtt, rSucc, fmtHosr(rx), 'YES' if deg else 'NO']
+                line = list(map(str, line))
+                f.write(','.join(line))
+                f.write('\n')
+
+    def checkM8015(self, key):
+        if self.numM8015Ho(key) > 0:
             return True
         else:
             return False
+
+    def numM8015Ho(self, key):
+        #number of HO attempts(including prep fail) of M8015 key, i.e. (lnbts_id, lncel_id, eci)
+        if not key in self.m8015AggData:
+            return 0
+
+        val = self.m8015AggData[key]
+        return val.iaHoPrepFail + val.iaHoAtt + val.irHoPrepFailAc + val.irHoPrepFailOth + val.irHoPrepFailQci + val.irHoPrepFailTime + val.irHoAtt
@@ -10,7 +10,7 @@ Change History:
     2018-1-19   v0.1    created.    github/zhenggao2
 '''
 
-from PyQt5.QtWidgets import QMainWindow, QAction, QMenu, QTabWidget, QTextEdit, QMessageBox
+from PyQt5.QtWidgets import QMainWindow, QAction, QActionGroup, QMenu, QTabWidget, QTextEdit, QMessageBox, QInputDialog
 from PyQt5.QtWidgets import qApp, QApplication
 from PyQt5.QtCore import Qt
 from PyQt5.QtSql import QSqlDatabase
@@ -20,15 +20,38 @@ from ngnbiotgridui import NgNbiotGridUi
 from ngnrgridui import NgNrGridUi
 from ngxmlparser import NgXmlParser
 from ngsqlquery import NgSqlQuery
-from ngm8015proc import NgM8015Proc
+from ngm8015proc import NgM8015Proc, makeAggQueries, makeUseCases
 from ngsshsftp import NgSshSftp
-from ngrawpmparser import NgRawPmParser
+from ngrawpmparser import NgRawPmParser, LogSink
 import os
 
+class NgQtLogSink(LogSink):
+    '''
+    Append batched logs to the log widget and show progress in the status bar.
+    '''
+    def __init__(self, ngwin):
+        super().__init__(debug=ngwin.enableDebug)
+        self.ngwin = ngwin
+
+    def emit(self, logs, progress):
+        for text in logs:
+            self.ngwin.logEdit.append(text)
+        if progress is not None:
+            self.ngwin.statusBar().showMessage('%s: %d/%d' % progress)
+        qApp.processEvents()
+
 class NgMainWin(QMainWindow):
     def __init__(self):
         super().__init__()
         self.enableDebug = False
+        self.enableDbAgg = False
+        self.enableQueryCache = False
+        self.enableOfflineDb = False
+        self.enableRawPmCache = False
+        #options of user case#2(hosr top n) of M8015 analyzer
+        self.hoTopN = NgM8015Proc.HO_TOP_N
+        self.hoGroupBy = None
+        self.sqlQuery = None
         self.tabWidget = QTabWidget()
         self.tabWidget.setTabsClosable(True)
         self.logEdit = QTextEdit()
@@ -57,6 +80,26 @@ class NgMainWin(QMainWindow):
     def onEnableDebug(self, checked):
         self.enableDebug = checked
 
+    def onEnableDbAgg(self, checked):
+        self.enableDbAgg = checked
+
+    def onEnableQueryCache(self, checked):
+        self.enableQueryCache = checked
+
+    def onEnableOfflineDb(self, checked):
+        self.enableOfflineDb = checked
+
+    def onEnableRawPmCache(self, checked):
+        self.enableRawPmCache = checked
+
+    def onSetHoTopN(self):
+        topN, ok = QInputDialog.getInt(self, 'HOSR Top N', 'Max number of relations per group(0 for all):', self.hoTopN, 0, 1000000)
+        if ok:
+            self.hoTopN = topN
+
+    def onSetHoGroupBy(self, action):
+        self.hoGroupBy = action.data()
+
     def onChkSqlPlugin(self):
         drivers = QSqlDatabase().drivers()
         for e in drivers:
@@ -68,28 +111,51 @@ class NgMainWin(QMainWindow):
         parser.start()
 
     def onExecNedsM8015(self):
+        if self.sqlQuery is not None:
+            return
+
         args = dict()
-        args['dbConf'] = 'oracle_db_config.txt'
-        args['sqlQuery'] = ['neds_lnadj.sql', 'neds_lnadjl.sql', 'neds_lncel_fdd.sql', 'neds_lncel_tdd.sql', 'neds_lnhoif.sql', 'neds_lnrel.sql', 'neds_irfim.sql',
-                            'neds_m8015.sql', 'neds_m8051.sql', 'neds_m8005.sql', 'neds_m8001.sql', 'neds_m8013.sql', 'neds_m8006.sql', 'neds_m8007.sql']
-
-        query = NgSqlQuery(self, args)
-        query.exec_()
-
-        if query.queryStat:
-            proc = NgM8015Proc(self)
-            proc.loadCsvData()
-            proc.makeEciMap()
-            proc.procUserCase01()
-            proc.procUserCase02()
-            proc.procUserCase04()
-            self.logEdit.append('<font color=blue>Done!</font>')
+        args['dbConf'] = 'sqlite_db_config.txt' if self.enableOfflineDb else 'oracle_db_config.txt'
+        #queries are executed concurrently in this order, so the long PM queries go first and CM queries overlap with them
+        args['sqlQuery'] = ['neds_m8015.sql', 'neds_m8051.sql', 'neds_m8005.sql', 'neds_m8001.sql', 'neds_m8013.sql', 'neds_m8006.sql', 'neds_m8007.sql',
+                            'neds_lnadj.sql', 'neds_lnadjl.sql', 'neds_lncel_fdd.sql', 'neds_lncel_tdd.sql', 'neds_lnhoif.sql', 'neds_lnrel.sql', 'neds_irfim.sql']
+        if self.enableDbAgg:
+            args['aggQuery'] = makeAggQueries()
+        args['useCache'] = self.enableQueryCache
+
+        #M80xx records are handed off to NgM8015Proc while being fetched
+        proc = NgM8015Proc(self, aggregated=self.enableDbAgg)
+        args['onBatch'] = proc.feedQuery
+
+        #exec_ keeps processing events while queries are running, so a second run mustn't be started until this one is done
+        self.sqlQueryAction.setEnabled(False)
+        try:
+            self.sqlQuery = NgSqlQuery(self, args)
+            query = self.sqlQuery
+            try:
+                query.exec_()
+            finally:
+                self.sqlQuery = None
+
+            if query.queryStat:
+                proc.loadCsvData()
+                proc.makeEciMap()
+                proc.runUseCases(makeUseCases(self.hoTopN, self.hoGroupBy))
+                self.logEdit.append('<font color=blue>Done!</font>')
+        finally:
+            self.sqlQueryAction.setEnabled(True)
+
+    def onCancelNedsQuery(self):
+        if self.sqlQuery is not None:
+            self.logEdit.append('<font color=red>Cancelling NEDS query...</font>')
+            self.sqlQuery.cancel()
 
     def onExecSshSftpClient(self):
         client = NgSshSftp(self)
 
     def onExecRawPmParser5g(self):
-        parser = NgRawPmParser(self, '5g')
+        parser = NgRawPmParser(NgQtLogSink(self), '5g', useCache=self.enableRawPmCache)
+        parser.run()
 
     def onExecLteResGrid(self):
         dlg = NgLteGridUi(self)
@@ -127,6 +193,8 @@ class NgMainWin(QMainWindow):
         self.xmlParserAction.triggered.connect(self.onExecXmlParser)
         self.sqlQueryAction = QAction('NEDS (M8015 Analyzer)')
         self.sqlQueryAction.triggered.connect(self.onExecNedsM8015)
+        self.cancelQueryAction = QAction('Cancel NEDS Query')
+        self.cancelQueryAction.triggered.connect(self.onCancelNedsQuery)
         self.sshSftpAction = QAction('SSH/SFTP Client')
         self.sshSftpAction.triggered.connect(self.onExecSshSftpClient)
         self.rawPmParserAction = QAction('Raw PM Parser(5G)')
@@ -137,6 +205,33 @@ class NgMainWin(QMainWindow):
         self.enableDebugAction.setCheckable(True)
         self.enableDebugAction.setChecked(False)
         self.enableDebugAction.triggered[bool].connect(self.onEnableDebug)
+        self.enableDbAggAction = QAction('Aggregate NEDS PM in DB')
+        self.enableDbAggAction.setCheckable(True)
+        self.enableDbAggAction.setChecked(False)
+        self.enableDbAggAction.triggered[bool].connect(self.onEnableDbAgg)
+        self.enableQueryCacheAction = QAction('Cache NEDS Query Results')
+        self.enableQueryCacheAction.setCheckable(True)
+        self.enableQueryCacheAction.setChecked(False)
+        self.enableQueryCacheAction.triggered[bool].connect(self.onEnableQueryCache)
+        self.enableOfflineDbAction = QAction('Use Offline NEDS(SQLite)')
+        self.enableOfflineDbAction.setCheckable(True)
+        self.enableOfflineDbAction.setChecked(False)
+        self.enableOfflineDbAction.triggered[bool].connect(self.onEnableOfflineDb)
+        self.enableRawPmCacheAction = QAction('Cache Parsed Raw PM')
+        self.enableRawPmCacheAction.setCheckable(True)
+        self.enableRawPmCacheAction.setChecked(False)
+        self.enableRawPmCacheAction.triggered[bool].connect(self.onEnableRawPmCache)
+
+        self.hoTopNAction = QAction('HOSR Top N...')
+        self.hoTopNAction.triggered.connect(self.onSetHoTopN)
+        #top n relations of the whole network, per source earfcn or per atu grid
+        self.hoGroupByActions = QActionGroup(self)
+        for text,groupBy in (('Network', None), ('EARFCN', 'earfcn'), ('ATU Grid', 'grid')):
+            action = QAction(text, self.hoGroupByActions)
+            action.setCheckable(True)
+            action.setChecked(groupBy is None)
+            action.setData(groupBy)
+        self.hoGroupByActions.triggered.connect(self.onSetHoGroupBy)
 
         #Help menu
         self.aboutAction = QAction('About')
@@ -159,11 +254,20 @@ class NgMainWin(QMainWindow):
         self.miscMenu.addAction(self.chkSqlAction)
         self.miscMenu.addAction(self.xmlParserAction)
         self.miscMenu.addAction(self.sqlQueryAction)
+        self.miscMenu.addAction(self.cancelQueryAction)
         self.miscMenu.addAction(self.sshSftpAction)
         self.miscMenu.addAction(self.rawPmParserAction)
 
         self.optionsMenu = self.menuBar().addMenu('Options')
         self.optionsMenu.addAction(self.enableDebugAction)
+        self.optionsMenu.addAction(self.enableDbAggAction)
+        self.optionsMenu.addAction(self.enableQueryCacheAction)
+        self.optionsMenu.addAction(self.enableOfflineDbAction)
+        self.optionsMenu.addAction(self.enableRawPmCacheAction)
+        self.optionsMenu.addSeparator()
+        self.optionsMenu.addAction(self.hoTopNAction)
+        self.hoGroupByMenu = self.optionsMenu.addMenu('HOSR Top N Per')
+        self.hoGroupByMenu.addActions(self.hoGroupByActions.actions())
 
         self.helpMenu = self.menuBar().addMenu('Help')
         self.helpMenu.addAction(self.aboutAction)
@@ -0,0 +1,255 @@
+#!/usr/bin/python3
+# -*- encoding: utf-8 -*-
+
+'''
+File:
+    ngnedsbench.py
+Description:
+    Offline benchmark of the NEDS query and M8015 analysis pipeline, with synthetic NOKLTE_* and CM tables loaded into SQLite.
+    Query results and reports are exported to the output directory of the toolset, as NgMainWin does.
+    Usage: python3 ngnedsbench.py --bts 200 --days 2 --nbrs 8 --sessions 4
+Change History:
+    2026-10-18  v0.1    created.
+'''
+
+import os
+import re
+import sys
+import csv
+import json
+import time
+import random
+import shutil
+import tempfile
+import argparse
+from datetime import datetime, timedelta
+from ngdbbackend import loadFixtures, SQLITE_TIME_FORMAT
+from ngsqlquery import NgSqlQuery
+from ngm8015proc import NgM8015Proc, makeAggQueries, makeUseCases
+
+#queries executed by NgMainWin.onExecNedsM8015
+SQL_QUERIES = ['neds_m8015.sql', 'neds_m8051.sql', 'neds_m8005.sql', 'neds_m8001.sql', 'neds_m8013.sql', 'neds_m8006.sql', 'neds_m8007.sql',
+               'neds_lnadj.sql', 'neds_lnadjl.sql', 'neds_lncel_fdd.sql', 'neds_lncel_tdd.sql', 'neds_lnhoif.sql', 'neds_lnrel.sql', 'neds_irfim.sql']
+FDD_EARFCNS = [100, 1650, 1825]
+TDD_EARFCNS = [37900, 38098, 38400, 38544, 38950, 39148]
+
+class NgBenchWin(object):
+    '''
+    Stand-in of NgMainWin, which collects logs instead of displaying them.
+    '''
+    def __init__(self, verbose=False):
+        self.verbose = verbose
+        self.logEdit = self
+        self.history = []
+
+    def append(self, text):
+        self.history.append(text)
+        if self.verbose:
+            print(text)
+
+    def statusBar(self):
+        return self
+
+    def showMessage(self, text):
+        pass
+
+def pmTables():
+    '''
+    Return [(table, columns)] of PM queries, which are parsed from the sql files so that fixtures follow them.
+    '''
+    sqlDir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sql')
+    tables = []
+    for sqlFn in SQL_QUERIES:
+        with open(os.path.join(sqlDir, sqlFn), 'r') as f:
+            query = re.sub(r'--.*', '', f.read())
+        m = re.search(r'select(.*?)from\s+(NOKLTE_\w+)', query, re.S | re.I)
+        if m is not None:
+            tables.append((m.group(2), [col.strip().upper() for col in m.group(1).split(',')]))
+    return tables
+
+def genNedsFixtures(outDir, numBts=100, numDays=1, numNbrs=8, stepMinutes=60, startTime='2019-03-01 00:00:00', seed=0):
+    '''
+    Generate csv fixtures of NOKLTE_* and CM tables used by the NEDS queries in outDir.
+    There are 3 cells per BTS, each with numNbrs neighbour cells of nearby BTSs, and PM records every stepMinutes for numDays.
+    About 1% of the counters are empty, which is how NULL appears in NEDS.
+    Return [key=table, val=number of rows].
+    '''
+    rnd = random.Random(seed)
+    if not os.path.exists(outDir):
+        os.makedirs(outDir)
+
+    objects = []
+    tables = dict()
+    def newObject(parent, instance, dn):
+        gid = 1000 + len(objects)
+        objects.append((gid, parent, instance, 'PLMN-PLMN/' + dn))
+        return gid
+
+    cells = []
+    for b in range(numBts):
+        enbId = 10000 + b
+        mrbts = 'MRBTS-%d/LNBTS-%d' % (enbId, enbId)
+        lnbts = newObject(None, enbId, mrbts)
+        for lcrId in range(1, 4):
+            tdd = rnd.random() < 0.5
+            cells.append({'bts':b, 'enbId':enbId, 'lcrId':lcrId, 'lnbts':lnbts, 'lncel':newObject(lnbts, lcrId, '%s/LNCEL-%d' % (mrbts, lcrId)),
+                          'dn':'%s/LNCEL-%d' % (mrbts, lcrId), 'tdd':tdd, 'earfcn':rnd.choice(TDD_EARFCNS if tdd else FDD_EARFCNS), 'pci':rnd.randint(0, 503), 'tac':rnd.randint(1, 99)})
+
+    lncel = []
+    lncelFdd = []
+    lncelTdd = []
+    lnadj = []
+    lnadjl = []
+    lnrel = []
+    lnhoif = []
+    irfim = []
+    nbrs = dict()
+    adjs = dict()
+    for c in cells:
+        lncel.append([1, c['lncel'], 256 * c['enbId'] + c['lcrId'], 1 if c['tdd'] else 0, '' if c['tdd'] else c['earfcn'], c['earfcn'] if c['tdd'] else '', c['pci'], c['tac']]
+                     + [rnd.randint(0, 30) for i in range(16)])
+        child = newObject(c['lncel'], 1, '%s/LNCEL_%s-1' % (c['dn'], 'TDD' if c['tdd'] else 'FDD'))
+        (lncelTdd if c['tdd'] else lncelFdd).append([1, child, c['earfcn']])
+
+        #neighbours are cells of nearby BTSs
+        nearby = [n for n in cells[max(0, 3 * (c['bts'] - 5)):3 * (c['bts'] + 6)] if n is not c]
+        nbrs[c['lncel']] = rnd.sample(nearby, min(numNbrs, len(nearby)))
+        for i,n in enumerate(nbrs[c['lncel']]):
+            if rnd.random() < 0.9:
+                lnrel.append([1, newObject(c['lncel'], i + 1, '%s/LNREL-%d' % (c['dn'], i + 1)), n['enbId'], n['lcrId'], rnd.randint(-3, 3), rnd.randint(0, 1), 0])
+            if n['enbId'] != c['enbId']:
+                key = (c['lnbts'], n['enbId'])
+                if not key in adjs:
+                    adjs[key] = newObject(c['lnbts'], n['enbId'], 'MRBTS-%d/LNBTS-%d/LNADJ-%d' % (c['enbId'], c['enbId'], n['enbId']))
+                    lnadj.append([1, adjs[key], n['enbId'], '10.0.%d.%d' % (n['enbId'] // 256 % 256, n['enbId'] % 256), rnd.randint(0, 1)])
+                    for m in cells[3 * n['bts']:3 * n['bts'] + 3]:
+                        lnadjl.append([1, newObject(adjs[key], m['lcrId'], 'MRBTS-%d/LNBTS-%d/LNADJ-%d/LNADJL-%d' % (c['enbId'], c['enbId'], n['enbId'], m['lcrId'])),
+                                       m['enbId'], m['lcrId'], m['earfcn'], m['pci'], m['tac']])
+        for i,earfcn in enumerate(rnd.sample(FDD_EARFCNS + TDD_EARFCNS, 3)):
+            lnhoif.append([1, newObject(c['lncel'], i + 1, '%s/LNHOIF-%d' % (c['dn'], i + 1)), earfcn] + [rnd.randint(0, 30) for j in range(10)])
+            irfim.append([1, newObject(c['lncel'], i + 1, '%s/IRFIM-%d' % (c['dn'], i + 1)), earfcn] + [rnd.randint(0, 30) for j in range(5)])
+
+    tables['ctp_common_objects'] = (['CO_GID', 'CO_PARENT_GID', 'CO_OBJECT_INSTANCE', 'CO_DN'], objects)
+    tables['c_lte_lncel'] = (['CONF_ID', 'OBJ_GID', 'LNCEL_EUTRA_CEL_ID', 'LNCEL_CLL_TECHNOLOGY', 'LNCEL_EARFCN_DL', 'LNCEL_EARFCN', 'LNCEL_PHY_CELL_ID', 'LNCEL_TAC',
+                              'LNCEL_THLD_1', 'LNCEL_A_3_OFFS', 'LNCEL_HYS_A_3_OFFS', 'LNCEL_A_3_REP_INT', 'LNCEL_A_3_TTT', 'LNCEL_THLD_3', 'LNCEL_THLD_3_A', 'LNCEL_HYS_THLD_3',
+                              'LNCEL_A_5_REP_INT', 'LNCEL_A_5_TTT', 'LNCEL_THLD_2_IFREQ', 'LNCEL_HT2I_86', 'LNCEL_A2TAIM_4', 'LNCEL_THLD_2_A', 'LNCEL_HYS_THLD_2_A', 'LNCEL_A1TDIM_3'], lncel)
+    tables['c_lte_lncel_fdd'] = (['CONF_ID', 'OBJ_GID', 'LNCEL_FDD_EARFCN_DL'], lncelFdd)
+    tables['c_lte_lncel_tdd'] = (['CONF_ID', 'OBJ_GID', 'LNCEL_TDD_EARFCN'], lncelTdd)
+    tables['c_lte_lnadj'] = (['CONF_ID', 'OBJ_GID', 'LNADJ_ADJ_ENB_ID', 'LNADJ_C_PLANE_IP_ADDR', 'LNADJ_X_2_LINK_STAT'], lnadj)
+    tables['c_lte_lnadjl'] = (['CONF_ID', 'OBJ_GID', 'LNADJL_ECGI_ADJ_ENB_ID', 'LNADJL_ECGI_LCR_ID', 'LNADJL_F_DL_EARFCN', 'LNADJL_PHY_CELL_ID', 'LNADJL_TAC'], lnadjl)
+    tables['c_lte_lnrel'] = (['CONF_ID', 'OBJ_GID', 'LNREL_ECGI_ADJ_ENB_ID', 'LNREL_ECGI_LCR_ID', 'LNREL_CION_3', 'LNREL_H_N_OVER_AL_L', 'LNREL_NR_STAT'], lnrel)
+    tables['c_lte_lnhoif'] = (['CONF_ID', 'OBJ_GID', 'LNHOIF_ECI_9', 'LNHOIF_A3ORI_1', 'LNHOIF_HA3ORI_10', 'LNHOIF_A3RIRI_3', 'LNHOIF_A3TRI_5', 'LNHOIF_THLD_3_IFREQ',
+                               'LNHOIF_THLD_3_A_IFREQ', 'LNHOIF_HT3I_12', 'LNHOIF_A5RII_7', 'LNHOIF_A_5_TTT_IFREQ', 'LNHOIF_MBNW_15'], lnhoif)
+    tables['c_lte_irfim'] = (['CONF_ID', 'OBJ_GID', 'IRFIM_DL_CAR_FRQ_EUT', 'IRFIM_ECRP_2', 'IRFIM_QRLMIF_10', 'IRFIM_INTER_FRQ_THR_L', 'IRFIM_INTER_FRQ_THR_H', 'IRFIM_MEAS_BDW'], irfim)
+
+    counts = dict()
+    for table,(header, rows) in tables.items():
+        with open(os.path.join(outDir, '%s.csv' % table), 'w', newline='') as f:
+            writer = csv.writer(f, lineterminator='\n')
+            writer.writerow(header)
+            writer.writerows([['' if v is None else v for v in row] for row in rows])
+        counts[table] = len(rows)
+
+    #PM records are streamed period by period, as they are the bulk of the fixtures
+    t0 = datetime.strptime(startTime, SQLITE_TIME_FORMAT)
+    periods = [(t0 + timedelta(minutes=stepMinutes * i)).strftime(SQLITE_TIME_FORMAT) for i in range(numDays * 24 * 60 // stepMinutes)]
+    for table,columns in pmTables():
+        counters = [col for col in columns if not col in ('LNBTS_ID', 'LNCEL_ID', 'ECI_ID', 'PERIOD_START_TIME')]
+        perNbr = 'ECI_ID' in columns
+        with open(os.path.join(outDir, '%s.csv' % table), 'w', newline='') as f:
+            writer = csv.writer(f, lineterminator='\n')
+            writer.writerow(['PERIOD_START_TIME', 'LNBTS_ID', 'LNCEL_ID'] + (['ECI_ID'] if perNbr else []) + counters)
+            num = 0
+            for period in periods:
+                rows = []
+                for c in cells:
+                    for n in (nbrs[c['lncel']] if perNbr else [None]):
+                        row = [period, c['lnbts'], c['lncel']] + ([256 * n['enbId'] + n['lcrId']] if perNbr else [])
+                        rows.append(row + [rnd.randint(0, 100) if rnd.random() > 0.01 else '' for col in counters])
+                writer.writerows(rows)
+                num = num + len(rows)
+        counts[table] = num
+
+    return counts
+
+def runBench(args):
+    workDir = args.workdir if args.workdir is not None else tempfile.mkdtemp(prefix='ngnedsbench_')
+    results = {'bts':args.bts, 'days':args.days, 'nbrs':args.nbrs, 'sessions':args.sessions, 'aggregated':args.agg}
+    try:
+        tStart = time.perf_counter()
+        counts = genNedsFixtures(os.path.join(workDir, 'fixtures'), args.bts, args.days, args.nbrs, args.step, seed=args.seed)
+        results['gen'] = time.perf_counter() - tStart
+        print('Generated %d tables with %d rows in %.2fs: %s' % (len(counts), sum(counts.values()), results['gen'], workDir))
+
+        tStart = time.perf_counter()
+        dbFile = os.path.join(workDir, 'neds.db')
+        if os.path.exists(dbFile):
+            os.remove(dbFile)
+        loadFixtures(dbFile, os.path.join(workDir, 'fixtures'), log=print if args.verbose else lambda text: None)
+        results['load'] = time.perf_counter() - tStart
+        print('Loaded fixtures into %s in %.2fs' % (dbFile, results['load']))
+
+        dbConf = os.path.join(workDir, 'sqlite_db_config.txt')
+        with open(dbConf, 'w') as f:
+            f.write('DB_BACKEND = sqlite\nDB_FILE = %s\n' % dbFile)
+
+        #the same steps as NgMainWin.onExecNedsM8015, with the time window substituted in advance
+        win = NgBenchWin(args.verbose)
+        tStart = time.perf_counter()
+        proc = NgM8015Proc(win, numWorkers=args.workers, aggregated=args.agg)
+        queryArgs = {'dbConf':dbConf, 'sqlQuery':SQL_QUERIES, 'onBatch':proc.feedQuery, 'useCache':args.cache, 'numSessions':args.sessions}
+        if args.agg:
+            queryArgs['aggQuery'] = makeAggQueries()
+        query = NgSqlQuery(win, queryArgs)
+        endTime = datetime.strptime('2019-03-01 00:00:00', SQLITE_TIME_FORMAT) + timedelta(days=args.days) - timedelta(hours=1)
+        query.subsMap = {'start_time':'2019030100', 'end_time':endTime.strftime('%Y%m%d%H')}
+        query.exec_()
+        results['query'] = time.perf_counter() - tStart
+        results['queries'] = query.timings
+        if not query.queryStat:
+            print('Query failed: %s' % '\n'.join(win.history[-10:]))
+            return 1
+        print('Executed %d queries in %.2fs(slowest: %.2fs)' % (len(query.timings), results['query'], max(query.timings.values())))
+
+        tStart = time.perf_counter()
+        proc.loadCsvData()
+        proc.makeEciMap()
+        results['loadCsv'] = time.perf_counter() - tStart
+        tStart = time.perf_counter()
+        results['useCases'] = proc.runUseCases(makeUseCases(args.topn, args.groupby))
+        results['runUseCases'] = time.perf_counter() - tStart
+        print('Loaded query results in %.2fs, ran use cases in %.2fs: %s' % (results['loadCsv'], results['runUseCases'],
+              ', '.join(['%s=%.2fs' % (name, t) for name,t in sorted(results['useCases'].items())])))
+
+        errors = [text for text in win.history if 'Traceback' in text or 'Exception' in text]
+        if len(errors) > 0:
+            print('%d errors:\n%s' % (len(errors), '\n'.join(errors)))
+            return 1
+    finally:
+        if args.workdir is None and not args.keep:
+            shutil.rmtree(workDir, ignore_errors=True)
+
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    return 0
+
+if __name__ == '__main__':
+    argParser = argparse.ArgumentParser(description='Offline benchmark of NEDS queries and M8015 analysis over SQLite.')
+    argParser.add_argument('--bts', type=int, default=100, help='number of BTSs, each with 3 cells')
+    argParser.add_argument('--days', type=int, default=1, help='number of days of PM')
+    argParser.add_argument('--nbrs', type=int, default=8, help='number of neighbour cells per cell')
+    argParser.add_argument('--step', type=int, default=60, help='PM interval in minutes')
+    argParser.add_argument('--seed', type=int, default=0)
+    argParser.add_argument('--sessions', type=int, default=NgSqlQuery.NUM_SESSIONS, help='number of concurrent queries')
+    argParser.add_argument('--workers', type=int, default=None, help='number of worker processes of M8015 analysis, defaults to cpu count')
+    argParser.add_argument('--agg', action='store_true', help='aggregate PM in DB')
+    argParser.add_argument('--topn', type=int, default=None, help='max number of relations per group exported by hosr top n, 0 for all, defaults to %d' % NgM8015Proc.HO_TOP_N)
+    argParser.add_argument('--groupby', choices=('earfcn', 'grid'), default=None, help='select hosr top n per source earfcn or atu grid instead of the whole network')
+    argParser.add_argument('--cache', action='store_true', help='enable the query result cache')
+    argParser.add_argument('--workdir', default=None, help='directory for fixtures and database, defaults to a temporary directory')
+    argParser.add_argument('--keep', action='store_true', help='keep the temporary directory')
+    argParser.add_argument('--verbose', action='store_true', help='print logs')
+    argParser.add_argument('--output', default=None, help='save results as json')
+    sys.exit(runBench(argParser.parse_args()))
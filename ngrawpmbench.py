@@ -0,0 +1,194 @@
+#!/usr/bin/python3
+# -*- encoding: utf-8 -*-
+
+'''
+File:
+    ngrawpmbench.py
+Description:
+    Benchmark of raw PM parser with synthetic raw PM and KPI definitions.
+    Usage: python3 ngrawpmbench.py --rat 5g --files 20 --dns 50 --meastypes 8 --counters 40 --intervals 4 --export csv
+Change History:
+    2026-10-18  v0.1    created.
+'''
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import tempfile
+import argparse
+from ngrawpmparser import NgRawPmParser, LogSink
+try:
+    import resource
+except ImportError:
+    resource = None
+
+class NgBenchLog(LogSink):
+    '''
+    Collect logs of raw PM parser instead of displaying them.
+    '''
+    def __init__(self, verbose=False):
+        super().__init__()
+        self.verbose = verbose
+        self.history = []
+
+    def emit(self, logs, progress):
+        self.history.extend(logs)
+        if self.verbose:
+            for text in logs:
+                print(text)
+
+def genRawPm(outDir, rat='5g', numFiles=10, numDns=20, numMeasTypes=4, numCounters=20, numIntervals=4, seed=0):
+    '''
+    Generate synthetic raw PM xml files in outDir.
+    Each file holds numIntervals 15-minute PMSetups of one BTS, each with numDns DNs per measType and numCounters counters per DN.
+    About 1% of the counters are empty, which is how invalid counters appear in real raw PM.
+    Return the total number of counters generated.
+    '''
+    rnd = random.Random(seed)
+    if not os.path.exists(outDir):
+        os.makedirs(outDir)
+
+    total = 0
+    for i in range(numFiles):
+        bts = 10000 + i
+        lines = ['<?xml version="1.0" encoding="UTF-8"?>', '<OMeS>']
+        for j in range(numIntervals):
+            startTime = '2019-03-21T%02d:%02d:00.000+08:00' % (j * 15 // 60 % 24, j * 15 % 60)
+            lines.append('<PMSetup startTime="%s" interval="15">' % startTime)
+            for m in range(numMeasTypes):
+                meas = measId(m)
+                for k in range(numDns if m % 2 == 1 else 1):
+                    if rat == '5g':
+                        #even measTypes are of NRBTS level, odd ones are of NRCELL level
+                        dn = 'MRBTS-%d/NRBTS-1' % bts if m % 2 == 0 else 'MRBTS-%d/NRBTS-1/NRCELL-%d' % (bts, k)
+                        lines.append('<PMMOResult><MO dimension="network_element"><DN>PLMN-PLMN/%s</DN></MO><PMTarget measurementType="NR_M%d">' % (dn, meas))
+                    else:
+                        dn = 'LNBTS-%d' % bts if m % 2 == 0 else 'LNBTS-%d/LNCEL-%d' % (bts, k)
+                        lines.append('<PMMOResult><MO><baseId>NE-MRBTS-%d</baseId><localMoid>DN:NE-%s</localMoid></MO><NE-WBTS_1.0 measurementType="LTE_M%d">' % (bts, dn, meas))
+                    for c in range(numCounters):
+                        tag = counterName(meas, c)
+                        val = str(rnd.randint(0, 1000)) if rnd.random() > 0.01 else ''
+                        lines.append('<%s>%s</%s>' % (tag, val, tag))
+                    total = total + numCounters
+                    lines.append('</PMTarget></PMMOResult>' if rat == '5g' else '</NE-WBTS_1.0></PMMOResult>')
+            lines.append('</PMSetup>')
+        lines.append('</OMeS>')
+
+        with open(os.path.join(outDir, 'PM.BTS-%d.20190321.xml' % bts), 'w') as f:
+            f.write('\n'.join(lines))
+
+    return total
+
+def genKpiDef(confDir, numMeasTypes=4, numCounters=20):
+    '''
+    Generate kpi_def_bench.txt in confDir with one ratio KPI and one plain KPI for each pair of counters of each measType.
+    Return the number of KPIs generated.
+    '''
+    if not os.path.exists(confDir):
+        os.makedirs(confDir)
+
+    num = 0
+    with open(os.path.join(confDir, 'kpi_def_bench.txt'), 'w') as f:
+        f.write('#synthetic kpi definitions generated by ngrawpmbench.py\n')
+        for m in range(numMeasTypes):
+            meas = measId(m)
+            for c in range(0, numCounters - 1, 2):
+                f.write('kpi_name=BENCH_M%d_R%d\nkpi_f=100\nkpi_x=(%s,1)\nkpi_y=(%s,1);(%s,1)\nkpi_p=2\n\n' % (meas, c, counterName(meas, c), counterName(meas, c), counterName(meas, c + 1)))
+                f.write('kpi_name=BENCH_M%d_S%d\nkpi_x=(%s,1);(%s,-1)\n\n' % (meas, c, counterName(meas, c), counterName(meas, c + 1)))
+                num = num + 2
+
+    return num
+
+def measId(m):
+    return 55100 + m
+
+def counterName(meas, c):
+    return 'M%dC%05d' % (meas, c)
+
+def peakRss():
+    '''
+    Return peak RSS(in MB) of the current process and of its terminated worker processes, or None if unavailable.
+    '''
+    if resource is None:
+        return (None, None)
+    #ru_maxrss is in KB on linux and in bytes on macOS
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale)
+
+def runBench(args):
+    workDir = args.workdir if args.workdir is not None else tempfile.mkdtemp(prefix='ngrawpmbench_')
+    tStart = time.perf_counter()
+    numCounters = genRawPm(os.path.join(workDir, 'data/raw_pm'), args.rat, args.files, args.dns, args.meastypes, args.counters, args.intervals, args.seed)
+    numKpis = genKpiDef(os.path.join(workDir, 'config'), args.meastypes, args.counters)
+    print('Generated %d files with %d counters and %d KPIs in %.2fs: %s' % (args.files, numCounters, numKpis, time.perf_counter() - tStart, workDir))
+
+    results = []
+    try:
+        for i in range(args.runs):
+            log = NgBenchLog(args.verbose)
+            tStart = time.perf_counter()
+            parser = NgRawPmParser(log, args.rat, numWorkers=args.workers, useCache=args.cache, exportFormat=args.export, workDir=workDir)
+            parser.run()
+            elapsed = time.perf_counter() - tStart
+
+            timings = parser.timings
+            result = {'run':i, 'files':args.files, 'counters':numCounters, 'kpis':numKpis, 'total':elapsed}
+            result.update(timings)
+            result['filesPerSec'] = args.files / timings['parse'] if timings['parse'] > 0 else None
+            result['countersPerSec'] = numCounters / timings['parse'] if timings['parse'] > 0 else None
+            result['peakRss'], result['peakRssWorkers'] = peakRss()
+            results.append(result)
+
+            errors = [text for text in log.history if 'Traceback' in text]
+            print('run#%d: total=%.2fs, parse=%.2fs, kpi=%.2fs, rollup=%.2fs, export=%.2fs, files/sec=%.1f, counters/sec=%.0f, peak rss=%s MB(workers=%s MB)%s' % (
+                i, elapsed, timings['parse'], timings['kpi'], timings['rollup'], timings['export'], result['filesPerSec'] or 0, result['countersPerSec'] or 0,
+                '%.1f' % result['peakRss'] if result['peakRss'] is not None else 'NA', '%.1f' % result['peakRssWorkers'] if result['peakRssWorkers'] is not None else 'NA',
+                ', %d errors' % len(errors) if len(errors) > 0 else ''))
+    finally:
+        if args.workdir is None and not args.keep:
+            shutil.rmtree(workDir, ignore_errors=True)
+
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    #compare the best run with the baseline, so regressions are caught
+    if args.baseline is not None:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        best = min(results, key=lambda x:x['total'])
+        ref = min(baseline, key=lambda x:x['total'])
+        regressions = []
+        for stage in ('total', 'parse', 'kpi', 'rollup', 'export'):
+            if stage in ref and ref[stage] > 0 and best[stage] > ref[stage] * (1 + args.tolerance):
+                regressions.append('%s: %.2fs -> %.2fs' % (stage, ref[stage], best[stage]))
+        if len(regressions) > 0:
+            print('Performance regressions(tolerance=%.0f%%): %s' % (args.tolerance * 100, ', '.join(regressions)))
+            return 1
+        print('No performance regression against baseline: %s' % args.baseline)
+
+    return 0
+
+if __name__ == '__main__':
+    argParser = argparse.ArgumentParser(description='Benchmark of raw PM parser with synthetic raw PM.')
+    argParser.add_argument('--rat', choices=('5g', '4g'), default='5g')
+    argParser.add_argument('--files', type=int, default=20, help='number of raw PM files')
+    argParser.add_argument('--dns', type=int, default=50, help='number of cells per file')
+    argParser.add_argument('--meastypes', type=int, default=8, help='number of measTypes')
+    argParser.add_argument('--counters', type=int, default=40, help='number of counters per measType')
+    argParser.add_argument('--intervals', type=int, default=4, help='number of 15-minute intervals per file')
+    argParser.add_argument('--seed', type=int, default=0)
+    argParser.add_argument('--workers', type=int, default=None, help='number of worker processes, defaults to cpu count')
+    argParser.add_argument('--cache', action='store_true', help='enable the parsed-file cache, so runs after the first one hit it')
+    argParser.add_argument('--export', choices=('xlsx', 'csv', 'parquet'), default='xlsx')
+    argParser.add_argument('--runs', type=int, default=1)
+    argParser.add_argument('--workdir', default=None, help='directory for synthetic data and report, defaults to a temporary directory')
+    argParser.add_argument('--keep', action='store_true', help='keep the temporary directory')
+    argParser.add_argument('--verbose', action='store_true', help='print logs of raw PM parser')
+    argParser.add_argument('--output', default=None, help='save results as json')
+    argParser.add_argument('--baseline', default=None, help='json results of a previous run to compare with')
+    argParser.add_argument('--tolerance', type=float, default=0.2, help='allowed slowdown against baseline')
+    sys.exit(runBench(argParser.parse_args()))
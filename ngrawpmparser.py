@@ -13,85 +13,719 @@ Change History:
 import os
 import time
 import traceback
-from datetime import datetime
+import gzip
+import hashlib
+import pickle
+import re
+from datetime import datetime, timedelta
 import tarfile
 import xml.etree.ElementTree as ET
-import ngmainwin
+from concurrent.futures import ProcessPoolExecutor
+from array import array
+import csv
 import xlsxwriter
-from PyQt5.QtWidgets import qApp
+import numpy as np
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    #pyarrow is optional and only required to export reports as parquet
+    pa = None
+
+#state of a counter cell in PmMeasTable
+CNT_ABSENT = 0
+CNT_INT = 1
+CNT_TEXT = 2
+INT64_MIN = -2**63
+INT64_MAX = 2**63 - 1
+
+class PmMeasTable(object):
+    '''
+    Counters of one measType stored column by column.
+    Row r holds the counters of key id self.rowKeys[r], column c holds the counter self.tagList[c].
+    Integer counters live in 64-bit typed arrays, the rare non-integer texts are kept aside in self.texts.
+    '''
+    def __init__(self):
+        self.rowKeys = array('q') #row -> key id
+        self.rows = dict() #key id -> row
+        self.tags = dict() #tag -> column
+        self.tagList = [] #column -> tag
+        self.values = [] #list of array('q'), one per column
+        self.states = [] #list of bytearray, one per column, see CNT_ABSENT/CNT_INT/CNT_TEXT
+        self.texts = dict() #[key=(row, column), val=text]
+
+    def row(self, keyId):
+        row = self.rows.get(keyId)
+        if row is None:
+            row = len(self.rowKeys)
+            self.rows[keyId] = row
+            self.rowKeys.append(keyId)
+            for col in range(len(self.tagList)):
+                self.values[col].append(0)
+                self.states[col].append(CNT_ABSENT)
+        return row
+
+    def column(self, tag):
+        col = self.tags.get(tag)
+        if col is None:
+            col = len(self.tagList)
+            self.tags[tag] = col
+            self.tagList.append(tag)
+            self.values.append(array('q', bytes(8 * len(self.rowKeys))))
+            self.states.append(bytearray(len(self.rowKeys)))
+        return col
+
+    def set(self, row, col, text):
+        val = toInt(text)
+        if val is not None and INT64_MIN <= val <= INT64_MAX:
+            self.setInt(row, col, val)
+        else:
+            self.values[col][row] = 0
+            self.states[col][row] = CNT_TEXT
+            self.texts[(row, col)] = text
+
+    def setInt(self, row, col, val):
+        self.values[col][row] = val
+        if self.states[col][row] == CNT_TEXT:
+            del self.texts[(row, col)]
+        self.states[col][row] = CNT_INT
+
+    def get(self, row, col):
+        #return the counter as int, text, or 'NA' if absent
+        state = self.states[col][row]
+        if state == CNT_INT:
+            return self.values[col][row]
+        if state == CNT_TEXT:
+            return self.texts[(row, col)]
+        return 'NA'
+
+    def npColumn(self, col):
+        #return (values, states) of column col as numpy arrays
+        return (np.array(self.values[col], dtype=np.int64), np.array(self.states[col], dtype=np.uint8))
+
+    def iterRows(self, tags):
+        '''
+        Yield (key id, [counter of each tag]) in insertion order, absent counters are 'NA'.
+        '''
+        cols = [self.tags.get(tag) for tag in tags]
+        values = [self.values[col].tolist() if col is not None else None for col in cols]
+        states = [self.states[col] if col is not None else None for col in cols]
+        for row,keyId in enumerate(self.rowKeys):
+            line = []
+            for i,col in enumerate(cols):
+                state = states[i][row] if col is not None else CNT_ABSENT
+                if state == CNT_INT:
+                    line.append(values[i][row])
+                elif state == CNT_TEXT:
+                    line.append(self.texts[(row, col)])
+                else:
+                    line.append('NA')
+            yield (keyId, line)
+
+class PmCounterStore(object):
+    '''
+    Columnar store of raw PM counters: {measType, PmMeasTable}.
+    Keys('stime;interval;dn') are interned once and referenced by integer key id.
+    '''
+    def __init__(self):
+        self.keys = [] #key id -> 'stime;interval;dn'
+        self.keyIds = dict() #'stime;interval;dn' -> key id
+        self.tables = dict() #[key=measType, val=PmMeasTable]
+
+    def keyId(self, key):
+        keyId = self.keyIds.get(key)
+        if keyId is None:
+            keyId = len(self.keys)
+            self.keyIds[key] = keyId
+            self.keys.append(key)
+        return keyId
+
+    def table(self, measType):
+        if measType not in self.tables:
+            self.tables[measType] = PmMeasTable()
+        return self.tables[measType]
+
+    def add(self, measType, key, tag, text):
+        table = self.table(measType)
+        table.set(table.row(self.keyId(key)), table.column(tag), text)
+
+    def merge(self, other):
+        #merge other PmCounterStore into self, counters of other overwrite existing ones
+        keyIds = [self.keyId(key) for key in other.keys]
+        for measType,src in other.tables.items():
+            dst = self.table(measType)
+            rows = [dst.row(keyIds[keyId]) for keyId in src.rowKeys]
+            for srcCol,tag in enumerate(src.tagList):
+                dstCol = dst.column(tag)
+                values = src.values[srcCol]
+                states = src.states[srcCol]
+                for srcRow,dstRow in enumerate(rows):
+                    if states[srcRow] == CNT_INT:
+                        dst.setInt(dstRow, dstCol, values[srcRow])
+                    elif states[srcRow] == CNT_TEXT:
+                        dst.set(dstRow, dstCol, src.texts[(srcRow, srcCol)])
+
+    def counterMatrix(self, keys, counters):
+        '''
+        Return (values, valid) with rows = keys and cols = counters.
+        If a counter exists in several measTypes, the first measType(in insertion order) having it for a key wins.
+        '''
+        keyIds = [self.keyIds[key] for key in keys]
+        values = np.zeros((len(keys), len(counters)), dtype=np.int64)
+        valid = np.zeros((len(keys), len(counters)), dtype=bool)
+        found = np.zeros((len(keys), len(counters)), dtype=bool)
+        for table in self.tables.values():
+            cols = [(j, table.tags[counter]) for j,counter in enumerate(counters) if counter in table.tags]
+            if len(cols) == 0:
+                continue
+            rows = np.array([table.rows.get(keyId, -1) for keyId in keyIds], dtype=np.int64)
+            hasRow = rows >= 0
+            for j,col in cols:
+                vals, states = table.npColumn(col)
+                state = np.where(hasRow, states[rows], CNT_ABSENT)
+                mask = ~found[:, j] & (state != CNT_ABSENT)
+                found[mask, j] = True
+                valid[mask, j] = state[mask] == CNT_INT
+                values[mask, j] = vals[rows[mask]]
+
+        return (values, valid)
+
+#aggregation levels not exported to the KPI report
+UNUSED_AGGS = ('NRCUUP', 'SFP', 'MNLENT', 'ETHLK', 'ETHIF', 'IPIF', 'IPADDRESSV4', 'IPNO', 'LNMME', 'VLANIF', 'IPVOL', 'SMOD', 'LTAC', 'LNADJ', 'FSTSCH')
+
+class RollUp(object):
+    '''
+    Roll-up of counter rows to a DN level and/or time bucket.
+    level: None(keep DN), DN class(e.g. 'NRBTS' maps MRBTS-1/NRBTS-1/NRCELL-2 to MRBTS-1/NRBTS-1), 'CLUSTER'(see config/cluster_def.txt) or 'PLMN'(whole network)
+    bucket: None(keep stime and interval), 'hour', 'day' or 'week'(starting on Monday)
+    Rows whose DN has no such level(or cluster) are left out.
+    '''
+    BUCKETS = {'hour':'60', 'day':'1440', 'week':'10080'}
+
+    def __init__(self, level, bucket, clusters=None):
+        self.level = level
+        self.bucket = bucket
+        self.clusters = clusters if clusters is not None else dict()
+        #memoization of the mapping of stime/interval and dn
+        self.timeMap = dict()
+        self.dnMap = dict()
+
+    def __str__(self):
+        return 'level=%s,bucket=%s' % (self.level, self.bucket)
+
+    def mapTime(self, stime, interval):
+        if self.bucket is None:
+            return (stime, interval)
+
+        t = datetime.strptime(stime, '%Y-%m-%d_%H:%M:%S')
+        if self.bucket == 'hour':
+            t = t.replace(minute=0, second=0)
+        else:
+            t = t.replace(hour=0, minute=0, second=0)
+            if self.bucket == 'week':
+                t = t - timedelta(days=t.weekday())
+        return (t.strftime('%Y-%m-%d_%H:%M:%S'), RollUp.BUCKETS[self.bucket])
+
+    def mapDn(self, dn):
+        if self.level is None:
+            return dn
+        if self.level == 'PLMN':
+            return 'PLMN'
+
+        tokens = dn.split('/')
+        if self.level == 'CLUSTER':
+            #the longest dn prefix defined wins
+            for i in range(len(tokens), 0, -1):
+                prefix = '/'.join(tokens[:i])
+                if prefix in self.clusters:
+                    return 'CLUSTER-%s' % self.clusters[prefix]
+            return None
+
+        for i,token in enumerate(tokens):
+            if token.split('-')[0] == self.level:
+                return '/'.join(tokens[:i+1])
+        return None
+
+    def groupKey(self, key):
+        stime, interval, dn = key.split(';')
+        if (stime, interval) not in self.timeMap:
+            self.timeMap[(stime, interval)] = self.mapTime(stime, interval)
+        if dn not in self.dnMap:
+            self.dnMap[dn] = self.mapDn(dn)
+        if self.dnMap[dn] is None:
+            return None
+        return '%s;%s;%s' % (self.timeMap[(stime, interval)] + (self.dnMap[dn],))
+
+    def sum(self, keys, values, valid):
+        '''
+        Sum counter rows(keys, values, valid as returned by PmCounterStore.counterMatrix) of the same group.
+        A summed counter is valid only if it's valid in every row of its group, so that KPIs of a group with missing counters(e.g. an empty hour or cell) are NA
+        instead of being calculated over mismatched rows.
+        Return (sorted group keys, sums, valid).
+        '''
+        groups = [self.groupKey(key) for key in keys]
+        rows = np.array([i for i,group in enumerate(groups) if group is not None], dtype=np.int64)
+        if len(rows) == 0:
+            return ([], np.zeros((0, values.shape[1]), dtype=np.int64), np.zeros((0, values.shape[1]), dtype=bool))
+
+        groupKeys, inverse = np.unique(np.array([groups[i] for i in rows]), return_inverse=True)
+        #sort rows by group and reduce each run of rows
+        order = np.argsort(inverse, kind='stable')
+        starts = np.flatnonzero(np.r_[True, np.diff(inverse[order]) != 0])
+        rows = rows[order]
+        sums = np.add.reduceat(np.where(valid[rows], values[rows], 0), starts, axis=0)
+        counts = np.add.reduceat(valid[rows].astype(np.int64), starts, axis=0)
+        sizes = np.add.reduceat(np.ones(len(rows), dtype=np.int64), starts)
+        return (groupKeys.tolist(), sums, counts == sizes[:, np.newaxis])
+
+class KpiTable(object):
+    '''
+    KPI results of one aggregation level, stored column by column.
+    self.columns[i] holds the value of KPI self.names[i] for each of self.keys('stime;interval;dn').
+    '''
+    def __init__(self, agg, keys):
+        self.agg = agg
+        self.keys = keys
+        self.names = []
+        self.columns = []
+
+    def set(self, name, column):
+        #a KPI defined more than once keeps its first position and its last values
+        if name in self.names:
+            self.columns[self.names.index(name)] = column
+        else:
+            self.names.append(name)
+            self.columns.append(column)
+
+    def iterRows(self):
+        #yield ('stime;interval;dn', [value of each KPI])
+        for i,key in enumerate(self.keys):
+            yield (key, [column[i] for column in self.columns])
+
+class XlsxReportWriter(object):
+    '''
+    Write report sheets into a xlsx workbook.
+    The workbook works in constant memory mode, i.e. each row is flushed to disk once the next row is started, so rows must be written in order.
+    '''
+    def __init__(self, fn):
+        self.fn = fn
+        self.workbook = xlsxwriter.Workbook(fn, {'constant_memory':True})
+        self.fmtHHeader = self.workbook.add_format({'font_name':'Arial', 'font_size':9, 'align':'center', 'valign':'vcenter', 'text_wrap':True, 'bg_color':'yellow'})
+        self.fmtCell = self.workbook.add_format({'font_name':'Arial', 'font_size':9, 'align':'left', 'valign':'vcenter'})
+        self.sheet = None
+        self.count = 0
+
+    def addSheet(self, name, header):
+        self.sheet = self.workbook.add_worksheet(name[:31] if len(name) > 31 else name)
+        self.sheet.set_zoom(90)
+        self.sheet.freeze_panes(1, 3)
+
+        #write header
+        self.sheet.write_row(0, 0, header, self.fmtHHeader)
+        self.count = 0
+
+    def writeRow(self, row):
+        self.sheet.write_row(self.count+1, 0, row, self.fmtCell)
+        self.count = self.count + 1
+
+    def close(self):
+        self.workbook.close()
+
+class CsvReportWriter(object):
+    '''
+    Write each report sheet as a csv file into directory fn.
+    '''
+    def __init__(self, fn):
+        self.fn = fn
+        if not os.path.exists(self.fn):
+            os.makedirs(self.fn)
+        self.f = None
+        self.writer = None
+
+    def addSheet(self, name, header):
+        self.close()
+        self.f = open(os.path.join(self.fn, '%s.csv' % name), 'w', newline='')
+        self.writer = csv.writer(self.f)
+        self.writer.writerow(header)
+
+    def writeRow(self, row):
+        self.writer.writerow(row)
+
+    def close(self):
+        if self.f is not None:
+            self.f.close()
+            self.f = None
+
+class ParquetReportWriter(object):
+    '''
+    Write each report sheet as a parquet file into directory fn(requires pyarrow).
+    STIME/INTERVAL/DN are string columns, other columns are float64 where NA or any non-numeric value is null.
+    Rows are flushed as a row group every BATCH_SIZE rows.
+    '''
+    BATCH_SIZE = 65536
+
+    def __init__(self, fn):
+        self.fn = fn
+        if not os.path.exists(self.fn):
+            os.makedirs(self.fn)
+        self.writer = None
+        self.rows = []
+
+    def addSheet(self, name, header):
+        self.close()
+        fields = [pa.field(h, pa.string()) if i < 3 else pa.field(h, pa.float64()) for i,h in enumerate(header)]
+        self.schema = pa.schema(fields)
+        self.writer = pq.ParquetWriter(os.path.join(self.fn, '%s.parquet' % name), self.schema)
+
+    def writeRow(self, row):
+        self.rows.append(row)
+        if len(self.rows) >= ParquetReportWriter.BATCH_SIZE:
+            self.flush()
+
+    def flush(self):
+        if len(self.rows) == 0:
+            return
+        columns = []
+        for i,field in enumerate(self.schema):
+            if i < 3:
+                columns.append(pa.array([row[i] for row in self.rows], type=pa.string()))
+            else:
+                columns.append(pa.array([toFloat(row[i]) for row in self.rows], type=pa.float64()))
+        self.writer.write_table(pa.Table.from_arrays(columns, schema=self.schema))
+        self.rows = []
+
+    def close(self):
+        if self.writer is not None:
+            self.flush()
+            self.writer.close()
+            self.writer = None
+
+class RawPmFilter(object):
+    '''
+    Filter pushed down into raw PM parsing.
+    startTime/endTime: time window [startTime, endTime) in the same format as keys, e.g. '2019-03-21_20:00:00'
+    intervals: allowed intervals in minutes, e.g. ['15']
+    dnPrefixes: allowed DN prefixes, e.g. ['MRBTS-53775/']
+    dnRegex: regular expression which must be found in DN
+    measTypes: allowed measurement types
+    Each criterion is ignored if it is None, and DN is the one used in keys(i.e. without 'PLMN-PLMN/' or 'NE-').
+    '''
+    def __init__(self, startTime=None, endTime=None, intervals=None, dnPrefixes=None, dnRegex=None, measTypes=None):
+        self.startTime = startTime
+        self.endTime = endTime
+        self.intervals = set(str(i) for i in intervals) if intervals is not None else None
+        self.dnPrefixes = tuple(dnPrefixes) if dnPrefixes is not None else None
+        self.dnRegex = re.compile(dnRegex) if dnRegex is not None else None
+        self.measTypes = set(measTypes) if measTypes is not None else None
+
+    def __str__(self):
+        return 'startTime=%s,endTime=%s,intervals=%s,dnPrefixes=%s,dnRegex=%s,measTypes=%s' % self.signature()
+
+    def signature(self):
+        return (self.startTime, self.endTime,
+                tuple(sorted(self.intervals)) if self.intervals is not None else None,
+                self.dnPrefixes,
+                self.dnRegex.pattern if self.dnRegex is not None else None,
+                tuple(sorted(self.measTypes)) if self.measTypes is not None else None)
+
+    def acceptSetup(self, startTime, interval):
+        if self.startTime is not None and startTime < self.startTime:
+            return False
+        if self.endTime is not None and startTime >= self.endTime:
+            return False
+        if self.intervals is not None and interval not in self.intervals:
+            return False
+        return True
+
+    def acceptResult(self, dn, measType):
+        if self.measTypes is not None and measType not in self.measTypes:
+            return False
+        if self.dnPrefixes is not None and not dn.startswith(self.dnPrefixes):
+            return False
+        if self.dnRegex is not None and self.dnRegex.search(dn) is None:
+            return False
+        return True
+
+class RawPmCache(object):
+    '''
+    On-disk cache of parsed raw PM files.
+    There is one entry per file path, which holds the signature(path, size, mtime, rat, filter) of the parsed file followed by its PmCounterStore,
+    both pickled into a gzip stream. An entry is valid only if its signature matches the current file.
+    '''
+    #increase VERSION whenever the pickled layout of PmCounterStore changes
+    VERSION = 1
+
+    def __init__(self, cacheDir):
+        self.cacheDir = cacheDir
+        if not os.path.exists(self.cacheDir):
+            os.makedirs(self.cacheDir)
+
+    def entry(self, fn):
+        return os.path.join(self.cacheDir, '%s.pkl.gz' % hashlib.sha1(os.path.abspath(fn).encode('utf-8')).hexdigest())
+
+    def signature(self, fn, rat, pmFilter=None):
+        st = os.stat(fn)
+        return (RawPmCache.VERSION, os.path.abspath(fn), st.st_size, st.st_mtime_ns, rat, pmFilter.signature() if pmFilter is not None else None)
+
+    def isValid(self, fn, sig):
+        #only the leading signature is unpickled
+        try:
+            with gzip.open(self.entry(fn), 'rb') as f:
+                return pickle.load(f) == sig
+        except Exception as e:
+            return False
+
+    def load(self, fn, sig):
+        #return the cached PmCounterStore, or None if the entry is missing or stale
+        try:
+            with gzip.open(self.entry(fn), 'rb') as f:
+                if pickle.load(f) != sig:
+                    return None
+                return pickle.load(f)
+        except Exception as e:
+            return None
+
+    def save(self, fn, sig, store):
+        entry = self.entry(fn)
+        with gzip.open(entry + '.tmp', 'wb', compresslevel=1) as f:
+            pickle.dump(sig, f, pickle.HIGHEST_PROTOCOL)
+            pickle.dump(store, f, pickle.HIGHEST_PROTOCOL)
+        os.replace(entry + '.tmp', entry)
+
+    def prune(self, fns):
+        #remove entries(and partial writes) of files other than fns, e.g. raw PM files deleted or replaced since last run, return number of entries removed
+        keep = set([os.path.basename(self.entry(fn)) for fn in fns])
+        numRemoved = 0
+        for name in os.listdir(self.cacheDir):
+            if name in keep or not (name.endswith('.pkl.gz') or name.endswith('.pkl.gz.tmp')):
+                continue
+            try:
+                os.remove(os.path.join(self.cacheDir, name))
+                numRemoved = numRemoved + 1
+            except OSError:
+                pass
+        return numRemoved
+
+class KpiPlan(object):
+    '''
+    Valid KPI definitions of the same aggregation level compiled into coefficient matrices.
+    For a counter matrix V(rows='stime;interval;dn', cols=self.counters): X = V*xCoef, Y = V*yCoef + yConst.
+    '''
+    def __init__(self, agg, kpis):
+        self.agg = agg
+        self.kpis = kpis
+        self.counters = []
+        cols = dict()
+        for kpi in kpis:
+            for z in (kpi[2], kpi[3]):
+                if isinstance(z, list):
+                    for item in z:
+                        if item[0] not in cols:
+                            cols[item[0]] = len(self.counters)
+                            self.counters.append(item[0])
+
+        self.xCoef = np.zeros((len(self.counters), len(kpis)), dtype=np.int64)
+        self.yCoef = np.zeros((len(self.counters), len(kpis)), dtype=np.int64)
+        self.yConst = np.zeros(len(kpis), dtype=np.int64)
+        #counters referenced by each kpi, which is NA if any of them is missing or invalid
+        self.used = np.zeros((len(self.counters), len(kpis)), dtype=np.int64)
+        for i,kpi in enumerate(kpis):
+            for a,b in kpi[2]:
+                self.xCoef[cols[a], i] += b
+                self.used[cols[a], i] = 1
+            if isinstance(kpi[3], list):
+                for a,b in kpi[3]:
+                    self.yCoef[cols[a], i] += b
+                    self.used[cols[a], i] = 1
+            elif kpi[3] is not None:
+                self.yConst[i] = kpi[3]
+
+    def evaluate(self, values, valid):
+        '''
+        Evaluate all KPIs in one pass and return (results, na).
+        results[i] is the list of values of self.kpis[i] for each row, na is the boolean matrix of NA results.
+        '''
+        xval = values @ self.xCoef
+        yval = values @ self.yCoef + self.yConst
+        na = ((~valid).astype(np.int64) @ self.used) > 0
+
+        results = []
+        for i,kpi in enumerate(self.kpis):
+            f, y, p = kpi[1], kpi[3], kpi[4]
+            if f is not None and y is not None and p is not None:
+                #kpi=f*x/y, which is 0 if y is 0
+                nonzero = yval[:, i] != 0
+                ratio = np.zeros(len(nonzero))
+                ratio[nonzero] = f * xval[nonzero, i] / yval[nonzero, i]
+                col = ['{:0.{precision}f}'.format(r, precision=p) if nz else 0 for r,nz in zip(ratio.tolist(), nonzero.tolist())]
+            elif f is None and y is None and p is None:
+                #kpi=x
+                col = xval[:, i].tolist()
+            else:
+                col = ['NA'] * len(xval)
+
+            for j in np.flatnonzero(na[:, i]).tolist():
+                col[j] = 'NA'
+            results.append(col)
+
+        return (results, na)
+
+class LogSink(object):
+    '''
+    Batched and rate-limited sink of logs and progress events of raw PM parser.
+    Logs are buffered and handed over to emit() at most once every interval seconds(or once maxBatch logs are buffered), so a slow consumer(e.g. a QTextEdit) doesn't slow down parsing.
+    Subclasses override emit(), and flush() must be called once done.
+    '''
+    def __init__(self, interval=0.5, maxBatch=1000, debug=False):
+        self.interval = interval
+        self.maxBatch = maxBatch
+        #dump KPI results to the log if True
+        self.debug = debug
+        self.logs = []
+        #the latest progress event of (stage, done, total), or None if not changed since the last flush
+        self.lastProgress = None
+        self.lastFlush = time.monotonic()
+
+    def log(self, text):
+        self.logs.append(text)
+        if len(self.logs) >= self.maxBatch or time.monotonic() - self.lastFlush >= self.interval:
+            self.flush()
+
+    def progress(self, stage, done, total):
+        self.lastProgress = (stage, done, total)
+        if done == total or time.monotonic() - self.lastFlush >= self.interval:
+            self.flush()
+
+    def flush(self):
+        logs = self.logs
+        progress = self.lastProgress
+        self.logs = []
+        self.lastProgress = None
+        self.lastFlush = time.monotonic()
+        if len(logs) > 0 or progress is not None:
+            self.emit(logs, progress)
+
+    def emit(self, logs, progress):
+        '''
+        logs: list of log texts(which may contain html font tags) since the last call
+        progress: the latest (stage, done, total) since the last call, or None
+        '''
+        pass
+
+class ConsoleLogSink(LogSink):
+    '''
+    Print logs and progress to stdout, with html tags stripped.
+    '''
+    def __init__(self, interval=0.5, maxBatch=1000, debug=False, quiet=False):
+        super().__init__(interval, maxBatch, debug)
+        self.quiet = quiet
+        self.reTag = re.compile(r'<[^>]+>')
+
+    def emit(self, logs, progress):
+        if not self.quiet:
+            for text in logs:
+                print(self.reTag.sub('', text))
+        if progress is not None:
+            print('[%s] %d/%d' % progress, flush=True)
 
 class NgRawPmParser(object):
-    def __init__(self, ngwin, rat):
-        self.ngwin = ngwin
+    '''
+    Headless raw PM parser and KPI engine, which logs and reports progress through a LogSink.
+    Call run() to parse raw PM, calculate KPIs(and roll-ups) and export the report, or call the stages one by one.
+    '''
+    def __init__(self, sink, rat, numWorkers=None, useCache=False, extractTgz=False, exportFormat='xlsx', pmFilter=None, rollUps=None, workDir=None):
+        self.sink = sink
         self.rat = rat
-        self.inDir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data/raw_pm')
-        self.outDir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'output')
+        self.exportFormat = exportFormat
+        #roll up counters along dn hierarchy and/or time, e.g. rollUps=[('NRBTS', None), ('MRBTS', 'day'), ('CLUSTER', 'hour'), (None, 'week')]
+        self.rollUps = rollUps
+        #wall clock time(in seconds) of each stage
+        self.timings = dict()
+        #optional RawPmFilter applied while parsing
+        self.pmFilter = pmFilter
+        #number of worker processes used to parse raw pm xml, use 1 to parse in the current process
+        self.numWorkers = numWorkers if numWorkers is not None else os.cpu_count()
+        #working directory containing data/raw_pm, config, cache and output, defaults to where the toolset is installed
+        self.workDir = workDir if workDir is not None else os.path.dirname(os.path.abspath(__file__))
+        self.inDir = os.path.join(self.workDir, 'data/raw_pm')
+        self.outDir = os.path.join(self.workDir, 'output')
         if not os.path.exists(self.outDir):
             os.mkdir(self.outDir)
+        self.cache = RawPmCache(os.path.join(self.workDir, 'cache/raw_pm')) if useCache else None
+        self.confDir = os.path.join(self.workDir, 'config')
+        self.extractTgz = extractTgz
+
+    def log(self, text):
+        self.sink.log(text)
 
-        #extract tar.gz
+    def run(self):
+        try:
+            for stage,func in (('parse', self.parse), ('kpi', self.calcKpis), ('rollup', self.calcRollUps), ('export', self.exportReport)):
+                tStart = time.perf_counter()
+                func()
+                self.timings[stage] = time.perf_counter() - tStart
+        finally:
+            self.sink.flush()
+
+    def parse(self):
+        if self.pmFilter is not None:
+            self.log('<font color=blue>Raw PM filter: %s</font>' % self.pmFilter)
+
+        #extract tar.gz if required, otherwise members of tar.gz are parsed in memory like xml files
         for root, dirs, files in os.walk(self.inDir):
             self.tgzs = sorted([os.path.join(root, fn) for fn in files if fn.lower().endswith('tar.gz')], key=str.lower)
+            if not self.extractTgz:
+                continue
             for tgz in self.tgzs:
-                tar = tarfile.open(tgz, 'r:gz')
-                fns = tar.getnames()
-                for fn in fns:
-                    tar.extract(fn, self.inDir)
-
-        #parse raw pm xml
-        self.data = dict()
-        self.tagsMap = dict()
+                with tarfile.open(tgz, 'r:gz') as tar:
+                    for member in tar.getmembers():
+                        #skip members extracted by previous runs, which also keeps their parsed-file cache valid
+                        target = os.path.join(self.inDir, member.name)
+                        if member.isfile() and os.path.isfile(target) and os.path.getsize(target) == member.size and int(os.path.getmtime(target)) == member.mtime:
+                            continue
+                        tar.extract(member, self.inDir)
+
+        #parse raw pm xml(and tar.gz)
+        self.store = PmCounterStore()
+        self.xmls = []
         for root, dirs, files in os.walk(self.inDir):
-            self.xmls = sorted([os.path.join(root, fn) for fn in files if fn.lower().endswith('xml')], key=str.lower)
-            for fn in self.xmls:
-                self.parseRawPmXml(fn, self.rat)
+            self.xmls.extend(sorted([os.path.join(root, fn) for fn in files if fn.lower().endswith('xml') or (not self.extractTgz and fn.lower().endswith('tar.gz'))], key=str.lower))
+        self.parseRawPmXmls(self.xmls, self.rat)
 
         #post-processing of raw pm
         self.aggMap = dict()
-        self.gnbKpiReport = dict()
-        for key1,val1 in self.data.items():
-            for key2,val2 in val1.items():
-                stime, interval, dn = key2.split(';')
-                agg = dn.split('/')[-1].split('-')[0]
-
-                #init gnbKpiReport: {agg, {'stime_interval_dn', {kpi_name, kpi_value}}}
-                if agg not in self.gnbKpiReport:
-                    self.gnbKpiReport[agg] = dict()
-                if key2 not in self.gnbKpiReport[agg]:
-                    self.gnbKpiReport[agg][key2] = dict()
+        aggOfKey = dict() #[key=key id, val=agg]
+        aggKeys = dict() #[key=agg, val=list of 'stime;interval;dn']
+        for table in self.store.tables.values():
+            for keyId in table.rowKeys:
+                if keyId not in aggOfKey:
+                    stime, interval, dn = self.store.keys[keyId].split(';')
+                    agg = dn.split('/')[-1].split('-')[0]
+                    aggOfKey[keyId] = agg
+                    if agg not in aggKeys:
+                        aggKeys[agg] = []
+                    aggKeys[agg].append(self.store.keys[keyId])
 
-                for key3,val3 in val2.items():
-                    if key3 not in self.aggMap:
-                        self.aggMap[key3] = agg
+            #agg of each tag is decided by the first key having it
+            for tag,col in table.tags.items():
+                if tag not in self.aggMap:
+                    row = int(np.flatnonzero(np.array(table.states[col], dtype=np.uint8))[0])
+                    self.aggMap[tag] = aggOfKey[table.rowKeys[row]]
 
-        #sort self.gnbKpiReport[agg].keys()
-        for agg in self.gnbKpiReport.keys():
-            keys = list(self.gnbKpiReport[agg].keys())
+        #init gnbKpiReport: {agg, KpiTable}, with sorted 'stime;interval;dn' keys
+        self.gnbKpiReport = dict()
+        for agg,keys in aggKeys.items():
             keys.sort()
-            val = {key:self.gnbKpiReport[agg][key] for key in keys}
-            self.gnbKpiReport[agg].clear()
-            self.gnbKpiReport[agg] = val
+            self.gnbKpiReport[agg] = KpiTable(agg, keys)
 
-        #print self.data
+    def calcKpis(self):
         '''
-        for key1,val1 in self.data.items():
-            self.ngwin.logEdit.append('|-measType=%s' % key1)
-            for key2,val2 in val1.items():
-                self.ngwin.logEdit.append('|--tag=%s' % key2)
-                for key3,val3 in val2.items():
-                    self.ngwin.logEdit.append('|----key=%s,val=%s' % (key3, val3))
-            qApp.processEvents()
-
-        for key,val in self.tagsMap.items():
-            self.ngwin.logEdit.append('key=%s,val=%s'%(key,val))
-
         for key,val in self.aggMap.items():
-            self.ngwin.logEdit.append('tag=%s,agg=%s'%(key,val))
+            self.log('tag=%s,agg=%s'%(key,val))
         '''
 
         #parse kpi definitions
         self.gnbKpis = []
-        self.confDir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config')
         for root, dirs, files in os.walk(self.confDir):
             self.kpiDefs = sorted([os.path.join(root, fn) for fn in files if (os.path.basename(fn).lower().startswith('kpi_def') or os.path.basename(fn).lower().startswith('menb_kpi_def')) and not fn.endswith('~')], key=str.lower)
             for fn in self.kpiDefs:
@@ -154,268 +788,229 @@ class NgRawPmParser(object):
                                 break
 
                 if invalidx or invalidy or aggx is None or (aggx is not None and aggy is not None and aggx != aggy):
-                    self.ngwin.logEdit.append('<font color=purple>Invalid KPI definition(name=%s,aggx=%s,aggy=%s), which will be ignored!</font>' % (kpi[0], aggx if aggx is not None else 'None', aggy if aggy is not None else 'None'))
-                    qApp.processEvents()
+                    self.log('<font color=purple>Invalid KPI definition(name=%s,aggx=%s,aggy=%s), which will be ignored!</font>' % (kpi[0], aggx if aggx is not None else 'None', aggy if aggy is not None else 'None'))
                     kpi[0] = None
                 else:
                     kpi[5] = aggx
             except Exception as e:
-                #self.ngwin.logEdit.append(str(e))
-                #self.ngwin.logEdit.append(repr(e))
-                #self.ngwin.logEdit.append(e.message)
-                self.ngwin.logEdit.append('<font color=purple>Invalid KPI definition(name=%s,aggx=%s,aggy=%s), which will be ignored!</font>' % (kpi[0], aggx if aggx is not None else 'None', aggy if aggy is not None else 'None'))
-                self.ngwin.logEdit.append(traceback.format_exc())
-                qApp.processEvents()
+                #self.log(str(e))
+                #self.log(repr(e))
+                #self.log(e.message)
+                self.log('<font color=purple>Invalid KPI definition(name=%s,aggx=%s,aggy=%s), which will be ignored!</font>' % (kpi[0], aggx if aggx is not None else 'None', aggy if aggy is not None else 'None'))
+                self.log(traceback.format_exc())
                 kpi[0] = None
                 continue
 
+        #compile valid kpis of each aggregation level into an evaluation plan
+        self.kpiPlans = dict()
+        for agg in self.gnbKpiReport.keys():
+            kpis = [kpi for kpi in self.gnbKpis if kpi[0] is not None and kpi[5] == agg]
+            if len(kpis) > 0:
+                self.kpiPlans[agg] = KpiPlan(agg, kpis)
+
         '''
         for kpi in self.gnbKpis:
             if kpi[0] is None:
                 continue
-            self.ngwin.logEdit.append('name=%s,f=%s,x=%s,y=%s,p=%s,agg=%s' % (kpi[0], kpi[1] if kpi[1] is not None else 'None', kpi[2], kpi[3] if kpi[3] is not None else 'None', kpi[4] if kpi[4] is not None else 'None', kpi[5] if kpi[5] is not None else 'None'))
-            qApp.processEvents()
+            self.log('name=%s,f=%s,x=%s,y=%s,p=%s,agg=%s' % (kpi[0], kpi[1] if kpi[1] is not None else 'None', kpi[2], kpi[3] if kpi[3] is not None else 'None', kpi[4] if kpi[4] is not None else 'None', kpi[5] if kpi[5] is not None else 'None'))
         '''
 
         #calculate kpi
-        self.ngwin.logEdit.append('<font color=blue>Calculating KPIs, please wait...</font>')
-        qApp.processEvents()
-        #reconstruct self.data to {'stime_interval_dn', {pm_tag, pm_value}}
-        data2 = dict()
-        for key1,val1 in self.data.items():
-            for key2,val2 in val1.items():
-                if key2 not in data2:
-                    data2[key2] = dict()
-                for key3,val3 in val2.items():
-                    if key3 not in data2[key2]:
-                        data2[key2][key3] = val3
+        self.log('<font color=blue>Calculating KPIs, please wait...</font>')
+        for i,(agg,plan) in enumerate(self.kpiPlans.items()):
+            keys = self.gnbKpiReport[agg].keys
+            values, valid = self.store.counterMatrix(keys, plan.counters)
+            results, na = plan.evaluate(values, valid)
+            for j,kpi in enumerate(plan.kpis):
+                self.gnbKpiReport[agg].set(kpi[0], results[j])
 
-        '''
-        for key1,val1 in data2.items():
-            self.ngwin.logEdit.append('|key=%s'%key1)
-            for key2,val2 in val1.items():
-                self.ngwin.logEdit.append('|--pm_tag=%s,pm_val=%s'%(key2,val2))
-        '''
+                numNa = int(na[:, j].sum())
+                if numNa > 0:
+                    self.log('<font color=purple>KPI(=%s) is NA for %d of %d DNs due to missing or invalid counters, e.g. DN=%s</font>' % (kpi[0], numNa, len(keys), keys[int(na[:, j].argmax())]))
+            self.sink.progress('kpi', i + 1, len(self.kpiPlans))
 
-        for key1,val1 in self.gnbKpiReport.items():
-            agg = key1
-            for key2,val2 in val1.items():
-                    #calculate valid kpi for key2('stime_interval_dn')
-                    for kpi in self.gnbKpis:
-                        try:
-                            if kpi[0] is None or kpi[5] != agg:
-                                continue
-
-                            f = kpi[1]
-                            x = kpi[2]
-                            y = kpi[3]
-                            p = kpi[4]
-
-                            #calculate x and y
-                            if x is not None:
-                                if not isinstance(x, int):
-                                    xval = 0
-                                    for item in x:
-                                        xval = xval + int(data2[key2][item[0]]) * item[1]
-                                else:
-                                    xval = x
+        if self.sink.debug:
+            for key1,val1 in self.gnbKpiReport.items():
+                self.log('|agg=%s'%key1)
+                for key2,val2 in val1.iterRows():
+                    self.log('|--key=%s'%key2)
+                    for key3,val3 in zip(val1.names, val2):
+                        self.log('|----kpi_name=%s,kpi_val=%s'%(key3,val3))
 
-                            if y is not None:
-                                if not isinstance(y, int):
-                                    yval = 0
-                                    for item in y:
-                                        yval = yval + int(data2[key2][item[0]]) * item[1]
-                                else:
-                                    yval = y
+    def calcRollUps(self):
+        self.rollUpReport = dict() #[key=(agg, level, bucket), val=KpiTable]
+        if self.rollUps is not None and len(self.rollUps) > 0:
+            self.clusters = self.parseClusterDef(os.path.join(self.confDir, 'cluster_def.txt'))
+            for i,(level, bucket) in enumerate(self.rollUps):
+                self.calcRollUp(RollUp(level, bucket, self.clusters))
+                self.sink.progress('rollup', i + 1, len(self.rollUps))
 
-                            #calculate kpi
-                            if f is not None and x is not None and y is not None and p is not None:
-                                if yval != 0:
-                                    kpival = '{:0.{precision}f}'.format(f * xval / yval, precision=p)
-                                else:
-                                    kpival = 0
+    def calcRollUp(self, rollUp):
+        self.log('<font color=blue>Calculating KPIs rolled up to %s, please wait...</font>' % rollUp)
 
-                            if f is None and x is not None and y is None and p is None:
-                                kpival = xval
+        for agg,plan in self.kpiPlans.items():
+            if agg in UNUSED_AGGS:
+                continue
+            keys = self.gnbKpiReport[agg].keys
+            values, valid = self.store.counterMatrix(keys, plan.counters)
+            groupKeys, sums, groupValid = rollUp.sum(keys, values, valid)
+            if len(groupKeys) == 0:
+                continue
 
-                            self.gnbKpiReport[agg][key2][kpi[0]] = kpival
-                        except Exception as e:
-                            self.gnbKpiReport[agg][key2][kpi[0]] = 'NA'
-                            self.ngwin.logEdit.append('<font color=purple>Error when calculating KPI(=%s) for DN=%s:</font>' % (kpi[0], key2))
-                            self.ngwin.logEdit.append(traceback.format_exc())
-                            qApp.processEvents()
-                            continue
+            results, na = plan.evaluate(sums, groupValid)
+            report = KpiTable(agg, groupKeys)
+            for i,kpi in enumerate(plan.kpis):
+                report.set(kpi[0], results[i])
+            self.rollUpReport[(agg, rollUp.level, rollUp.bucket)] = report
 
-        if self.ngwin.enableDebug:
-            for key1,val1 in self.gnbKpiReport.items():
-                self.ngwin.logEdit.append('|agg=%s'%key1)
-                for key2,val2 in val1.items():
-                    self.ngwin.logEdit.append('|--key=%s'%key2)
-                    for key3,val3 in val2.items():
-                        self.ngwin.logEdit.append('|----kpi_name=%s,kpi_val=%s'%(key3,val3))
-                qApp.processEvents()
-
-        #export to excel
-        self.ngwin.logEdit.append('<font color=blue>Exporting to excel(engine=xlsxwriter), please wait...</font>')
-        qApp.processEvents()
-
-        workbook = xlsxwriter.Workbook(os.path.join(self.outDir, '%s_kpi_report_%s.xlsx' % (rat, time.strftime('%Y%m%d%H%M%S', time.localtime()))))
-        fmtHHeader = workbook.add_format({'font_name':'Arial', 'font_size':9, 'align':'center', 'valign':'vcenter', 'text_wrap':True, 'bg_color':'yellow'})
-        fmtCell = workbook.add_format({'font_name':'Arial', 'font_size':9, 'align':'left', 'valign':'vcenter'})
-
-        for key1,val1 in self.gnbKpiReport.items():
+    def parseClusterDef(self, fn):
+        #cluster definition: one 'dn_prefix=cluster_name' per line, e.g. MRBTS-53775=CLUSTER_01
+        clusters = dict()
+        if not os.path.exists(fn):
+            return clusters
+
+        try:
+            with open(fn, 'r') as f:
+                self.log('<font color=blue>Parsing cluster definition: %s</font>' % fn)
+
+                while True:
+                    line = f.readline()
+                    if not line:
+                        break
+                    if line.startswith('#') or line.strip() == '':
+                        continue
+
+                    tokens = line.split('=')
+                    tokens = list(map(lambda x:x.strip(), tokens))
+                    if len(tokens) == 2:
+                        clusters[tokens[0]] = tokens[1]
+        except Exception as e:
+            self.log(traceback.format_exc())
+
+        return clusters
+
+    def exportReport(self):
+        rat = self.rat
+        exportFormat = self.exportFormat
+        ts = time.strftime('%Y%m%d%H%M%S', time.localtime())
+        if exportFormat == 'parquet' and pa is None:
+            self.log('<font color=red>pyarrow is not installed, exporting to csv instead of parquet!</font>')
+            exportFormat = 'csv'
+
+        if exportFormat == 'csv':
+            writer = CsvReportWriter(os.path.join(self.outDir, '%s_kpi_report_%s' % (rat, ts)))
+        elif exportFormat == 'parquet':
+            writer = ParquetReportWriter(os.path.join(self.outDir, '%s_kpi_report_%s' % (rat, ts)))
+        else:
+            writer = XlsxReportWriter(os.path.join(self.outDir, '%s_kpi_report_%s.xlsx' % (rat, ts)))
+        self.log('<font color=blue>Exporting to %s, please wait...</font>' % writer.fn)
+
+        sheets = [('KPI_%s' % key, val) for key,val in self.gnbKpiReport.items()]
+        sheets.extend([('KPI_%s_%s_%s' % (agg, level if level is not None else 'DN', bucket.upper() if bucket is not None else 'RAW'), val) for (agg, level, bucket),val in self.rollUpReport.items()])
+        numSheets = len(sheets) + len(self.store.tables)
+        for i,(name,val1) in enumerate(sheets):
+            self.sink.progress('export', i + 1, numSheets)
             horizontalHeader = ['STIME', 'INTERVAL', 'DN']
-            for key2,val2 in val1.items():
-                if len(val2) == 0:
-                    continue
-                horizontalHeader.extend(val2.keys())
-                break
+            horizontalHeader.extend(val1.names)
 
             #skip unused agg
-            if key1 in ('NRCUUP', 'SFP', 'MNLENT', 'ETHLK', 'ETHIF', 'IPIF', 'IPADDRESSV4', 'IPNO', 'LNMME', 'VLANIF', 'IPVOL', 'SMOD', 'LTAC', 'LNADJ', 'FSTSCH'):
+            if val1.agg in UNUSED_AGGS:
                 continue
 
-            sheet1 = workbook.add_worksheet('KPI_%s' % key1)
-            sheet1.set_zoom(90)
-            sheet1.freeze_panes(1, 3)
-
-            #write header
-            sheet1.write_row(0, 0, horizontalHeader, fmtHHeader)
-
-            count = 0
-            for key2,val2 in val1.items():
-                if len(val2) == 0:
-                    continue
+            writer.addSheet(name, horizontalHeader)
+            if len(val1.names) == 0:
+                continue
 
+            for key2,val2 in val1.iterRows():
                 #key = 'time;interval;dn'
                 stime, interval, dn = key2.split(';')
                 row = [stime, interval, dn]
-                row.extend(val2.values())
+                row.extend(val2)
+                writer.writeRow(row)
 
-                sheet1.write_row(count+1, 0, row, fmtCell)
-                count = count + 1
-
-        for measType in self.data.keys():
+        for i,(measType,table) in enumerate(self.store.tables.items()):
+            self.sink.progress('export', len(sheets) + i + 1, numSheets)
             horizontalHeader = ['STIME', 'INTERVAL', 'DN']
-            tags = list(self.tagsMap[measType])
+            tags = list(table.tagList)
             tags.sort()
             horizontalHeader.extend(tags)
 
-            sheet1 = workbook.add_worksheet(measType[:31] if len(measType) > 31 else measType)
-            sheet1.set_zoom(90)
-            sheet1.freeze_panes(1, 3)
-
-            #write header
-            sheet1.write_row(0, 0, horizontalHeader, fmtHHeader)
+            writer.addSheet(measType, horizontalHeader)
 
-            count = 0
-            for key,val in self.data[measType].items():
+            for keyId,counters in table.iterRows(tags):
                 #key = 'time;interval;dn'
-                #val = {tag:text}
-                stime, interval, dn = key.split(';')
+                stime, interval, dn = self.store.keys[keyId].split(';')
                 row = [stime, interval, dn]
-                for tag in tags:
-                    if tag in val:
-                        row.append(val[tag])
-                    else:
-                        row.append('NA')
+                row.extend(counters)
+                writer.writeRow(row)
 
-                sheet1.write_row(count+1, 0, row, fmtCell)
-                count = count + 1
+        writer.close()
 
-        workbook.close()
+    def parseRawPmXmls(self, fns, rat):
+        #files unchanged since last run are merged from the parsed-file cache instead of being parsed again
+        sigs = dict()
+        todo = []
+        for fn in fns:
+            if self.cache is not None:
+                sigs[fn] = self.cache.signature(fn, rat, self.pmFilter)
+                if self.cache.isValid(fn, sigs[fn]):
+                    continue
+            todo.append(fn)
 
-    def parseRawPmXml(self, fn, rat):
-        self.ngwin.logEdit.append('<font color=blue>Parsing raw PM:%s (rat=%s)</font>' % (fn, rat))
-        qApp.processEvents()
+        if self.cache is not None:
+            #fns are all the raw PM files of inDir, so entries of any other file are stale
+            numRemoved = self.cache.prune(fns)
+            if numRemoved > 0:
+                self.log('<font color=blue>Removed %d stale entries from cache: %s</font>' % (numRemoved, self.cache.cacheDir))
+            self.log('<font color=blue>Found %d of %d raw PM files in cache: %s</font>' % (len(fns) - len(todo), len(fns), self.cache.cacheDir))
 
-        if rat == '5g':
-            try:
-                root = ET.parse(fn).getroot() #root='OMes'
-                '''
-                self.ngwin.logEdit.append('tag=%s,attrib=%s' % (root.tag, root.attrib))
-                for child in root:
-                    self.ngwin.logEdit.append('|--tag=%s,attrib=%s' % (child.tag, child.attrib))
-                '''
+        serial = self.numWorkers is None or self.numWorkers <= 1 or len(todo) <= 1
+        if serial and self.cache is None:
+            for i,fn in enumerate(fns):
+                self.parseRawPmXml(fn, rat)
+                self.sink.progress('parse', i + 1, len(fns))
+            return
 
-                for pms in root.findall('PMSetup'):
-                    startTime = datetime.fromisoformat(pms.get('startTime')).strftime('%Y-%m-%d_%H:%M:%S')
-                    interval = pms.get('interval')
-                    for pmmoresult in pms.findall('PMMOResult'):
-                        '''
-                        <MO dimension="network_element">
-                            <DN>PLMN-PLMN/MRBTS-53775/NRBTS-1</DN>
-                        </MO>
-                        '''
-                        mo = pmmoresult.find('MO')
-                        dn = mo.find('DN')
-
-                        pmtarget = pmmoresult.find('PMTarget') if pmmoresult.find('PMTarget') is not None else pmmoresult.find('NE-WBTS_1.0')
-                        measType = pmtarget.get('measurementType')
-                        for child in pmtarget:
-                            key = '%s;%s;%s' % (startTime, interval, dn.text[len('PLMN-PLMN/'):])
-                            if measType not in self.data:
-                                self.data[measType] = dict()
-                            if key not in self.data[measType]:
-                                self.data[measType][key] = dict()
-                            self.data[measType][key][child.tag] = child.text
-
-                            if measType not in self.tagsMap:
-                                #note the difference between: a=set('hello') and a=set(['hello'])
-                                self.tagsMap[measType] = set([child.tag])
-                            else:
-                                self.tagsMap[measType].add(child.tag)
-            except Exception as e:
-                #self.ngwin.logEdit.append(str(e))
-                self.ngwin.logEdit.append(traceback.format_exc())
-                return
+        executor = None
+        if serial:
+            results = map(parseRawPmFile, todo, [rat] * len(todo), [None] * len(todo), [self.pmFilter] * len(todo))
         else:
-            try:
-                root = ET.parse(fn).getroot() #root='OMes'
-                '''
-                self.ngwin.logEdit.append('tag=%s,attrib=%s' % (root.tag, root.attrib))
-                for child in root:
-                    self.ngwin.logEdit.append('|--tag=%s,attrib=%s' % (child.tag, child.attrib))
-                '''
+            self.log('<font color=blue>Parsing %d raw PM files using %d worker processes</font>' % (len(todo), self.numWorkers))
 
-                for pms in root.findall('PMSetup'):
-                    startTime = datetime.fromisoformat(pms.get('startTime')).strftime('%Y-%m-%d_%H:%M:%S')
-                    interval = pms.get('interval')
-                    for pmmoresult in pms.findall('PMMOResult'):
-                        '''
-                        <MO>
-                            <baseId>NE-MRBTS-833150</baseId>
-                            <localMoid>DN:NE-LNBTS-833150/FTM-1/IPNO-1/IEIF-1</localMoid>
-                        </MO>
-                        '''
-                        mo = pmmoresult.find('MO')
-                        dn = mo.find('localMoid').text.split(':')[1]
-
-                        pmtarget = pmmoresult.find('NE-WBTS_1.0')
-                        measType = pmtarget.get('measurementType')
-                        for child in pmtarget:
-                            key = '%s;%s;%s' % (startTime, interval, dn.text[len('NE-'):])
-                            if measType not in self.data:
-                                self.data[measType] = dict()
-                            if key not in self.data[measType]:
-                                self.data[measType][key] = dict()
-                            self.data[measType][key][child.tag] = child.text
-
-                            if measType not in self.tagsMap:
-                                #note the difference between: a=set('hello') and a=set(['hello'])
-                                self.tagsMap[measType] = set([child.tag])
-                            else:
-                                self.tagsMap[measType].add(child.tag)
-            except Exception as e:
-                #self.ngwin.logEdit.append(str(e))
-                self.ngwin.logEdit.append(traceback.format_exc())
-                return
+            chunksize = max(1, len(todo) // (4 * self.numWorkers))
+            executor = ProcessPoolExecutor(max_workers=self.numWorkers)
+            #executor.map yields results in the order of todo, so merging is deterministic and later files win as in serial parsing
+            results = executor.map(parseRawPmFile, todo, [rat] * len(todo), [None] * len(todo), [self.pmFilter] * len(todo), chunksize=chunksize)
+
+        parsed = set(todo)
+        try:
+            for i,fn in enumerate(fns):
+                store = self.cache.load(fn, sigs[fn]) if fn not in parsed else None
+                if store is None:
+                    self.log('<font color=blue>Parsing raw PM:%s (rat=%s)</font>' % (fn, rat))
+                    store, error = next(results) if fn in parsed else parseRawPmFile(fn, rat, None, self.pmFilter)
+                    if error is not None:
+                        self.log(error)
+                    elif self.cache is not None:
+                        self.cache.save(fn, sigs[fn], store)
+                self.store.merge(store)
+                self.sink.progress('parse', i + 1, len(fns))
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+    def parseRawPmXml(self, fn, rat):
+        self.log('<font color=blue>Parsing raw PM:%s (rat=%s)</font>' % (fn, rat))
+
+        store, error = parseRawPmFile(fn, rat, self.store, self.pmFilter)
+        if error is not None:
+            #self.log(str(e))
+            self.log(error)
 
     def parseKpiDef(self, fn):
         try:
             with open(fn, 'r') as f:
-                self.ngwin.logEdit.append('<font color=blue>Parsing KPI definition: %s</font>' % fn)
-                qApp.processEvents()
+                self.log('<font color=blue>Parsing KPI definition: %s</font>' % fn)
 
                 #[name, f, x, y, p, agg]
                 kpi = [None, None, None, None, None, None]
@@ -450,6 +1045,186 @@ class NgRawPmParser(object):
                         else:
                             pass
         except Exception as e:
-            #self.ngwin.logEdit.append(str(e))
-            self.ngwin.logEdit.append(traceback.format_exc())
-            qApp.processEvents()
+            #self.log(str(e))
+            self.log(traceback.format_exc())
+
+def toInt(text):
+    #return None if text is not a valid integer counter
+    try:
+        return int(text)
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+def toFloat(val):
+    #return None if val is not numeric
+    try:
+        return float(val)
+    except (TypeError, ValueError):
+        return None
+
+def parseRawPmFile(fn, rat, store=None, pmFilter=None):
+    '''
+    Parse a raw PM xml, or all xml members of a raw PM tar.gz, into store and return (store, error).
+    Members of tar.gz are streamed from the archive without being extracted to disk.
+    A new PmCounterStore is created if store is None.
+    Only counters accepted by pmFilter(a RawPmFilter) are parsed if pmFilter is not None.
+    This is the unit of work of the worker processes, so it must not touch the GUI.
+    Counters parsed before an error are kept, and error is the formatted traceback or None.
+    '''
+    if store is None:
+        store = PmCounterStore()
+
+    if not fn.lower().endswith('tar.gz'):
+        return (store, loadRawPmXml(fn, rat, store, pmFilter))
+
+    errors = []
+    try:
+        #stream mode('r|gz') reads the archive sequentially, each member must be consumed before moving to the next one
+        with tarfile.open(fn, 'r|gz') as tar:
+            for member in tar:
+                if member.isfile() and member.name.lower().endswith('xml'):
+                    error = loadRawPmXml(tar.extractfile(member), rat, store, pmFilter)
+                    if error is not None:
+                        errors.append('%s:%s\n%s' % (fn, member.name, error))
+    except Exception as e:
+        errors.append(traceback.format_exc())
+
+    return (store, '\n'.join(errors) if len(errors) > 0 else None)
+
+def loadRawPmXml(src, rat, store, pmFilter=None):
+    #load raw PM xml from file name or file object src into store, return the formatted traceback or None
+    try:
+        for measType, key, tag, text in iterRawPmXml(src, rat, pmFilter):
+            store.add(measType, key, tag, text)
+    except Exception as e:
+        return traceback.format_exc()
+
+    return None
+
+def iterRawPmXml(src, rat, pmFilter=None):
+    '''
+    Incrementally parse raw PM xml and yield (measType, 'stime;interval;dn', tag, text) for each counter.
+    src can be either a file name or a file object.
+    Each counter is yielded and freed on its end event, so memory usage is independent of the file size.
+    Whether a PMMOResult is accepted by pmFilter is decided when its PMTarget starts, using the DN of its MO, which precedes PMTarget.
+    Counters of PMMOResults rejected by pmFilter, or under a rejected PMSetup, are freed on their end events without being read.
+    '''
+    #root='OMes'
+    stack = []
+    startTime = None
+    interval = None
+    skipSetup = False
+    #DN of the current PMMOResult, PMTarget(or NE-WBTS_1.0) being parsed and its (measType, key), which is None if it's rejected
+    dn = None
+    target = None
+    targetKey = None
+    targetTags = ('PMTarget', 'NE-WBTS_1.0') if rat == '5g' else ('NE-WBTS_1.0',)
+    for event, elem in ET.iterparse(src, events=('start', 'end')):
+        if event == 'start':
+            stack.append(elem)
+            if elem.tag == 'PMSetup':
+                startTime = datetime.fromisoformat(elem.get('startTime')).strftime('%Y-%m-%d_%H:%M:%S')
+                interval = elem.get('interval')
+                skipSetup = pmFilter is not None and not pmFilter.acceptSetup(startTime, interval)
+            elif elem.tag in targetTags and len(stack) > 1 and stack[-2].tag == 'PMMOResult' and (dn is not None or skipSetup):
+                target = elem
+                measType = elem.get('measurementType')
+                if skipSetup or (pmFilter is not None and not pmFilter.acceptResult(dn, measType)):
+                    targetKey = None
+                else:
+                    targetKey = (measType, '%s;%s;%s' % (startTime, interval, dn))
+            continue
+
+        stack.pop()
+        if target is not None and len(stack) > 0 and stack[-1] is target:
+            #counter is always the last child of PMTarget when its end event is received
+            if targetKey is not None:
+                yield (targetKey[0], targetKey[1], elem.tag, elem.text)
+            del target[-1]
+            elem.clear()
+        elif len(stack) > 0 and stack[-1].tag == 'MO' and elem.tag == ('DN' if rat == '5g' else 'localMoid'):
+            if rat == '5g':
+                '''
+                <MO dimension="network_element">
+                    <DN>PLMN-PLMN/MRBTS-53775/NRBTS-1</DN>
+                </MO>
+                '''
+                dn = elem.text[len('PLMN-PLMN/'):]
+            else:
+                '''
+                <MO>
+                    <baseId>NE-MRBTS-833150</baseId>
+                    <localMoid>DN:NE-LNBTS-833150/FTM-1/IPNO-1/IEIF-1</localMoid>
+                </MO>
+                '''
+                dn = elem.text.split(':')[1][len('NE-'):]
+        elif elem.tag == 'PMMOResult':
+            if target is None and not skipSetup:
+                #MO doesn't precede PMTarget, so counters are read when the whole PMMOResult is parsed
+                mo = elem.find('MO')
+                if rat == '5g':
+                    dn = mo.find('DN').text[len('PLMN-PLMN/'):]
+                    pmtarget = elem.find('PMTarget') if elem.find('PMTarget') is not None else elem.find('NE-WBTS_1.0')
+                else:
+                    dn = mo.find('localMoid').text.split(':')[1][len('NE-'):]
+                    pmtarget = elem.find('NE-WBTS_1.0')
+
+                measType = pmtarget.get('measurementType')
+                if pmFilter is None or pmFilter.acceptResult(dn, measType):
+                    key = '%s;%s;%s' % (startTime, interval, dn)
+                    for child in pmtarget:
+                        yield (measType, key, child.tag, child.text)
+
+            dn = None
+            target = None
+            targetKey = None
+            #PMMOResult is always the last child of its parent when its end event is received
+            if len(stack) > 0:
+                del stack[-1][-1]
+            elem.clear()
+        elif elem.tag == 'PMSetup':
+            if len(stack) > 0:
+                del stack[-1][-1]
+            elem.clear()
+
+if __name__ == '__main__':
+    import argparse
+    import sys
+
+    #command line entry for batch jobs, e.g. python3 ngrawpmparser.py --rat 5g --export csv --rollup MRBTS:day --start 2019-03-21_00:00:00
+    argParser = argparse.ArgumentParser(description='Parse raw PM, calculate KPIs and export the KPI report.')
+    argParser.add_argument('--rat', choices=('5g', '4g'), default='5g')
+    argParser.add_argument('--workdir', default=None, help='directory containing data/raw_pm and config, defaults to where the toolset is installed')
+    argParser.add_argument('--workers', type=int, default=None, help='number of worker processes, defaults to cpu count')
+    argParser.add_argument('--cache', action='store_true', help='enable the parsed-file cache under cache/raw_pm of workdir')
+    argParser.add_argument('--extract-tgz', action='store_true', help='extract tar.gz instead of parsing them in memory')
+    argParser.add_argument('--export', choices=('xlsx', 'csv', 'parquet'), default='xlsx')
+    argParser.add_argument('--start', default=None, help='start time(inclusive) of raw PM, e.g. 2019-03-21_00:00:00')
+    argParser.add_argument('--end', default=None, help='end time(exclusive) of raw PM, e.g. 2019-03-22_00:00:00')
+    argParser.add_argument('--interval', action='append', default=None, help='allowed interval in minutes, can be repeated')
+    argParser.add_argument('--dn-prefix', action='append', default=None, help='allowed DN prefix, can be repeated')
+    argParser.add_argument('--dn-regex', default=None, help='regular expression which must be found in DN')
+    argParser.add_argument('--meastype', action='append', default=None, help='allowed measurement type, can be repeated')
+    argParser.add_argument('--rollup', action='append', default=None, help='roll-up as LEVEL:BUCKET, e.g. MRBTS:day, CLUSTER:hour, PLMN: or :week, can be repeated')
+    argParser.add_argument('--debug', action='store_true', help='dump KPI results to the log')
+    argParser.add_argument('--quiet', action='store_true', help='print progress only')
+    args = argParser.parse_args()
+
+    pmFilter = None
+    if any(x is not None for x in (args.start, args.end, args.interval, args.dn_prefix, args.dn_regex, args.meastype)):
+        pmFilter = RawPmFilter(args.start, args.end, args.interval, args.dn_prefix, args.dn_regex, args.meastype)
+
+    rollUps = None
+    if args.rollup is not None:
+        rollUps = []
+        for item in args.rollup:
+            level, _, bucket = item.partition(':')
+            if bucket != '' and bucket not in RollUp.BUCKETS:
+                argParser.error('invalid bucket of roll-up: %s' % item)
+            rollUps.append((level if level != '' else None, bucket if bucket != '' else None))
+
+    sink = ConsoleLogSink(debug=args.debug, quiet=args.quiet)
+    parser = NgRawPmParser(sink, args.rat, numWorkers=args.workers, useCache=args.cache, extractTgz=args.extract_tgz, exportFormat=args.export, pmFilter=pmFilter, rollUps=rollUps, workDir=args.workdir)
+    parser.run()
+    print(', '.join(['%s=%.2fs' % (stage, t) for stage,t in parser.timings.items()]))
+    sys.exit(0)
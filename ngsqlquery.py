@@ -5,29 +5,151 @@
 File:
     ngsqlquery.py
 Description:
-    SQL query utilty using cx_Oracle library .
+    SQL query utilty using cx_Oracle library(or SQLite as offline stand-in, see ngdbbackend.py).
 Change History:
     2018-3-22   v0.1    created.    github/zhenggao2
 '''
 
 from PyQt5.QtWidgets import QDialog
 from PyQt5.QtWidgets import qApp
-import cx_Oracle
 import os
 import re
+import csv
+import time
+import queue
+import threading
+import gzip
+import hashlib
+import pickle
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from ngsqlsubui import NgSqlSubUi
+from ngdbbackend import makeBackend
+
+def toDatetime(value):
+    #value of period_start_time is datetime if fetched from DB, or its string if loaded elsewhere
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+
+class NedsQueryCache(object):
+    '''
+    On-disk cache of NEDS query results.
+    There is one entry per database, query template, DB aggregation and substitutions except the time window,
+    which holds the signature and meta data(fetch time, time window, columns) followed by batches of rows, all pickled into a gzip stream.
+    The time window of PM queries is kept in meta data, so that a widened window only fetches the missing hours.
+    '''
+    #increase VERSION whenever the pickled layout of entry changes
+    VERSION = 1
+    #time to live(in seconds) of each query class, PM of recent hours may still be completed by late uploads, while CM rarely changes
+    TTLS = {'cm':24*3600, 'pm':6*3600}
+    #format of &start_time/&end_time, i.e. 'yyyymmddhh24'
+    TIME_FORMAT = '%Y%m%d%H'
+
+    def __init__(self, cacheDir):
+        self.cacheDir = cacheDir
+        if not os.path.exists(self.cacheDir):
+            os.makedirs(self.cacheDir)
+
+    def entry(self, sqlFn, key):
+        #return (path, signature) of entry
+        sig = (NedsQueryCache.VERSION, key)
+        return (os.path.join(self.cacheDir, '%s_%s.pkl.gz' % (sqlFn.replace('.sql', ''), hashlib.sha1(repr(sig).encode('utf-8')).hexdigest()[:16])), sig)
+
+    def parseWindow(self, start, end):
+        #return (start, end) as datetime, or None if the window is invalid
+        try:
+            window = (datetime.strptime(start, NedsQueryCache.TIME_FORMAT), datetime.strptime(end, NedsQueryCache.TIME_FORMAT))
+        except (ValueError, TypeError):
+            return None
+        return window if window[0] <= window[1] else None
+
+    def meta(self, entry, ttl):
+        #return meta data of entry, or None if the entry is missing, stale or expired
+        try:
+            with gzip.open(entry[0], 'rb') as f:
+                if pickle.load(f) != entry[1]:
+                    return None
+                meta = pickle.load(f)
+        except Exception as e:
+            return None
+        return meta if time.time() - meta['time'] <= ttl else None
+
+    def batches(self, entry):
+        #return (columns, iterator of batches of rows) of entry
+        f = gzip.open(entry[0], 'rb')
+        pickle.load(f)
+        meta = pickle.load(f)
+
+        def readBatches():
+            with f:
+                while True:
+                    try:
+                        yield pickle.load(f)
+                    except EOFError:
+                        break
+
+        return (meta['columns'], readBatches())
+
+    def begin(self, entry, meta):
+        #entry is written to a temporary file, which replaces the entry only when all rows are dumped
+        f = gzip.open(entry[0] + '.tmp', 'wb', compresslevel=1)
+        pickle.dump(entry[1], f, pickle.HIGHEST_PROTOCOL)
+        pickle.dump(meta, f, pickle.HIGHEST_PROTOCOL)
+        return f
+
+    def dump(self, f, rows):
+        if len(rows) > 0:
+            pickle.dump(rows, f, pickle.HIGHEST_PROTOCOL)
+
+    def commit(self, entry, f):
+        f.close()
+        os.replace(entry[0] + '.tmp', entry[0])
+
+    def abort(self, entry, f):
+        f.close()
+        try:
+            os.remove(entry[0] + '.tmp')
+        except OSError:
+            pass
 
 class NgSqlQuery(object):
+    ARRAY_SIZE = 5000
+    NUM_SESSIONS = 4
+    MAX_RETRIES = 2
+    #delay(in seconds) before retry, which is multiplied by the number of attempts
+    RETRY_DELAY = 5
+    #names of the time window substituted in PM queries, and the time column of their results
+    TIME_SUBS = ('start_time', 'end_time')
+    TIME_COLUMN = 'PERIOD_START_TIME'
+
     def __init__(self, ngwin, args):
         self.ngwin = ngwin
         self.args = args
         self.subsMap = dict()
         self.dbStat = False
         self.queryStat = False
+        #database backend selected by DB_BACKEND of args['dbConf'], see ngdbbackend.py
+        self.backend = None
+        #state shared with worker threads of exec_
+        self.lock = threading.Lock()
+        self.sessions = dict()
+        self.cancelled = threading.Event()
+        self.logQueue = queue.Queue()
+        self.progress = dict()
+        self.timings = dict()
+        #query results are cached locally if required, see NedsQueryCache
+        cacheDir = args.get('cacheDir', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache/neds'))
+        self.cache = NedsQueryCache(cacheDir) if args.get('useCache', False) else None
         self.initDb()
 
     def initDb(self):
+        #args['dbConf'] is relative to the config directory, unless it's absolute
         confDir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config')
+        conf = dict()
         try:
             with open(os.path.join(confDir, self.args['dbConf']), 'r') as f:
                 self.ngwin.logEdit.append('<font color=blue>Parsing DB configuration: %s</font>' % f.name)
@@ -43,16 +165,8 @@ class NgSqlQuery(object):
                     tokens = line.split('=')
                     tokens = list(map(lambda x:x.strip(), tokens))
                     if len(tokens) == 2:
-                        if tokens[0].upper() == 'HOST_NAME':
-                            self.dbHost = tokens[1]
-                        elif tokens[0].upper() == 'TCP_PORT':
-                            self.dbPort = tokens[1]
-                        elif tokens[0].upper() == 'DB_NAME':
-                            self.dbService = tokens[1]
-                        elif tokens[0].upper() == 'USER_NAME':
-                            self.dbUserName = tokens[1]
-                        elif tokens[0].upper() == 'USER_PASSCODE':
-                            self.dbUserPwd = tokens[1]
+                        conf[tokens[0].upper()] = tokens[1]
+                self.backend = makeBackend(conf)
                 self.dbStat = True
         except Exception as e:
             self.ngwin.logEdit.append('<font color=red>Exception: %s</font>' % str(e))
@@ -61,111 +175,343 @@ class NgSqlQuery(object):
         if not self.dbStat:
             return
 
-        dsn = cx_Oracle.makedsn(self.dbHost, self.dbPort, service_name=self.dbService)
+        #substitute and prepare all queries first, as NgSqlSubUi must be shown by the GUI thread
+        queries = []
+        sqlDir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sql')
+        for sqlFn in self.args['sqlQuery']:
+            prepared = self.prepareQuery(os.path.join(sqlDir, sqlFn))
+            if prepared is not None:
+                queries.append((sqlFn,) + prepared)
 
-        self.ngwin.logEdit.append('<font color=blue>Connecting to Oracle DB</font>')
-        self.ngwin.logEdit.append('-->DSN = %s' % dsn)
+        #query results are exported to the output directory of the toolset, unless args['outDir'] is given
+        outDir = self.args.get('outDir', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'output'))
+        if not os.path.exists(outDir):
+            os.makedirs(outDir)
+
+        numSessions = max(1, min(self.args.get('numSessions', NgSqlQuery.NUM_SESSIONS), len(queries)))
+
+        self.ngwin.logEdit.append('<font color=blue>Connecting to %s DB</font>' % self.backend.NAME)
+        self.ngwin.logEdit.append('-->%s' % self.backend.describe())
+        self.ngwin.logEdit.append('-->Session pool size = %d' % numSessions)
         qApp.processEvents()
         try:
-            db = cx_Oracle.connect(self.dbUserName, self.dbUserPwd, dsn)
-        except cx_Oracle.DatabaseError as e:
-            # cx_Oracle 5.0.4 raises a cx_Oracle.DatabaseError exception
-            # with the following attributes and values:
-            #  code = 2091
-            #  message = 'ORA-02091: transaction rolled back
-            #            'ORA-02291: integrity constraint (TEST_DJANGOTEST.SYS
-            #               _C00102056) violated - parent key not found'
-            self.ngwin.logEdit.append('<font color=red>cx_Oracle.DatabaseError: %s!</font>' % e.args[0].message)
+            #independent queries are executed concurrently, each over a session acquired from the pool
+            self.backend.createPool(numSessions)
+        except self.backend.DatabaseError as e:
+            self.ngwin.logEdit.append('<font color=red>DatabaseError: %s!</font>' % self.backend.errorInfo(e)[1])
             return
 
-        cursor = db.cursor()
-
-        sqlDir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sql')
-        for sqlFn in self.args['sqlQuery']:
-            with open(os.path.join(sqlDir, sqlFn), 'r') as f:
-                self.ngwin.logEdit.append('<font color=blue>Executing query: %s</font>' % f.name)
+        self.cancelled.clear()
+        self.timings = dict()
+        tStart = time.perf_counter()
+        executor = ThreadPoolExecutor(max_workers=numSessions)
+        futures = [executor.submit(self.runQuery, sqlFn, template, subs, outDir) for sqlFn,template,subs in queries]
+        try:
+            #worker threads can't touch widgets, so logs and progress are passed to the GUI thread by self.logQueue
+            pending = set(futures)
+            while len(pending) > 0:
+                done, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+                self.flushLogs()
+                numRows = sum(self.progress.values())
+                elapsed = time.perf_counter() - tStart
+                self.ngwin.statusBar().showMessage('%d/%d queries done: %d rows(%.0f rows/sec)' % (len(futures) - len(pending), len(futures), numRows, numRows / elapsed if elapsed > 0 else 0))
                 qApp.processEvents()
+        finally:
+            executor.shutdown(wait=True)
+            self.backend.closePool()
+        self.flushLogs()
 
-                self.names = []
-                self.answers = []
-                reSql = re.compile(r"^[a-zA-Z0-9\_\s\>\<\=\(]+\&([a-zA-Z\_]+)[\,\s\'a-zA-Z0-9\)]+$")
-                while True:
-                    line = f.readline()
-                    if not line:
-                        break
+        if self.cancelled.is_set():
+            self.ngwin.logEdit.append('<font color=red>Query cancelled!</font>')
+            return
+        if not all(f.result() for f in futures):
+            self.ngwin.logEdit.append('<font color=red>Query failed!</font>')
+            return
 
-                    #substitute names if necessary
-                    m = reSql.match(line)
-                    if m is not None:
-                        self.names.extend(m.groups())
-
-                f.seek(0)
-                query = f.read()
-                if len(self.names) > 0:
-                    #skip show NgSqlSubUi if self.names already exist in self.subsMap
-                    if self.checkSubMap():
-                        for name in self.names:
-                            self.answers.append(self.subsMap[name])
-                    else:
-                        dlg = NgSqlSubUi(self.ngwin, self.names)
-                        if dlg.exec_() == QDialog.Accepted:
-                            self.answers = dlg.answers
-                            valid = True
-                            for an in self.answers:
-                                if len(an) == 0:
-                                    valid = False
-                                    break
-                            if not valid:
-                                self.ngwin.logEdit.append('<font color=red>-->Query skipped!</font>')
-                                qApp.processEvents()
-                                continue
-
-                            #save for later use if possible
-                            if dlg.applyToAllChkBox.isChecked():
-                                for name,answer in zip(self.names, self.answers):
-                                        self.subsMap[name] = answer
-                        else:
+        if len(self.timings) > 0:
+            slowest = max(self.timings, key=self.timings.get)
+            self.ngwin.logEdit.append('-->%d queries executed in %.1fs(slowest: %s in %.1fs)' % (len(self.timings), time.perf_counter() - tStart, slowest, self.timings[slowest]))
+        self.queryStat = True
+        self.ngwin.logEdit.append('<font color=blue>Done!</font>')
+
+    def prepareQuery(self, fn):
+        '''
+        Read query from sql file fn and ask for values of names to be substituted.
+        Return (query template, [(name, value)]), or None if it's skipped.
+        '''
+        sqlFn = os.path.basename(fn)
+        with open(fn, 'r') as f:
+            self.ngwin.logEdit.append('<font color=blue>Preparing query: %s</font>' % f.name)
+            qApp.processEvents()
+
+            self.names = []
+            self.answers = []
+            reSql = re.compile(r"^[a-zA-Z0-9\_\s\>\<\=\(]+\&([a-zA-Z\_]+)[\,\s\'a-zA-Z0-9\)]+$")
+            while True:
+                line = f.readline()
+                if not line:
+                    break
+
+                #substitute names if necessary
+                m = reSql.match(line)
+                if m is not None:
+                    self.names.extend(m.groups())
+
+            f.seek(0)
+            query = f.read()
+            if len(self.names) > 0:
+                #skip show NgSqlSubUi if self.names already exist in self.subsMap
+                if self.checkSubMap():
+                    for name in self.names:
+                        self.answers.append(self.subsMap[name])
+                else:
+                    dlg = NgSqlSubUi(self.ngwin, self.names)
+                    if dlg.exec_() == QDialog.Accepted:
+                        self.answers = dlg.answers
+                        valid = True
+                        for an in self.answers:
+                            if len(an) == 0:
+                                valid = False
+                                break
+                        if not valid:
                             self.ngwin.logEdit.append('<font color=red>-->Query skipped!</font>')
                             qApp.processEvents()
-                            continue
+                            return None
 
-                    for name, answer in zip(self.names, self.answers):
-                        self.ngwin.logEdit.append('-->Subsitution: [%s=%s]' % (name, answer))
+                        #save for later use if possible
+                        if dlg.applyToAllChkBox.isChecked():
+                            for name,answer in zip(self.names, self.answers):
+                                    self.subsMap[name] = answer
+                    else:
+                        self.ngwin.logEdit.append('<font color=red>-->Query skipped!</font>')
                         qApp.processEvents()
+                        return None
 
-                    for index,name in enumerate(self.names):
-                        query = query.replace('&'+name, "'"+self.answers[index]+"'")
+                for name, answer in zip(self.names, self.answers):
+                    self.ngwin.logEdit.append('-->Subsitution: [%s=%s]' % (name, answer))
+                    qApp.processEvents()
 
-                try:
-                    cursor.execute(query)
-                except cx_Oracle.DatabaseError as e:
-                    self.ngwin.logEdit.append('<font color=red>cx_Oracle.DatabaseError: %s!</font>' % e.args[0].message)
-                    return
+            if sqlFn in self.args.get('aggQuery', dict()):
+                self.ngwin.logEdit.append('-->Aggregating by: %s' % ','.join(self.args['aggQuery'][sqlFn][0]))
+                qApp.processEvents()
 
-                fields = ','.join([a[0] for a in cursor.description])
-                #self.ngwin.logEdit.append('Fields: %s' % fields)
+        return (query, list(zip(self.names, self.answers)))
 
-                #record = cursor.fetchone()
-                #self.ngwin.logEdit.append(','.join([str(i) for i in record]))
-                records = cursor.fetchall()
+    def buildQuery(self, sqlFn, template, subs):
+        #substitute names of query template
+        query = template
+        for name,answer in subs:
+            query = query.replace('&'+name, "'"+answer+"'")
 
-                outDir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'output')
-                if not os.path.exists(outDir):
-                    os.mkdir(outDir)
+        #aggregate records per key by DB if required, so that only one row per key is fetched
+        if sqlFn in self.args.get('aggQuery', dict()):
+            keyColumns, aggs = self.args['aggQuery'][sqlFn]
+            query = self.makeAggQuery(query, keyColumns, aggs)
 
-                outFn = sqlFn.replace('.sql', '.csv')
-                with open(os.path.join(outDir, outFn), 'w') as of:
-                    self.ngwin.logEdit.append('-->Exporting query results to: %s' % of.name)
-                    qApp.processEvents()
+        return query
 
-                    of.write(fields)
-                    of.write('\n')
-                    for r in records:
-                        of.write(','.join([str(token) for token in r]))
-                        of.write('\n')
+    def planQuery(self, sqlFn, template, subs):
+        '''
+        Plan how results of query are exported, by looking up the query cache.
+        Return (cache entry, segments, meta), where:
+        segments: list of (query, keep) in the order of export, query=None means cached rows, keep is filter of rows or None
+        meta: meta data of the cache entry to be saved, or None if the cache entry needn't be updated
+        '''
+        query = self.buildQuery(sqlFn, template, subs)
+        if self.cache is None:
+            return (None, [(query, None)], None)
 
-        self.queryStat = True
-        self.ngwin.logEdit.append('<font color=blue>Done!</font>')
+        #PM queries are those with time window, and the window isn't part of the cache key, so that it can be widened incrementally
+        timeSubs = dict([(name, answer) for name,answer in subs if name in NgSqlQuery.TIME_SUBS])
+        queryClass = 'pm' if len(timeSubs) > 0 else 'cm'
+        window = self.cache.parseWindow(timeSubs.get(NgSqlQuery.TIME_SUBS[0]), timeSubs.get(NgSqlQuery.TIME_SUBS[1]))
+        #the database is part of the key, e.g. another OMC or the offline SQLite stand-in
+        key = (self.backend.signature(), template, self.args.get('aggQuery', dict()).get(sqlFn), sorted([(name, answer) for name,answer in subs if window is None or name not in timeSubs]))
+        entry = self.cache.entry(sqlFn, key)
+        meta = self.cache.meta(entry, self.args.get('cacheTtls', dict()).get(queryClass, NedsQueryCache.TTLS[queryClass]))
+        newMeta = {'time':time.time(), 'window':window, 'columns':None}
+        if meta is None:
+            return (entry, [(query, None)], newMeta)
+
+        timeIdx = meta['columns'].index(NgSqlQuery.TIME_COLUMN) if NgSqlQuery.TIME_COLUMN in meta['columns'] else None
+        if window is None or meta['window'] == window:
+            self.logQueue.put('-->%s: found in cache(fetched at %s)' % (sqlFn, time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(meta['time']))))
+            return (entry, [(None, None)], None)
+
+        #end_time is inclusive, so both windows are closed intervals of period_start_time
+        (start, end), (cachedStart, cachedEnd) = window, meta['window']
+        if timeIdx is None or start > cachedEnd or end < cachedStart:
+            #cached rows can't be filtered or reused
+            return (entry, [(query, None)], newMeta)
+
+        inWindow = lambda row: row[timeIdx] is not None and start <= toDatetime(row[timeIdx]) <= end
+        if cachedStart <= start and end <= cachedEnd:
+            self.logQueue.put('-->%s: found in cache(fetched at %s)' % (sqlFn, time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(meta['time']))))
+            return (entry, [(None, inWindow)], None)
+
+        #fetch only the missing hours before and after the cached window, rows at the boundaries are already cached
+        segments = []
+        fmt = NedsQueryCache.TIME_FORMAT
+        if start < cachedStart:
+            delta = [(name, start.strftime(fmt) if name == NgSqlQuery.TIME_SUBS[0] else cachedStart.strftime(fmt) if name == NgSqlQuery.TIME_SUBS[1] else answer) for name,answer in subs]
+            segments.append((self.buildQuery(sqlFn, template, delta), lambda row: row[timeIdx] is not None and toDatetime(row[timeIdx]) < cachedStart))
+        segments.append((None, inWindow))
+        if end > cachedEnd:
+            delta = [(name, cachedEnd.strftime(fmt) if name == NgSqlQuery.TIME_SUBS[0] else end.strftime(fmt) if name == NgSqlQuery.TIME_SUBS[1] else answer) for name,answer in subs]
+            segments.append((self.buildQuery(sqlFn, template, delta), lambda row: row[timeIdx] is not None and toDatetime(row[timeIdx]) > cachedEnd))
+        self.logQueue.put('-->%s: extending cached window %s-%s to %s-%s' % (sqlFn, cachedStart.strftime(fmt), cachedEnd.strftime(fmt), start.strftime(fmt), end.strftime(fmt)))
+
+        #the merged entry expires with its oldest rows
+        newMeta['time'] = meta['time']
+        newMeta['window'] = (min(start, cachedStart), max(end, cachedEnd))
+        return (entry, segments, newMeta)
+
+    def runQuery(self, sqlFn, template, subs, outDir):
+        '''
+        Execute query over a pooled session(unless it's found in the query cache) and export its results, which is called by worker threads.
+        Transient errors(e.g. lost connection) are retried up to MAX_RETRIES times.
+        Return True on success.
+        '''
+        #optional handler of each fetched batch, called as onBatch(sqlFn, columns, rows) by worker threads
+        #rows=None means the query is restarted, so rows handed off so far must be discarded
+        onBatch = self.args.get('onBatch')
+        outFn = os.path.join(outDir, sqlFn.replace('.sql', '.csv'))
+        entry, segments, meta = self.planQuery(sqlFn, template, subs)
+        self.progress[sqlFn] = 0
+        attempt = 0
+        while not self.cancelled.is_set():
+            attempt = attempt + 1
+            self.logQueue.put('<font color=blue>Executing query: %s%s</font>' % (sqlFn, '(retry#%d)' % (attempt - 1) if attempt > 1 else ''))
+            tStart = time.perf_counter()
+            db = None
+            fed = False
+            cacheFile = None
+            try:
+                with open(outFn, 'w', newline='') as of:
+                    self.logQueue.put('-->Exporting query results to: %s' % of.name)
+
+                    #stream records batch by batch instead of fetchall, so that memory is bounded by arraysize
+                    #csv.writer quotes values with comma and writes NULL(None) as empty string
+                    writer = csv.writer(of, lineterminator='\n')
+                    columns = None
+                    numRows = 0
+                    numCached = 0
+                    for query,keep in segments:
+                        if query is None:
+                            segColumns, batches = self.cache.batches(entry)
+                        else:
+                            if db is None:
+                                db = self.backend.acquire()
+                                with self.lock:
+                                    self.sessions[sqlFn] = db
+                                cursor = db.cursor()
+                                #number of rows fetched per round trip by fetchmany
+                                cursor.arraysize = self.args.get('arraySize', NgSqlQuery.ARRAY_SIZE)
+                            cursor.execute(query)
+                            segColumns = self.backend.columns(cursor)
+                            batches = iter(cursor.fetchmany, [])
+
+                        if columns is None:
+                            columns = segColumns
+                            writer.writerow(columns)
+                            if meta is not None:
+                                meta['columns'] = columns
+                                cacheFile = self.cache.begin(entry, meta)
+
+                        for records in batches:
+                            if self.cancelled.is_set():
+                                break
+                            if query is not None and keep is not None:
+                                #drop fetched rows which are already cached
+                                records = list(filter(keep, records))
+                            if cacheFile is not None:
+                                self.cache.dump(cacheFile, records)
+                            if query is None:
+                                #cached rows out of the current window are kept in cache but not exported
+                                if keep is not None:
+                                    records = list(filter(keep, records))
+                                numCached = numCached + len(records)
+                            writer.writerows(records)
+                            if onBatch is not None:
+                                onBatch(sqlFn, columns, records)
+                                fed = True
+                            numRows = numRows + len(records)
+                            self.progress[sqlFn] = numRows
+                        if self.cancelled.is_set():
+                            break
+
+                if self.cancelled.is_set():
+                    break
+
+                if cacheFile is not None:
+                    self.cache.commit(entry, cacheFile)
+                    cacheFile = None
+                elapsed = time.perf_counter() - tStart
+                self.timings[sqlFn] = elapsed
+                self.logQueue.put('-->%s: %d rows exported in %.1fs(%.0f rows/sec)%s' % (sqlFn, numRows, elapsed, numRows / elapsed if elapsed > 0 else 0,
+                                  ', %d rows from cache' % numCached if numCached > 0 else ''))
+                return True
+            except self.backend.DatabaseError as e:
+                if self.cancelled.is_set():
+                    break
+                code, message = self.backend.errorInfo(e)
+                self.logQueue.put('<font color=red>DatabaseError(%s): %s!</font>' % (sqlFn, message))
+                if db is not None:
+                    #don't return a broken session to the pool
+                    with self.lock:
+                        self.sessions.pop(sqlFn, None)
+                    self.backend.drop(db)
+                    db = None
+                if code not in self.backend.RETRY_CODES or attempt > NgSqlQuery.MAX_RETRIES:
+                    return False
+                if fed:
+                    onBatch(sqlFn, None, None)
+                self.progress[sqlFn] = 0
+                #back off before retrying, unless cancelled meanwhile
+                if self.cancelled.wait(NgSqlQuery.RETRY_DELAY * attempt):
+                    break
+            except Exception as e:
+                self.logQueue.put('<font color=red>Exception(%s): %s</font>' % (sqlFn, str(e)))
+                return False
+            finally:
+                if cacheFile is not None:
+                    self.cache.abort(entry, cacheFile)
+                if db is not None:
+                    with self.lock:
+                        self.sessions.pop(sqlFn, None)
+                    self.backend.release(db)
+
+        self.logQueue.put('<font color=red>-->Query cancelled: %s</font>' % sqlFn)
+        return False
+
+    def cancel(self):
+        '''
+        Cancel all running queries, which can be called while exec_ is waiting for them, e.g. by a menu action.
+        '''
+        self.cancelled.set()
+        with self.lock:
+            for db in self.sessions.values():
+                try:
+                    #interrupt the long-running query of this session
+                    self.backend.cancel(db)
+                except self.backend.Error:
+                    pass
+
+    def flushLogs(self):
+        while True:
+            try:
+                self.ngwin.logEdit.append(self.logQueue.get_nowait())
+            except queue.Empty:
+                break
+
+    def makeAggQuery(self, query, keyColumns, aggs):
+        '''
+        Wrap query as a sub-query grouped by keyColumns.
+        aggs: list of (column, aggregation expression), e.g. ('INTRA_HO_ATT_NB', 'SUM(INTRA_HO_ATT_NB)')
+        '''
+        columns = list(keyColumns) + ['%s %s' % (expr, col) for col,expr in aggs]
+        #query may end with a comment, so close the sub-query in a new line
+        return 'select %s from (\n%s\n) group by %s' % (', '.join(columns), query.strip().rstrip(';'), ', '.join(keyColumns))
 
     def checkSubMap(self):
         ret = True
@@ -0,0 +1,137 @@
+#!/usr/bin/python3
+# -*- encoding: utf-8 -*-
+
+'''
+File:
+    test_ngm8015proc.py
+Description:
+    Tests of NgM8015Proc over NEDS queries of the SQLite backend, with fixtures generated by ngnedsbench.py.
+Change History:
+    2026-10-18  v0.1    created.
+'''
+
+import os
+import sys
+import csv
+import glob
+from datetime import datetime
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ngdbbackend import loadFixtures, SQLITE_TIME_FORMAT
+from ngnedsbench import NgBenchWin, genNedsFixtures, SQL_QUERIES
+from ngsqlquery import NgSqlQuery
+from ngm8015proc import NgM8015Proc, M8015, makeAggQueries
+
+M8015_TABLE = 'NOKLTE_PS_LNCELHO_DMNC1_RAW'
+
+def makeDb(workDir, numBts, numDays, m8015=None):
+    '''
+    Generate fixtures into a SQLite database of workDir, and return its db config file.
+    m8015: function(hour, lncelId, eciId) which returns [key=csv column, val=value] of M8015 counters, or None to drop the record.
+    Generated M8015 counters are kept if m8015 is None.
+    '''
+    fixtures = os.path.join(workDir, 'fixtures')
+    genNedsFixtures(fixtures, numBts=numBts, numDays=numDays, numNbrs=4, seed=1)
+    if m8015 is not None:
+        fn = os.path.join(fixtures, '%s.csv' % M8015_TABLE)
+        with open(fn, 'r', newline='') as f:
+            reader = csv.reader(f)
+            header = next(reader)
+            rows = list(reader)
+        d = dict([(col, i) for i,col in enumerate(header)])
+        with open(fn, 'w', newline='') as f:
+            writer = csv.writer(f, lineterminator='\n')
+            writer.writerow(header)
+            for tokens in rows:
+                hour = datetime.strptime(tokens[d['PERIOD_START_TIME']], SQLITE_TIME_FORMAT).hour
+                counters = m8015(hour, int(tokens[d['LNCEL_ID']]), int(tokens[d['ECI_ID']]))
+                if counters is None:
+                    continue
+                for attr,col in M8015.FIELDS:
+                    tokens[d[col]] = counters.get(col, 0)
+                writer.writerow(tokens)
+
+    dbFile = os.path.join(workDir, 'neds.db')
+    loadFixtures(dbFile, fixtures, log=lambda text: None)
+    dbConf = os.path.join(workDir, 'neds_db_config.txt')
+    with open(dbConf, 'w') as f:
+        f.write('DB_BACKEND = sqlite\nDB_FILE = %s\n' % dbFile)
+    return dbConf
+
+def runProc(workDir, dbConf, numDays, aggregated=False):
+    #the same steps as NgMainWin.onExecNedsM8015 before running use cases, return NgM8015Proc with data loaded
+    win = NgBenchWin()
+    outDir = os.path.join(workDir, 'out_agg' if aggregated else 'out_raw')
+    proc = NgM8015Proc(win, numWorkers=1, aggregated=aggregated, outDir=outDir)
+    args = {'dbConf':dbConf, 'sqlQuery':SQL_QUERIES, 'onBatch':proc.feedQuery, 'outDir':outDir, 'numSessions':2}
+    if aggregated:
+        args['aggQuery'] = makeAggQueries()
+    query = NgSqlQuery(win, args)
+    query.subsMap = {'start_time':'2019030100', 'end_time':'201903%02d23' % numDays}
+    query.exec_()
+    assert query.queryStat, win.history
+    proc.loadCsvData()
+    proc.makeEciMap()
+    return proc
+
+def readCsv(pattern):
+    fns = glob.glob(pattern)
+    assert len(fns) == 1, fns
+    with open(fns[0], 'r', newline='') as f:
+        return list(csv.DictReader(f))
+
+def test_first_degraded_hour(tmp_path):
+    workDir = str(tmp_path)
+    #relations of the first cell are known after fixtures are generated, so they're picked by the first call of m8015
+    picked = []
+    def m8015(hour, lncelId, eciId):
+        if len(picked) == 0:
+            picked.append((lncelId, eciId))
+        elif len(picked) == 1 and picked[0] != (lncelId, eciId):
+            picked.append((lncelId, eciId))
+
+        succ = 50
+        if (lncelId, eciId) == picked[0]:
+            #degraded since 10:00, with no records of 08:00 and 09:00
+            if hour in (8, 9):
+                return None
+            if hour >= 10:
+                succ = 10
+        return {'INTRA_HO_ATT_NB':50, 'INTRA_HO_SUCC_NB':succ}
+
+    dbConf = makeDb(workDir, 4, 1, m8015)
+    proc = runProc(workDir, dbConf, 1)
+    proc.procUserCase05(bucket='hour', window=3, minHoAtt=20, hosrDrop=10.0, allSeries=True)
+    dns = ['%d_%d' % (proc.lncelData[lncelId].eci, eciId) for lncelId,eciId in picked]
+
+    rows = readCsv(os.path.join(proc.outDir, 'm8015_degradation_hour_*.csv'))
+    assert [row['DN'] for row in rows] == dns[:1]
+    row = rows[0]
+    assert row['FIRST_DEGRADED_TIME'] == '2019-03-01T10:00'
+    #10:00 to 23:00
+    assert int(row['NUM_DEGRADED']) == 14
+    #baseline is 00:00 to 07:00, and the rolling window of 10:00 covers only 10:00 as 08:00 and 09:00 are missing
+    assert (int(row['BASE_HO_ATT']), row['BASE_HOSR(%)']) == (400, '100.00')
+    assert (int(row['ROLL_HO_ATT']), row['ROLL_HOSR(%)']) == (50, '20.00')
+
+    series = readCsv(os.path.join(proc.outDir, 'm8015_series_hour_*.csv'))
+    assert [r['TIME'][-5:] for r in series if r['DEGRADED'] == 'YES'] == ['%02d:00' % h for h in range(10, 24)]
+    #the next relation in the series doesn't roll in records of the degraded one
+    rows = [r for r in series if r['DN'] == dns[1]]
+    assert len(rows) == 24
+    assert [(int(r['ROLL_HO_ATT']), r['ROLL_HOSR(%)']) for r in rows[:3]] == [(50, '100.00'), (100, '100.00'), (150, '100.00')]
+
+def test_aggregate_raw_vs_db(tmp_path):
+    workDir = str(tmp_path)
+    dbConf = makeDb(workDir, 6, 2)
+    raw = runProc(workDir, dbConf, 2)
+    agg = runProc(workDir, dbConf, 2, aggregated=True)
+
+    #records aggregated by PmRecordTable.aggregate are the same as those aggregated by DB
+    for meas,(fn, cls, keyColumns) in NgM8015Proc.PM_CSVS.items():
+        rawData = getattr(raw, '%sAggData' % meas.lower())
+        aggData = getattr(agg, '%sAggData' % meas.lower())
+        assert len(rawData) > 0
+        assert set(rawData.keys()) == set(aggData.keys()), meas
+        for key,val in rawData.items():
+            for attr,col in cls.FIELDS:
+                assert getattr(val, attr) == getattr(aggData[key], attr), (meas, key, attr)
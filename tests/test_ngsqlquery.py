@@ -0,0 +1,61 @@
+#!/usr/bin/python3
+# -*- encoding: utf-8 -*-
+
+'''
+File:
+    test_ngsqlquery.py
+Description:
+    Tests of NgSqlQuery over the SQLite backend, with fixtures generated by ngnedsbench.py.
+Change History:
+    2026-10-18  v0.1    created.
+'''
+
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ngdbbackend import loadFixtures
+from ngnedsbench import NgBenchWin, genNedsFixtures
+from ngsqlquery import NgSqlQuery
+
+QUERIES = ['neds_lnrel.sql', 'neds_m8015.sql']
+
+def makeDb(workDir, name, numBts):
+    genNedsFixtures(os.path.join(workDir, name), numBts=numBts, numDays=1, numNbrs=4, seed=numBts)
+    dbFile = os.path.join(workDir, '%s.db' % name)
+    loadFixtures(dbFile, os.path.join(workDir, name), log=lambda text: None)
+    dbConf = os.path.join(workDir, '%s_db_config.txt' % name)
+    with open(dbConf, 'w') as f:
+        f.write('DB_BACKEND = sqlite\nDB_FILE = %s\n' % dbFile)
+    return dbConf
+
+def runQuery(workDir, dbConf, outName):
+    #return ([key=sql file, val=exported rows], logs)
+    win = NgBenchWin()
+    outDir = os.path.join(workDir, outName)
+    query = NgSqlQuery(win, {'dbConf':dbConf, 'sqlQuery':QUERIES, 'useCache':True, 'cacheDir':os.path.join(workDir, 'cache'), 'outDir':outDir, 'numSessions':2})
+    query.subsMap = {'start_time':'2019030100', 'end_time':'2019030123'}
+    query.exec_()
+    assert query.queryStat, win.history
+    results = dict()
+    for sqlFn in QUERIES:
+        with open(os.path.join(outDir, sqlFn.replace('.sql', '.csv')), 'r') as f:
+            results[sqlFn] = f.read().splitlines()
+    return (results, win.history)
+
+def test_cache_per_database(tmp_path):
+    workDir = str(tmp_path)
+    dbConfA = makeDb(workDir, 'neds_a', 6)
+    dbConfB = makeDb(workDir, 'neds_b', 2)
+
+    resultsA, logsA = runQuery(workDir, dbConfA, 'out_a')
+    resultsB, logsB = runQuery(workDir, dbConfB, 'out_b')
+    #results of database A aren't served from cache for database B
+    assert not any('found in cache' in text for text in logsB)
+    for sqlFn in QUERIES:
+        assert resultsA[sqlFn] != resultsB[sqlFn]
+        assert len(resultsA[sqlFn]) > len(resultsB[sqlFn])
+
+    #while database A still hits its own entries
+    resultsA2, logsA2 = runQuery(workDir, dbConfA, 'out_a2')
+    assert sum(1 for text in logsA2 if 'found in cache' in text) == len(QUERIES)
+    assert resultsA2 == resultsA